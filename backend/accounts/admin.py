@@ -8,7 +8,7 @@ from .models import User
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'user_type', 'is_verified', 'is_active', 'date_joined')
     list_filter = ('user_type', 'is_verified', 'is_active', 'is_staff')
-    search_fields = ('username', 'email', 'phone_number')
+    search_fields = ('username', 'email', 'phone_number', 'phone_e164')
     ordering = ('-date_joined',)
     
     fieldsets = BaseUserAdmin.fieldsets + (
@@ -1,23 +1,77 @@
-import jwt
+import hashlib
+import secrets
+import uuid
 from datetime import timedelta
 
+import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import router, transaction
 from django.utils import timezone
 from rest_framework import authentication, exceptions
 
+from .models import RefreshToken
+
 User = get_user_model()
 
+# Reverse one-to-one profile relations on User, keyed by the user_type that
+# owns them.
+PROFILE_RELATIONS = {
+    "maid": "maid_profile",
+    "homeowner": "homeowner_profile",
+    "cleaning_company": "cleaning_company",
+    "home_nurse": "home_nurse",
+}
+
+
+def _profile_claims(user):
+    profiles = {}
+    for relation in PROFILE_RELATIONS.values():
+        try:
+            profiles[relation] = getattr(user, relation).pk
+        except ObjectDoesNotExist:
+            pass
+    return profiles
+
+
+def account_block_reason(user):
+    """Why ``user`` may not obtain tokens, or None if they may."""
+    if not user.is_active:
+        return "This account has been deactivated. Please contact support if you believe this is a mistake."
+    blocked = "Your account is blocked. Please contact the MaidMatch team for support."
+    try:
+        if user.user_type == "homeowner" and not user.homeowner_profile.is_active:
+            return blocked
+        if user.user_type == "maid" and not user.maid_profile.is_enabled:
+            return blocked
+    except ObjectDoesNotExist:
+        pass
+    return None
+
 
 def generate_access_token(user):
-    """Generate a simple JWT access token for the given user.
+    """Generate a short-lived JWT access token for the given user.
 
-    Payload is intentionally small: just user_id and an expiry.
+    Besides ``user_id`` the token carries the fields permissions check on
+    every request (role, staff/superuser and active flags, username) and the
+    ids of the user's profiles, so authenticating it needs no query.
     """
-    expires_at = timezone.now() + timedelta(days=7)
+    now = timezone.now()
+    lifetime = timedelta(minutes=getattr(settings, "ACCESS_TOKEN_LIFETIME_MINUTES", 15))
     payload = {
         "user_id": user.id,
-        "exp": int(expires_at.timestamp()),
+        "typ": "access",
+        "jti": secrets.token_urlsafe(12),
+        "iat": int(now.timestamp()),
+        "exp": int((now + lifetime).timestamp()),
+        "username": user.username,
+        "role": user.user_type,
+        "staff": user.is_staff,
+        "su": user.is_superuser,
+        "active": user.is_active,
+        "prof": _profile_claims(user),
     }
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
     # PyJWT>=2 returns a str, older versions return bytes
@@ -26,15 +80,148 @@ def generate_access_token(user):
     return token
 
 
+def _instance_from_values(model, db, data):
+    names = [f.attname for f in model._meta.concrete_fields if f.attname in data]
+    instance = model.from_db(db, names, [data[name] for name in names])
+    instance._load_deferred_together = True
+    instance._claimed_values = {name: data[name] for name in names if name != model._meta.pk.attname}
+    return instance
+
+
+def user_from_claims(payload):
+    """Build a User from access-token claims without touching the database.
+
+    Unclaimed fields are deferred and load together on first access. Profile
+    relations are primed from the ``prof`` claim: claimed profiles become
+    deferred instances (so ``hasattr(user, "maid_profile")`` and filtering by
+    the profile are free), and relations that cannot belong to the user's role
+    are cached as missing. A profile matching the role but created after the
+    token was issued is still looked up normally.
+    """
+    data = {
+        "id": payload["user_id"],
+        "username": payload.get("username", ""),
+        "user_type": payload.get("role", ""),
+        "is_staff": payload.get("staff", False),
+        "is_superuser": payload.get("su", False),
+        "is_active": payload.get("active", True),
+    }
+    db = router.db_for_read(User)
+    user = _instance_from_values(User, db, data)
+
+    profiles = payload.get("prof", {})
+    for role, relation in PROFILE_RELATIONS.items():
+        rel = getattr(User, relation).related
+        if relation in profiles:
+            profile = _instance_from_values(rel.related_model, db, {"id": profiles[relation], "user_id": user.pk})
+            rel.field.set_cached_value(profile, user)
+            rel.set_cached_value(user, profile)
+        elif role != user.user_type:
+            rel.set_cached_value(user, None)
+    return user
+
+
+# Access-token denylist. Entries live only until the token would have expired
+# anyway, so the list stays small. Use a cache shared by all workers.
+
+def _denylist():
+    return caches[getattr(settings, "TOKEN_DENYLIST_CACHE", "default")]
+
+
+def revoke_access_token(payload):
+    remaining = int(payload.get("exp", 0) - timezone.now().timestamp())
+    if payload.get("jti") and remaining > 0:
+        _denylist().set(f"jwt-deny:{payload['jti']}", 1, timeout=remaining)
+
+
+def is_access_token_revoked(payload):
+    return _denylist().get(f"jwt-deny:{payload.get('jti')}") is not None
+
+
+def _hash_refresh_token(raw):
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(user, family=None):
+    raw = secrets.token_urlsafe(32)
+    lifetime = timedelta(days=getattr(settings, "REFRESH_TOKEN_LIFETIME_DAYS", 30))
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=_hash_refresh_token(raw),
+        family=family or uuid.uuid4(),
+        expires_at=timezone.now() + lifetime,
+    )
+    return raw
+
+
+def issue_tokens(user):
+    """Access + refresh token pair for a freshly authenticated user."""
+    return {"access": generate_access_token(user), "refresh": issue_refresh_token(user)}
+
+
+def rotate_refresh_token(raw):
+    """Exchange a refresh token for a new token pair.
+
+    Raises AuthenticationFailed for unknown, expired or reused tokens, and
+    PermissionDenied if the account has since been blocked.
+    """
+    now = timezone.now()
+    error = None
+    with transaction.atomic():
+        token = (
+            RefreshToken.objects.select_for_update()
+            .select_related("user")
+            .filter(token_hash=_hash_refresh_token(raw or ""))
+            .first()
+        )
+        if token is None:
+            error = exceptions.AuthenticationFailed("Invalid refresh token")
+        elif token.revoked_at is not None:
+            RefreshToken.objects.filter(family=token.family, revoked_at__isnull=True).update(revoked_at=now)
+            error = exceptions.AuthenticationFailed("Refresh token has already been used")
+        elif token.expires_at <= now:
+            error = exceptions.AuthenticationFailed("Refresh token has expired")
+        else:
+            token.revoked_at = now
+            token.save(update_fields=["revoked_at"])
+            reason = account_block_reason(token.user)
+            if reason:
+                RefreshToken.objects.filter(family=token.family, revoked_at__isnull=True).update(revoked_at=now)
+                error = exceptions.PermissionDenied(reason)
+            else:
+                tokens = {
+                    "access": generate_access_token(token.user),
+                    "refresh": issue_refresh_token(token.user, family=token.family),
+                }
+    # Raised outside the transaction so family revocations are kept.
+    if error is not None:
+        raise error
+    return token.user, tokens
+
+
+def revoke_refresh_token(raw, user):
+    """Revoke the family of ``raw`` (one signed-in device) if it belongs to ``user``."""
+    token = RefreshToken.objects.filter(token_hash=_hash_refresh_token(raw), user_id=user.pk).first()
+    if token is not None:
+        RefreshToken.objects.filter(family=token.family, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+
 class SimpleJWTAuthentication(authentication.BaseAuthentication):
     """Very small JWT auth class using Authorization: Bearer <token>.
 
     This is stateless and works well with the SPA frontend hosted on a
     different domain (Netlify/custom domain) without relying on cookies.
+    Access tokens carry the user's claims, so no query is needed to
+    authenticate them; ``request.auth`` is the decoded payload.
     """
 
     keyword = "Bearer"
 
+    def authenticate_header(self, request):
+        # Makes DRF answer failed authentication with 401 (not 403), which
+        # tells clients to refresh their access token.
+        return self.keyword
+
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
         if not auth_header:
@@ -57,9 +244,18 @@ class SimpleJWTAuthentication(authentication.BaseAuthentication):
         if not user_id:
             raise exceptions.AuthenticationFailed("Invalid token payload")
 
+        if payload.get("typ") == "access":
+            if not payload.get("active", True):
+                raise exceptions.AuthenticationFailed("User inactive")
+            if is_access_token_revoked(payload):
+                raise exceptions.AuthenticationFailed("Token has been revoked")
+            return user_from_claims(payload), payload
+
+        # Tokens issued before claims were added (user_id only) are still
+        # honoured until they expire.
         try:
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed("User not found")
 
-        return user, None
+        return user, payload
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+from .phone import normalize_phone
 
 User = get_user_model()
 
@@ -17,15 +20,19 @@ class PhoneNumberBackend(ModelBackend):
         if phone_number is None or password is None:
             return None
         
-        try:
-            # Try to find user by phone number
-            user = User.objects.get(phone_number=phone_number)
-        except User.DoesNotExist:
-            # If not found by phone, try by username (for backwards compatibility)
-            try:
-                user = User.objects.get(username=phone_number)
-            except User.DoesNotExist:
-                return None
+        # One query for both the canonical phone number and, for backwards
+        # compatibility, the username; a phone match wins.
+        canonical = normalize_phone(phone_number)
+        if canonical is not None:
+            field, value = 'phone_e164', canonical
+        else:
+            field, value = 'phone_number', phone_number
+        candidates = list(User.objects.filter(Q(**{field: value}) | Q(username=phone_number)).order_by('pk')[:3])
+        user = next((u for u in candidates if getattr(u, field) == value), None)
+        if user is None:
+            user = next((u for u in candidates if u.username == phone_number), None)
+        if user is None:
+            return None
         
         # Check password
         if user.check_password(password):
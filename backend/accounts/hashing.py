@@ -0,0 +1,133 @@
+"""Password hashing off the request thread, with load shedding.
+
+PBKDF2 with Django's default iteration count costs tens of milliseconds of
+CPU per call. During a login storm every worker ends up pinned on it and
+requests queue behind each other until they time out. Hashing therefore runs
+on a small shared pool (``PASSWORD_HASH_THREADS``; ``hashlib`` releases the
+GIL, so threads use all cores). At most ``PASSWORD_HASH_MAX_PENDING`` calls
+may wait for a thread; beyond that ``HashingOverloaded`` (503 with
+Retry-After) is raised at once instead of letting latency grow without
+bound.
+
+Only the pure hashing runs on the pool. Upgrading a stored hash (when the
+iteration count changed) is saved from the caller's thread, so pool threads
+never open database connections.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import exceptions, status
+
+
+class HashingOverloaded(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The server is busy. Please try again in a moment."
+    default_code = "hashing_overloaded"
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns ``wait`` into a Retry-After header.
+        self.wait = getattr(settings, "PASSWORD_HASH_RETRY_AFTER", 1)
+
+
+class BoundedExecutor:
+    """Thread pool that rejects work instead of queueing it without limit."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, "PASSWORD_HASH_THREADS", None) or os.cpu_count() or 1
+            _executor = BoundedExecutor(workers, getattr(settings, "PASSWORD_HASH_MAX_PENDING", 32))
+        return _executor
+
+
+def _timeout():
+    return getattr(settings, "PASSWORD_HASH_TIMEOUT", 10)
+
+
+def _wait(future):
+    try:
+        return future.result(timeout=_timeout())
+    except FutureTimeoutError:
+        future.cancel()
+        raise HashingOverloaded()
+
+
+async def _await(future):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), _timeout())
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise HashingOverloaded()
+
+
+def _apply_upgrade(user, raw_password, encoded_upgrade):
+    user.password = encoded_upgrade
+    user._password = raw_password
+    user.save(update_fields=["password"])
+
+
+def _verify(raw_password, encoded):
+    """Check ``raw_password``; also returns a re-encoded hash if it needs upgrading."""
+    is_correct, must_update = hashers.verify_password(raw_password, encoded)
+    upgrade = hashers.make_password(raw_password) if is_correct and must_update else None
+    return is_correct, upgrade
+
+
+def check_password(user, raw_password):
+    """Bounded equivalent of ``user.check_password(raw_password)``."""
+    is_correct, upgrade = _wait(get_executor().submit(_verify, raw_password, user.password))
+    if upgrade:
+        _apply_upgrade(user, raw_password, upgrade)
+    return is_correct
+
+
+def make_password(raw_password):
+    """Bounded equivalent of ``django.contrib.auth.hashers.make_password``."""
+    return _wait(get_executor().submit(hashers.make_password, raw_password))
+
+
+def set_password(user, raw_password):
+    """Bounded equivalent of ``user.set_password(raw_password)`` (does not save)."""
+    user.password = make_password(raw_password)
+    user._password = raw_password
+
+
+async def acheck_password(user, raw_password):
+    is_correct, upgrade = await _await(get_executor().submit(_verify, raw_password, user.password))
+    if upgrade:
+        await sync_to_async(_apply_upgrade)(user, raw_password, upgrade)
+    return is_correct
+
+
+async def amake_password(raw_password):
+    return await _await(get_executor().submit(hashers.make_password, raw_password))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from accounts.phone import backfill_phone_e164
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Backfill/repair the canonical E.164 phone column (users.phone_e164)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--country-code',
+            help='Country calling code assumed for local numbers (default: PHONE_DEFAULT_COUNTRY_CODE)',
+        )
+
+    def handle(self, *args, **options):
+        scanned, updated, invalid = backfill_phone_e164(
+            User, batch_size=options['batch_size'], country_code=options['country_code'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {scanned} users, updated {updated}, {invalid} without a valid phone number'
+        ))
+
+        # Accounts registered as e.g. "07..." and "+256..." before the column
+        # existed end up sharing a canonical number; logins pick the oldest.
+        duplicates = (
+            User.objects.exclude(phone_e164=None)
+            .values('phone_e164')
+            .annotate(n=Count('id'))
+            .filter(n__gt=1)
+            .order_by('phone_e164')
+        )
+        for row in duplicates:
+            self.stdout.write(self.style.WARNING(
+                f"{row['phone_e164']} is shared by {row['n']} accounts"
+            ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.otp import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired login codes (run periodically, e.g. every few minutes from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired login codes'))
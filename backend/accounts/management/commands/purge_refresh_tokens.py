@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import RefreshToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired refresh tokens and tokens revoked more than --keep-days ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=7,
+            help='Keep revoked tokens this long so reuse of a rotated token is still detected',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['keep_days'])
+        deleted, _ = RefreshToken.objects.filter(
+            Q(expires_at__lte=now) | Q(revoked_at__lte=cutoff)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} refresh tokens'))
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:10
+
+import re
+
+import accounts.models
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of accounts.phone.normalize_phone as it was when this
+# migration was written, so later changes there cannot alter it.
+SEPARATORS = re.compile(r'[\s\-().]')
+
+
+def normalize_phone(value, cc):
+    if not value:
+        return None
+    number = SEPARATORS.sub('', str(value))
+    if number.startswith('+'):
+        digits = number[1:]
+    elif number.startswith('00'):
+        digits = number[2:]
+    elif number.startswith('0'):
+        digits = cc + number[1:]
+    elif number.startswith(cc):
+        digits = number
+    else:
+        digits = cc + number
+    if not digits.isdigit() or not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+def backfill(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    cc = str(getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '256'))
+    last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'phone_number')[:1000])
+        if not batch:
+            return
+        for row in batch:
+            row.phone_e164 = normalize_phone(row.phone_number, cc)
+        User.objects.bulk_update(batch, ['phone_e164'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', accounts.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
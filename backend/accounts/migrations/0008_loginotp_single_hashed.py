@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def delete_login_otps(apps, schema_editor):
+    # Old rows hold plain-text codes and are at most minutes from expiry;
+    # users waiting on one simply request a new code.
+    apps.get_model('accounts', 'LoginOTP').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_phone_e164'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_login_otps, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='loginotp',
+            options={},
+        ),
+        migrations.RemoveIndex(
+            model_name='loginotp',
+            name='accounts_lo_user_id_132381_idx',
+        ),
+        migrations.RemoveField(
+            model_name='loginotp',
+            name='code',
+        ),
+        migrations.RemoveField(
+            model_name='loginotp',
+            name='is_used',
+        ),
+        migrations.AddField(
+            model_name='loginotp',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loginotp',
+            name='code_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='loginotp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='loginotp',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='login_otp', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
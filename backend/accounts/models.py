@@ -1,9 +1,68 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+
+from .phone import normalize_phone
 
 # Create your models here.
 
-class User(AbstractUser):
+class LoadDeferredTogetherMixin:
+    """Load all deferred fields in one query on first access.
+
+    Users (and their profiles) rebuilt from access-token claims only carry the
+    claimed fields. Without this, reading each remaining field would cost a
+    query of its own.
+
+    Claimed values may be stale (an account demoted after the token was
+    issued), so a full ``save()`` of such an instance never writes a claimed
+    field back unless code changed it: only loaded fields that are not
+    claimed, plus changed claimed ones, are saved.
+    """
+
+    _load_deferred_together = False
+    # attname -> value for instances built from token claims
+    _claimed_values = None
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        if fields is not None and self._load_deferred_together:
+            deferred = self.get_deferred_fields()
+            if deferred and deferred.issuperset(fields):
+                fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+    def save(self, *args, **kwargs):
+        claimed = self._claimed_values
+        if claimed and kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and not (field.attname in claimed and getattr(self, field.attname) == claimed[field.attname])
+            ]
+        super().save(*args, **kwargs)
+
+
+class UserManager(BaseUserManager):
+    def get_by_phone(self, phone_number, **filters):
+        """Fetch the user with this phone number, however it was typed.
+
+        One indexed lookup on ``phone_e164`` (or on the raw column for values
+        that are not phone numbers at all); raises ``User.DoesNotExist``. If two
+        legacy accounts share a number, the oldest wins.
+        """
+        canonical = normalize_phone(phone_number)
+        if canonical is None:
+            lookup = {'phone_number': (phone_number or '').strip()}
+        else:
+            lookup = {'phone_e164': canonical}
+        user = self.filter(**lookup, **filters).order_by('pk').first()
+        if user is None:
+            raise self.model.DoesNotExist("No user with this phone number")
+        return user
+
+
+class User(LoadDeferredTogetherMixin, AbstractUser):
     """
     Custom User model for MaidMatch application
     Extends Django's AbstractUser to support different user types
@@ -29,12 +88,16 @@ class User(AbstractUser):
     
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES)
     phone_number = models.CharField(max_length=15, unique=True, help_text="Primary contact number")
+    # E.164 form of phone_number, kept in sync on save (see accounts.phone).
+    phone_e164 = models.CharField(max_length=16, blank=True, null=True, db_index=True, editable=False)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserManager()
+
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
@@ -43,18 +106,48 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.user_type})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'phone_number' in update_fields:
+            self.phone_e164 = normalize_phone(self.phone_number)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        super().save(*args, **kwargs)
+
 
 class LoginOTP(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_otps')
-    code = models.CharField(max_length=6)
+    """The pending WhatsApp login code of a user (at most one; see accounts.otp).
+
+    Only an HMAC of the code is stored. Rows are deleted when the code is used,
+    and expired ones by the ``purge_login_otps`` command, so the table stays
+    about as large as the number of logins in progress.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='login_otp')
+    code_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"OTP for {self.user_id} at {self.created_at}"
+
+
+class RefreshToken(models.Model):
+    """Server-side refresh token (only a SHA-256 of the token is stored).
+
+    Tokens are single use: refreshing revokes the presented token and issues a
+    new one in the same ``family``. Presenting an already revoked token means
+    it leaked, so the whole family is revoked.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    family = models.UUIDField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    is_used = models.BooleanField(default=False)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=['user', 'code', 'created_at']),
-        ]
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"OTP for {self.user_id} at {self.created_at}"
+        return f"Refresh token for {self.user_id} ({self.family})"
@@ -0,0 +1,102 @@
+"""WhatsApp login codes.
+
+Each user has at most one pending code (``LoginOTP``); sending a new one
+replaces it. Codes are stored as an HMAC keyed with ``SECRET_KEY``, expire
+after ``LOGIN_OTP_TTL_SECONDS`` and allow ``LOGIN_OTP_MAX_ATTEMPTS`` wrong
+guesses before they are discarded. A correct code is consumed with a single
+``DELETE`` matching user, hash, expiry and attempt count, so it can only be
+used once even by concurrent requests.
+"""
+
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LoginOTP
+
+VALID = "valid"
+INVALID = "invalid"
+EXPIRED = "expired"
+LOCKED = "locked"
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "LOGIN_OTP_TTL_SECONDS", 300))
+
+
+def _max_attempts():
+    return getattr(settings, "LOGIN_OTP_MAX_ATTEMPTS", 5)
+
+
+def hash_code(user_id, code):
+    message = f"{user_id}:{code}".encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def issue_login_otp(user):
+    """Create (or replace) the user's login code and return it in plain text."""
+    code = f"{secrets.randbelow(1_000_000):06d}"
+    now = timezone.now()
+    LoginOTP.objects.update_or_create(
+        user=user,
+        defaults={
+            "code_hash": hash_code(user.pk, code),
+            "created_at": now,
+            "expires_at": now + _ttl(),
+            "attempts": 0,
+        },
+    )
+    return code
+
+
+def verify_login_otp(user, code):
+    """Check and consume ``code``; returns VALID, INVALID, EXPIRED or LOCKED."""
+    now = timezone.now()
+    consumed, _ = LoginOTP.objects.filter(
+        user_id=user.pk,
+        code_hash=hash_code(user.pk, code),
+        expires_at__gt=now,
+        attempts__lt=_max_attempts(),
+    ).delete()
+    if consumed:
+        return VALID
+
+    # Wrong code (or no usable one): count the attempt and explain.
+    otp = LoginOTP.objects.filter(user_id=user.pk).first()
+    if otp is None:
+        return INVALID
+    if otp.expires_at <= now:
+        otp.delete()
+        return EXPIRED
+    LoginOTP.objects.filter(pk=otp.pk).update(attempts=F("attempts") + 1)
+    # Decide on the count after the increment, so concurrent wrong guesses
+    # cannot all read a stale count and slip past the limit.
+    if LoginOTP.objects.filter(pk=otp.pk, attempts__gte=_max_attempts()).delete()[0]:
+        return LOCKED
+    return INVALID
+
+
+def ttl_text():
+    """How long a code lasts, for messages: "5 minutes", "45 seconds"."""
+    seconds = int(_ttl().total_seconds())
+    if seconds % 60:
+        return f"{seconds} second{'' if seconds == 1 else 's'}"
+    minutes = seconds // 60
+    return f"{minutes} minute{'' if minutes == 1 else 's'}"
+
+
+def purge_expired(batch_size=5000):
+    """Delete expired codes in batches; returns how many were deleted."""
+    total = 0
+    while True:
+        ids = list(
+            LoginOTP.objects.filter(expires_at__lte=timezone.now()).values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += LoginOTP.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,78 @@
+"""Phone number canonicalisation.
+
+Users type their number in whatever form they are used to ("0772 123456",
+"256772123456", "+256-772-123-456"). ``normalize_phone`` maps all of these to
+E.164 ("+256772123456") so they can be matched with one indexed lookup on
+``User.phone_e164``. Local numbers (leading trunk ``0``, or a bare subscriber
+number) are assumed to be in ``PHONE_DEFAULT_COUNTRY_CODE``.
+"""
+
+import re
+
+from django.conf import settings
+
+_separators = re.compile(r"[\s\-().]")
+
+
+def _country_code():
+    return str(getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "256"))
+
+
+def normalize_phone(value, country_code=None):
+    """Return ``value`` in E.164 form, or None if it is not a phone number."""
+    if not value:
+        return None
+    cc = country_code or _country_code()
+    number = _separators.sub("", str(value))
+    if number.startswith("+"):
+        digits = number[1:]
+    elif number.startswith("00"):
+        digits = number[2:]
+    elif number.startswith("0"):
+        digits = cc + number[1:]
+    elif number.startswith(cc):
+        digits = number
+    else:
+        digits = cc + number
+    if not digits.isdigit() or not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def normalize_phones(values, country_code=None):
+    """Normalise many numbers at once: ``{raw: e164 or None}``."""
+    cc = country_code or _country_code()
+    return {value: normalize_phone(value, cc) for value in set(values)}
+
+
+def backfill_phone_e164(model, batch_size=1000, country_code=None):
+    """Fill ``phone_e164`` for every row of ``model`` (a User model class).
+
+    Rows are walked in primary-key order in batches, each batch normalised in
+    one go and written back with a single ``bulk_update``. Safe to re-run.
+    Returns ``(scanned, updated, invalid)`` counts.
+    """
+    scanned = updated = invalid = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model._default_manager.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "phone_number", "phone_e164")[:batch_size]
+        )
+        if not batch:
+            return scanned, updated, invalid
+        canonical = normalize_phones((row.phone_number for row in batch), country_code)
+        changed = []
+        for row in batch:
+            value = canonical[row.phone_number]
+            if value is None:
+                invalid += 1
+            if row.phone_e164 != value:
+                row.phone_e164 = value
+                changed.append(row)
+        if changed:
+            model._default_manager.bulk_update(changed, ["phone_e164"])
+        scanned += len(batch)
+        updated += len(changed)
+        last_pk = batch[-1].pk
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 
+from .phone import normalize_phone
+
 User = get_user_model()
 
 
@@ -49,9 +51,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return value
 
     def validate_phone_number(self, value):
-        # Normalize simple spaces and check duplicates
+        # Normalize simple spaces and check duplicates against the canonical
+        # form, so "07..." and "+2567..." count as the same number.
         normalized = value.strip()
-        if User.objects.filter(phone_number=normalized).exists():
+        canonical = normalize_phone(normalized)
+        lookup = {'phone_e164': canonical} if canonical else {'phone_number': normalized}
+        if User.objects.filter(**lookup).exists():
             raise serializers.ValidationError("A user with this phone number already exists.")
         return normalized
 
@@ -78,12 +83,17 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop('password', None)
         validated_data.pop('password2', None)
+        # Views hash the password ahead of time on the bounded hashing pool
+        # (accounts.hashing) and pass the result in.
+        password_hash = validated_data.pop('password_hash', None)
 
         user = User.objects.create_user(**validated_data)
 
         # If a password was supplied, use it; otherwise keep the account
         # passwordless so it can continue to use OTP until the user sets one.
-        if password:
+        if password_hash:
+            user.password = password_hash
+        elif password:
             user.set_password(password)
         else:
             user.set_unusable_password()
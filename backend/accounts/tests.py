@@ -1,3 +1,169 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import otp
+from .authentication import generate_access_token, issue_tokens, user_from_claims
+from .models import LoginOTP, RefreshToken, User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {generate_access_token(user)}")
+    return client
+
+
+class ClaimBuiltUserSaveTests(TestCase):
+    """Users rebuilt from token claims must not write stale claims back."""
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.user = User.objects.create_user(
+            username="staffer", password="old-pass-123", phone_number="+256700000001",
+            user_type="homeowner", is_staff=True,
+        )
+        self.client = client_for(self.user)
+        # Demoted and deactivated after the token was issued
+        User.objects.filter(pk=self.user.pk).update(is_staff=False, is_active=False)
+
+    def assert_still_demoted(self):
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_staff)
+        self.assertFalse(self.user.is_active)
+
+    def test_profile_update_keeps_demotion(self):
+        response = self.client.patch("/api/accounts/users/me/", {"full_name": "New Name"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, "New Name")
+        self.assert_still_demoted()
+
+    def test_change_password_keeps_demotion(self):
+        response = self.client.post(
+            "/api/accounts/users/change_password/",
+            {"old_password": "old-pass-123", "new_password": "new-pass-456", "new_password2": "new-pass-456"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assert_still_demoted()
+        self.assertTrue(self.user.check_password("new-pass-456"))
+
+    def test_changed_claim_is_saved(self):
+        token = generate_access_token(self.user)
+        user = user_from_claims(jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"]))
+        user.username = "renamed"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, "renamed")
+        self.assert_still_demoted()
+
+
+def claims(access):
+    return jwt.decode(access, settings.SECRET_KEY, algorithms=["HS256"])
+
+
+class TokenLifecycleTests(TestCase):
+    refresh_url = "/api/accounts/token/refresh/"
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.user = User.objects.create_user(
+            username="rotator", password="pass-12345", phone_number="+256700000002", user_type="homeowner",
+        )
+        self.tokens = issue_tokens(self.user)
+        self.client = APIClient()
+
+    def refresh(self, raw):
+        return self.client.post(self.refresh_url, {"refresh": raw}, format="json")
+
+    def test_rotation_issues_new_pair_with_current_claims(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.refresh(self.tokens["refresh"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], self.tokens["refresh"])
+        self.assertTrue(claims(response.data["access"])["staff"])
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+
+    def test_reuse_revokes_the_family(self):
+        rotated = self.refresh(self.tokens["refresh"]).data
+        # The old token is replayed (stolen): it and its successor stop working
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(rotated["refresh"]).status_code, 401)
+        self.assertFalse(RefreshToken.objects.filter(user=self.user, revoked_at__isnull=True).exists())
+
+    def test_other_devices_survive_reuse(self):
+        other = issue_tokens(self.user)
+        self.refresh(self.tokens["refresh"])
+        self.refresh(self.tokens["refresh"])
+        self.assertEqual(self.refresh(other["refresh"]).status_code, 200)
+
+    def test_expired_refresh_token(self):
+        RefreshToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+
+    def test_blocked_account_cannot_refresh(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 403)
+        self.assertFalse(RefreshToken.objects.filter(user=self.user, revoked_at__isnull=True).exists())
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(self.client.get("/api/accounts/users/me/").status_code, 200)
+        response = self.client.post("/api/accounts/logout/", {"refresh": self.tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/accounts/users/me/").status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+
+
+@override_settings(LOGIN_OTP_MAX_ATTEMPTS=5, THROTTLE_ENABLED=False)
+class LoginOTPTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="pinned", password="pass-12345", phone_number="+256700000003", user_type="maid",
+        )
+        self.code = otp.issue_login_otp(self.user)
+        self.wrong = "000000" if self.code != "000000" else "111111"
+
+    def test_code_is_single_use(self):
+        self.assertEqual(otp.verify_login_otp(self.user, self.code), otp.VALID)
+        self.assertEqual(otp.verify_login_otp(self.user, self.code), otp.INVALID)
+
+    def test_locked_after_max_attempts(self):
+        results = [otp.verify_login_otp(self.user, self.wrong) for _ in range(5)]
+        self.assertEqual(results, [otp.INVALID] * 4 + [otp.LOCKED])
+        self.assertFalse(LoginOTP.objects.exists())
+
+    def test_concurrent_guess_cannot_skip_the_lock(self):
+        LoginOTP.objects.update(attempts=3)
+        first = QuerySet.first
+
+        def read_then_concurrent_guess(queryset):
+            row = first(queryset)
+            # Another wrong guess is counted right after this one read the row
+            LoginOTP.objects.filter(pk=row.pk).update(attempts=F("attempts") + 1)
+            return row
+
+        with mock.patch.object(QuerySet, "first", read_then_concurrent_guess):
+            self.assertEqual(otp.verify_login_otp(self.user, self.wrong), otp.LOCKED)
+        self.assertFalse(LoginOTP.objects.exists())
+
+    def test_expired_code(self):
+        LoginOTP.objects.update(expires_at=timezone.now())
+        self.assertEqual(otp.verify_login_otp(self.user, self.code), otp.EXPIRED)
+
+    def test_message_states_short_ttl_in_seconds(self):
+        for ttl, text in ((45, "45 seconds"), (60, "1 minute"), (90, "90 seconds"), (300, "5 minutes")):
+            with self.subTest(ttl=ttl), override_settings(LOGIN_OTP_TTL_SECONDS=ttl):
+                self.assertEqual(otp.ttl_text(), text)
+        with override_settings(LOGIN_OTP_TTL_SECONDS=45), mock.patch("accounts.views.send_whatsapp_message") as send:
+            response = APIClient().post("/api/accounts/login/send-pin/", {"phone_number": "0700000003"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(send.call_args.args[1].endswith("It will expire in 45 seconds."))
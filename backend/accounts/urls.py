@@ -1,22 +1,30 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     GetCSRFToken, UserRegistrationView, PasswordLoginView, UserLoginView, UserLogoutView, UserViewSet,
-    SendLoginPinView,
+    SendLoginPinView, TokenRefreshView, AsyncUserRegistrationView, AsyncPasswordLoginView,
 )
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 
+# Under ASGI the async variants keep workers free while passwords hash.
+if settings.ASYNC_AUTH_VIEWS:
+    register_view, login_view = AsyncUserRegistrationView, AsyncPasswordLoginView
+else:
+    register_view, login_view = UserRegistrationView, PasswordLoginView
+
 urlpatterns = [
     # CSRF token endpoint
     path('csrf/', GetCSRFToken.as_view(), name='csrf'),
     
     # Authentication endpoints
-    path('register/', UserRegistrationView.as_view(), name='register'),
-    path('login/', PasswordLoginView.as_view(), name='login'),
+    path('register/', register_view.as_view(), name='register'),
+    path('login/', login_view.as_view(), name='login'),
     path('login/send-pin/', SendLoginPinView.as_view(), name='login-send-pin'),
     path('login/verify-pin/', UserLoginView.as_view(), name='login-verify-pin'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('logout/', UserLogoutView.as_view(), name='logout'),
     
     # User management endpoints
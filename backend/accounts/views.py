@@ -1,17 +1,26 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status, permissions, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
 from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.http import JsonResponse
+from django.views import View
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.utils.decorators import method_decorator
-from django.utils import timezone
-from datetime import timedelta
-import random
-import requests
+import logging
+import math
 from django.conf import settings
 from django.db import transaction
-from .authentication import generate_access_token
+from backend.metrics import OTP_SENT
+from backend.outbound import ProviderBusy, get_client
+from backend.throttling import (
+    LOGIN_THROTTLES, OTP_SEND_THROTTLES, OTP_VERIFY_THROTTLES, TokenBucketThrottleMixin, throttle_wait,
+)
+from . import hashing, otp
+from .authentication import issue_tokens, revoke_access_token, revoke_refresh_token, rotate_refresh_token
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, UserUpdateSerializer,
     ChangePasswordSerializer, LoginSerializer, SendLoginPinSerializer,
@@ -19,19 +28,38 @@ from .serializers import (
 )
 from maid.models import MaidProfile
 from homeowner.models import HomeownerProfile
-from .models import LoginOTP
 
 User = get_user_model()
 
+# Separate logger so successful sends can be sampled (LOG_SAMPLE_RATES).
+whatsapp_logger = logging.getLogger("accounts.whatsapp")
+
+
+def _post_whatsapp_message(phone_number_id, phone_number, payload, headers):
+    try:
+        resp = get_client("whatsapp").post(
+            f"{phone_number_id}/messages", "send_message", json=payload, headers=headers, timeout=10,
+        )
+    except Exception:
+        whatsapp_logger.warning("WhatsApp send to %s failed", phone_number, exc_info=True)
+        return
+    if resp.ok:
+        whatsapp_logger.info("WhatsApp message sent to %s", phone_number, extra={"status_code": resp.status_code})
+    else:
+        whatsapp_logger.warning(
+            "WhatsApp rejected message to %s", phone_number,
+            extra={"status_code": resp.status_code, "body": resp.text[:1000]},
+        )
+
 
 def send_whatsapp_message(phone_number, message):
+    """Queue a WhatsApp text message; the request does not wait for delivery."""
     access_token = getattr(settings, 'WHATSAPP_ACCESS_TOKEN', None)
     phone_number_id = getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', None)
     if not access_token or not phone_number_id:
-        print("[WhatsApp] Missing configuration: access_token or phone_number_id not set")
+        whatsapp_logger.error("WhatsApp is not configured: access token or phone number id missing")
         return
 
-    url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
@@ -43,10 +71,19 @@ def send_whatsapp_message(phone_number, message):
         "text": {"body": message},
     }
     try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=10)
-        print(f"[WhatsApp] Sent message to {phone_number}: status={resp.status_code}, body={resp.text}")
-    except Exception as exc:
-        print(f"[WhatsApp] Error sending message: {exc}")
+        get_client("whatsapp").submit(_post_whatsapp_message, phone_number_id, phone_number, payload, headers)
+    except ProviderBusy:
+        whatsapp_logger.warning("WhatsApp send queue is full; message to %s dropped", phone_number)
+
+
+def end_session(request):
+    """Log out of the Django session, if this request has one.
+
+    API routes skip the session middleware (JWT only), so most requests
+    reaching these views have no session to flush.
+    """
+    if hasattr(request, 'session'):
+        logout(request)
 
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
@@ -58,6 +95,93 @@ class GetCSRFToken(APIView):
         return Response({'detail': 'CSRF cookie set'})
 
 
+def _validate_registration(data):
+    """Validate a registration payload.
+
+    Returns ``(serializer, None)`` or ``(None, (payload, status))``.
+    """
+    serializer = UserRegistrationSerializer(data=data)
+    if not serializer.is_valid():
+        return None, (serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    # Enforce age restriction BEFORE creating the user so that
+    # underage maid / home nurse accounts are never persisted.
+    from datetime import date
+    user_type = serializer.validated_data.get('user_type')
+
+    # For maids we expect `date_of_birth` in the payload. For home
+    # nurses we also accept `date_of_birth` (mirroring the maid
+    # field) but some clients may send `nurse_date_of_birth`, so we
+    # fall back to that key as well.
+    dob_str = None
+    if user_type == 'maid':
+        dob_str = data.get('date_of_birth')
+    elif user_type == 'home_nurse':
+        dob_str = data.get('date_of_birth') or data.get('nurse_date_of_birth')
+
+    if user_type in ['maid', 'home_nurse'] and dob_str:
+        try:
+            dob = date.fromisoformat(dob_str)
+            today = date.today()
+            age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+            if age < 18:
+                return None, ({
+                    'date_of_birth': ['You must be at least 18 years old to register for this role.']
+                }, status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            pass
+
+    return serializer, None
+
+
+def _complete_registration(serializer, data, files, password_hash=None):
+    """Create the user (and profile) from a validated registration serializer.
+
+    ``password_hash`` is the already hashed password, if one was supplied.
+    Returns ``(payload, status)``.
+    """
+    user = serializer.save(password_hash=password_hash)
+
+    # Create profile based on user type
+    if user.user_type == 'maid':
+        # Get maid biodata from request
+        profile_data = {
+            'user': user,
+            'full_name': data.get('full_name', ''),
+            'date_of_birth': data.get('date_of_birth'),
+            'location': data.get('location', ''),
+            'latitude': data.get('latitude'),
+            'longitude': data.get('longitude'),
+            'phone_number': data.get('phone_number', ''),
+            'email': data.get('email', '')  # Optional email from account
+        }
+
+        # Handle profile photo upload
+        if 'profile_photo' in files:
+            profile_data['profile_photo'] = files['profile_photo']
+
+        MaidProfile.objects.create(**profile_data)
+    elif user.user_type == 'homeowner':
+        # Get home details from request
+        home_address = data.get('home_address', '')
+        home_type = data.get('home_type', 'apartment')
+        number_of_rooms = data.get('number_of_rooms', 1)
+
+        HomeownerProfile.objects.create(
+            user=user,
+            home_address=home_address,
+            home_type=home_type,
+            number_of_rooms=number_of_rooms
+        )
+
+    # Issue tokens so the SPA can authenticate immediately
+    return {
+        'message': 'User registered successfully',
+        'user': UserSerializer(user).data,
+        **issue_tokens(user),
+    }, status.HTTP_201_CREATED
+
+
 class UserRegistrationView(APIView):
     """
     API endpoint for user registration
@@ -66,82 +190,80 @@ class UserRegistrationView(APIView):
     authentication_classes = []
 
     def post(self, request):
-        serializer = UserRegistrationSerializer(data=request.data)
-        if serializer.is_valid():
-            # Enforce age restriction BEFORE creating the user so that
-            # underage maid / home nurse accounts are never persisted.
-            from datetime import date
-            user_type = serializer.validated_data.get('user_type')
-
-            # For maids we expect `date_of_birth` in the payload. For home
-            # nurses we also accept `date_of_birth` (mirroring the maid
-            # field) but some clients may send `nurse_date_of_birth`, so we
-            # fall back to that key as well.
-            dob_str = None
-            if user_type == 'maid':
-                dob_str = request.data.get('date_of_birth')
-            elif user_type == 'home_nurse':
-                dob_str = request.data.get('date_of_birth') or request.data.get('nurse_date_of_birth')
-
-            if user_type in ['maid', 'home_nurse'] and dob_str:
-                try:
-                    dob = date.fromisoformat(dob_str)
-                    today = date.today()
-                    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                    if age < 18:
-                        return Response({
-                            'date_of_birth': ['You must be at least 18 years old to register for this role.']
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                except ValueError:
-                    pass
-
-            user = serializer.save()
-            
-            # Create profile based on user type
-            if user.user_type == 'maid':
-                # Get maid biodata from request
-                profile_data = {
-                    'user': user,
-                    'full_name': request.data.get('full_name', ''),
-                    'date_of_birth': request.data.get('date_of_birth'),
-                    'location': request.data.get('location', ''),
-                    'latitude': request.data.get('latitude'),
-                    'longitude': request.data.get('longitude'),
-                    'phone_number': request.data.get('phone_number', ''),
-                    'email': request.data.get('email', '')  # Optional email from account
-                }
-                
-                # Handle profile photo upload
-                if 'profile_photo' in request.FILES:
-                    profile_data['profile_photo'] = request.FILES['profile_photo']
-                
-                MaidProfile.objects.create(**profile_data)
-            elif user.user_type == 'homeowner':
-                # Get home details from request
-                home_address = request.data.get('home_address', '')
-                home_type = request.data.get('home_type', 'apartment')
-                number_of_rooms = request.data.get('number_of_rooms', 1)
-                
-                HomeownerProfile.objects.create(
-                    user=user,
-                    home_address=home_address,
-                    home_type=home_type,
-                    number_of_rooms=number_of_rooms
-                )
-            
-            # Issue a JWT access token so the SPA can authenticate immediately
-            access_token = generate_access_token(user)
+        serializer, error = _validate_registration(request.data)
+        if error:
+            return Response(*error)
 
-            return Response({
-                'message': 'User registered successfully',
-                'user': UserSerializer(user).data,
-                'access': access_token,
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        password = serializer.validated_data.get('password')
+        password_hash = hashing.make_password(password) if password else None
+        return Response(*_complete_registration(serializer, request.data, request.FILES, password_hash))
+
+
+def _password_login_lookup(data):
+    """Everything in a password login that happens before the hash check.
+
+    Returns ``(user, password, None)`` or ``(None, None, (payload, status))``.
+    """
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return None, None, (serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    phone = serializer.validated_data["phone_number"].strip()
+    password = serializer.validated_data["password"]
+
+    try:
+        user = User.objects.get_by_phone(phone)
+    except User.DoesNotExist:
+        return None, None, (
+            {"error": "No account found with this phone number."},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    # Deactivated accounts (e.g. deactivated cleaning companies) should get
+    # an explicit message so users understand the account is not usable.
+    if not getattr(user, "is_active", True):
+        return None, None, (
+            {"error": "This account has been deactivated. Please contact support if you believe this is a mistake."},
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    if not user.has_usable_password():
+        return None, None, (
+            {"error": "This account does not have a password yet. Please set your password first."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    return user, password, None
 
 
-class PasswordLoginView(APIView):
+def _password_login_result(user):
+    """Response for a user whose password checked out: ``(payload, status)``."""
+    # Reuse the same blocking logic as OTP login for disabled accounts.
+    try:
+        if user.user_type == 'homeowner' and hasattr(user, 'homeowner_profile'):
+            if not user.homeowner_profile.is_active:
+                return {
+                    'error': 'Your account is blocked. Please contact the MaidMatch team for support.'
+                }, status.HTTP_403_FORBIDDEN
+        if user.user_type == 'maid' and hasattr(user, 'maid_profile'):
+            if not user.maid_profile.is_enabled:
+                return {
+                    'error': 'Your account is blocked. Please contact the MaidMatch team for support.'
+                }, status.HTTP_403_FORBIDDEN
+    except Exception:
+        pass
+
+    return {
+        'message': 'Login successful',
+        'user': UserSerializer(user).data,
+        **issue_tokens(user),
+    }, status.HTTP_200_OK
+
+
+INCORRECT_PASSWORD = ({"error": "Incorrect password."}, status.HTTP_401_UNAUTHORIZED)
+
+
+class PasswordLoginView(TokenBucketThrottleMixin, APIView):
     """Phone number + password login at /api/accounts/login/.
 
     This replaces the previous OTP login at this URL. The OTP endpoints are
@@ -150,66 +272,110 @@ class PasswordLoginView(APIView):
 
     permission_classes = [permissions.AllowAny]
     authentication_classes = []
+    throttle_classes = LOGIN_THROTTLES
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        user, password, error = _password_login_lookup(request.data)
+        if error:
+            return Response(*error)
+
+        if not hashing.check_password(user, password):
+            return Response(*INCORRECT_PASSWORD)
+
+        return Response(*_password_login_result(user))
+
+
+def _async_request(request):
+    """Wrap ``request`` so the async views parse bodies and throttle like DRF views."""
+    return Request(request, parsers=[JSONParser(), FormParser(), MultiPartParser()])
+
+
+def _json_response(result):
+    payload, code = result
+    return JsonResponse(payload, status=code)
+
 
-        phone = serializer.validated_data["phone_number"].strip()
-        password = serializer.validated_data["password"]
+def _throttled_response(wait):
+    wait = math.ceil(wait)
+    response = JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {wait} seconds.'},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response['Retry-After'] = str(wait)
+    return response
 
+
+def _overloaded_response(exc):
+    response = JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+    response['Retry-After'] = str(exc.wait)
+    return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncUserRegistrationView(View):
+    """Async variant of UserRegistrationView, used when ASYNC_AUTH_VIEWS is on.
+
+    Under ASGI the worker is free while the password hashes on the bounded
+    pool; database work still goes through ``sync_to_async``.
+    """
+
+    async def post(self, request):
+        request = _async_request(request)
         try:
-            user = User.objects.get(phone_number=phone)
-        except User.DoesNotExist:
-            return Response(
-                {"error": "No account found with this phone number."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        # Deactivated accounts (e.g. deactivated cleaning companies) should get
-        # an explicit message so users understand the account is not usable.
-        if not getattr(user, "is_active", True):
-            return Response(
-                {"error": "This account has been deactivated. Please contact support if you believe this is a mistake."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
-        if not user.has_usable_password():
-            return Response({"error": "This account does not have a password yet. Please set your password first."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if not user.check_password(password):
-            return Response({"error": "Incorrect password."}, status=status.HTTP_401_UNAUTHORIZED)
-
-        # Reuse the same blocking logic as OTP login for disabled accounts.
+            data = request.data
+        except exceptions.ParseError as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+        serializer, error = await sync_to_async(_validate_registration)(data)
+        if error:
+            return _json_response(error)
+
+        password = serializer.validated_data.get('password')
         try:
-            if user.user_type == 'homeowner' and hasattr(user, 'homeowner_profile'):
-                if not user.homeowner_profile.is_active:
-                    return Response({
-                        'error': 'Your account is blocked. Please contact the MaidMatch team for support.'
-                    }, status=status.HTTP_403_FORBIDDEN)
-            if user.user_type == 'maid' and hasattr(user, 'maid_profile'):
-                if not user.maid_profile.is_enabled:
-                    return Response({
-                        'error': 'Your account is blocked. Please contact the MaidMatch team for support.'
-                    }, status=status.HTTP_403_FORBIDDEN)
-        except Exception:
-            pass
+            password_hash = await hashing.amake_password(password) if password else None
+        except hashing.HashingOverloaded as exc:
+            return _overloaded_response(exc)
 
-        token = generate_access_token(user)
-        return Response({
-            'message': 'Login successful',
-            'user': UserSerializer(user).data,
-            'access': token,
-        }, status=status.HTTP_200_OK)
+        return _json_response(
+            await sync_to_async(_complete_registration)(serializer, data, request.FILES, password_hash)
+        )
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class SendLoginPinView(APIView):
+class AsyncPasswordLoginView(View):
+    """Async variant of PasswordLoginView, used when ASYNC_AUTH_VIEWS is on."""
+
+    async def post(self, request):
+        request = _async_request(request)
+        try:
+            data = request.data
+        except exceptions.ParseError as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+        wait = await sync_to_async(throttle_wait)(request, self, LOGIN_THROTTLES)
+        if wait:
+            return _throttled_response(wait)
+
+        user, password, error = await sync_to_async(_password_login_lookup)(data)
+        if error:
+            return _json_response(error)
+
+        try:
+            if not await hashing.acheck_password(user, password):
+                return _json_response(INCORRECT_PASSWORD)
+        except hashing.HashingOverloaded as exc:
+            return _overloaded_response(exc)
+
+        return _json_response(await sync_to_async(_password_login_result)(user))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class SendLoginPinView(TokenBucketThrottleMixin, APIView):
     # Allow anonymous access and bypass JWT authentication entirely. We rely
     # only on the submitted phone number for this endpoint.
     permission_classes = [permissions.AllowAny]
     authentication_classes = []
+    throttle_classes = OTP_SEND_THROTTLES
 
     def post(self, request):
         serializer = SendLoginPinSerializer(data=request.data)
@@ -218,23 +384,21 @@ class SendLoginPinView(APIView):
 
         phone_number = serializer.validated_data["phone_number"].strip()
         try:
-            user = User.objects.get(phone_number=phone_number)
+            user = User.objects.get_by_phone(phone_number)
         except User.DoesNotExist:
             return Response({"error": "No account found with this phone number"}, status=status.HTTP_404_NOT_FOUND)
 
-        LoginOTP.objects.filter(user=user, is_used=False).update(is_used=True)
+        code = otp.issue_login_otp(user)
 
-        code = f"{random.randint(0, 999999):06d}"
-        LoginOTP.objects.create(user=user, code=code)
-
-        message = f"Your MaidMatch login code is {code}. It will expire in 5 minutes."
+        message = f"Your MaidMatch login code is {code}. It will expire in {otp.ttl_text()}."
         send_whatsapp_message(phone_number, message)
+        OTP_SENT.labels("whatsapp").inc()
 
         return Response({"message": "Login code sent via WhatsApp"}, status=status.HTTP_200_OK)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class UserLoginView(APIView):
+class UserLoginView(TokenBucketThrottleMixin, APIView):
     """
     API endpoint for user login
     """
@@ -242,6 +406,7 @@ class UserLoginView(APIView):
     # based only on phone number + one-time PIN, not on any existing token.
     permission_classes = [permissions.AllowAny]
     authentication_classes = []
+    throttle_classes = OTP_VERIFY_THROTTLES
     
     def post(self, request):
         serializer = VerifyLoginPinSerializer(data=request.data)
@@ -252,7 +417,7 @@ class UserLoginView(APIView):
         pin = serializer.validated_data["pin"]
 
         try:
-            user = User.objects.get(phone_number=phone_number)
+            user = User.objects.get_by_phone(phone_number)
         except User.DoesNotExist:
             return Response({"error": "Invalid code or phone number"}, status=status.HTTP_401_UNAUTHORIZED)
         # Temporary static codes while WhatsApp API integration is being finalized.
@@ -261,29 +426,19 @@ class UserLoginView(APIView):
         static_pins = {"1111", "2222", "3333", "4444"}
 
         if pin in static_pins:
-            token = generate_access_token(user)
             return Response({
                 "message": "Login successful",
                 "user": UserSerializer(user).data,
-                "access": token,
+                **issue_tokens(user),
             }, status=status.HTTP_200_OK)
 
-        otp = (
-            LoginOTP.objects.filter(user=user, code=pin, is_used=False)
-            .order_by("-created_at")
-            .first()
-        )
-
-        if otp is None:
-            return Response({"error": "Invalid code or phone number"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        if timezone.now() - otp.created_at > timedelta(minutes=5):
-            otp.is_used = True
-            otp.save(update_fields=["is_used"])
+        result = otp.verify_login_otp(user, pin)
+        if result == otp.EXPIRED:
             return Response({"error": "Code has expired. Please request a new one."}, status=status.HTTP_400_BAD_REQUEST)
-
-        otp.is_used = True
-        otp.save(update_fields=["is_used"])
+        if result == otp.LOCKED:
+            return Response({"error": "Too many incorrect attempts. Please request a new code."}, status=status.HTTP_400_BAD_REQUEST)
+        if result != otp.VALID:
+            return Response({"error": "Invalid code or phone number"}, status=status.HTTP_401_UNAUTHORIZED)
 
         try:
             if user.user_type == 'homeowner' and hasattr(user, 'homeowner_profile'):
@@ -299,23 +454,52 @@ class UserLoginView(APIView):
         except Exception:
             pass
 
-        token = generate_access_token(user)
         return Response({
             'message': 'Login successful',
             'user': UserSerializer(user).data,
-            'access': token,
+            **issue_tokens(user),
         }, status=status.HTTP_200_OK)
 
 
+class TokenRefreshView(APIView):
+    """Exchange a refresh token for a new access + refresh token pair.
+
+    Refresh tokens are single use; the account's blocked/active state is
+    re-checked on every refresh.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        refresh = request.data.get('refresh')
+        if not refresh:
+            return Response({'error': 'refresh is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            _, tokens = rotate_refresh_token(refresh)
+        except exceptions.AuthenticationFailed as exc:
+            return Response({'error': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+        except exceptions.PermissionDenied as exc:
+            return Response({'error': exc.detail}, status=status.HTTP_403_FORBIDDEN)
+        return Response(tokens, status=status.HTTP_200_OK)
+
+
 class UserLogoutView(APIView):
     """
     API endpoint for user logout
+
+    Revokes the presented access token and, if ``refresh`` is posted, the
+    refresh token chain of this device.
     """
     permission_classes = [permissions.AllowAny]
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        logout(request)
+        end_session(request)
+        if isinstance(request.auth, dict):
+            revoke_access_token(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            revoke_refresh_token(refresh, request.user)
         return Response({
             'message': 'Logout successful'
         }, status=status.HTTP_200_OK)
@@ -361,8 +545,10 @@ class UserViewSet(viewsets.ModelViewSet):
             user = request.user
             try:
                 with transaction.atomic():
-                    logout(request)
+                    end_session(request)
                     user.delete()
+                if isinstance(request.auth, dict):
+                    revoke_access_token(request.auth)
             except Exception as exc:
                 return Response(
                     {'error': 'Account deletion failed', 'detail': str(exc)},
@@ -380,13 +566,13 @@ class UserViewSet(viewsets.ModelViewSet):
             user = request.user
             
             # Check old password
-            if not user.check_password(serializer.validated_data['old_password']):
+            if not hashing.check_password(user, serializer.validated_data['old_password']):
                 return Response({
                     'error': 'Old password is incorrect'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Set new password
-            user.set_password(serializer.validated_data['new_password'])
+            hashing.set_password(user, serializer.validated_data['new_password'])
             user.save()
             
             return Response({
@@ -412,6 +598,6 @@ class UserViewSet(viewsets.ModelViewSet):
         if user.has_usable_password():
             return Response({"error": "Password already set for this account."}, status=status.HTTP_400_BAD_REQUEST)
 
-        user.set_password(serializer.validated_data['new_password'])
+        hashing.set_password(user, serializer.validated_data['new_password'])
         user.save()
         return Response({"message": "Password set successfully"}, status=status.HTTP_200_OK)
@@ -0,0 +1,137 @@
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from backend.middleware import gzip_bytes
+from homeowner.models import HomeownerProfile, Job
+from homeowner.serializers import JobListSerializer
+from maid.models import MaidProfile
+from maid.serializers import MaidProfileListSerializer
+
+LOCATIONS = ["Kampala, Ntinda", "Kampala, Kansanga", "Entebbe", "Mukono", "Wakiso, Kira", "Jinja"]
+SKILLS = ["Cleaning", "Cooking", "Laundry", "Childcare", "Ironing", "Gardening", "Elderly care"]
+
+
+class Command(BaseCommand):
+    help = "Measure gzip CPU cost versus bytes saved on typical API payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Rows per list payload")
+        parser.add_argument("--levels", default="1,4,6,9", help="Comma-separated gzip levels")
+        parser.add_argument("--repeat", type=int, default=20, help="Compressions per measurement")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        rows = options["rows"]
+        levels = [int(level) for level in options["levels"].split(",")]
+        payloads = {
+            f"maids available ({rows})": self._maid_list(rng, rows),
+            f"job list ({rows})": self._job_list(rng, rows),
+            "support ticket (40 msgs)": self._ticket(rng, 40),
+            f"export_maids csv ({rows * 10})": self._maid_csv(rng, rows * 10),
+        }
+
+        self.stdout.write(f"{'payload':<28}{'level':>6}{'raw B':>10}{'gz B':>10}{'ratio':>8}{'ms':>9}{'MB/s':>9}")
+        for name, body in payloads.items():
+            for level in levels:
+                start = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    compressed = gzip_bytes(body, level)
+                elapsed = (time.perf_counter() - start) / options["repeat"]
+                self.stdout.write(
+                    f"{name:<28}{level:>6}{len(body):>10}{len(compressed):>10}"
+                    f"{len(compressed) / len(body):>8.2f}{elapsed * 1000:>9.2f}"
+                    f"{len(body) / elapsed / 1e6:>9.1f}"
+                )
+        self.stdout.write(self.style.SUCCESS("Done. Lower ratio = fewer bytes on the wire."))
+
+    # Payload builders use unsaved model instances run through the real
+    # serializers, so no database rows are needed.
+
+    def _maid_list(self, rng, count):
+        maids = []
+        for i in range(count):
+            user = User(id=i + 1, username=f"maid{i}", gender=rng.choice(["female", "male"]))
+            maids.append(MaidProfile(
+                id=i + 1,
+                user=user,
+                full_name=f"Maid Number {i}",
+                date_of_birth=date(1985 + i % 15, 1 + i % 12, 1 + i % 28),
+                category=rng.choice(["temporary", "live_in", "placement"]),
+                location=rng.choice(LOCATIONS),
+                phone_number=f"+2567{rng.randint(10000000, 99999999)}",
+                skills=", ".join(rng.sample(SKILLS, 3)),
+                bio="Hard-working and reliable, experienced with families and children.",
+                experience_years=rng.randint(0, 15),
+                hourly_rate=Decimal(rng.randint(3, 20) * 1000),
+                rating=Decimal("4.50"),
+                is_verified=True,
+                created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc) + timedelta(hours=i),
+            ))
+        data = MaidProfileListSerializer(maids, many=True, context={}).data
+        return JSONRenderer().render(data)
+
+    def _job_list(self, rng, count):
+        homeowner = HomeownerProfile(id=1, user=User(id=1, username="homeowner1"))
+        jobs = []
+        for i in range(count):
+            job = Job(
+                id=i + 1,
+                homeowner=homeowner,
+                title="House cleaning and laundry",
+                description="Need help with general cleaning, laundry and ironing for a 3 bedroom house.",
+                location=rng.choice(LOCATIONS),
+                job_date=date(2025, 1, 1) + timedelta(days=i % 30),
+                start_time="08:00",
+                end_time="17:00",
+                hourly_rate=Decimal("5000.00"),
+                created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc) + timedelta(hours=i),
+            )
+            job.num_applications = rng.randint(0, 10)
+            jobs.append(job)
+        return JSONRenderer().render(JobListSerializer(jobs, many=True, context={}).data)
+
+    def _ticket(self, rng, messages):
+        data = {
+            "id": 1,
+            "topic": "payments",
+            "subject": "Payment not reflected on my account",
+            "status": "open",
+            "created_by": 7,
+            "created_by_name": "homeowner1",
+            "created_by_type": "homeowner",
+            "messages": [
+                {
+                    "id": i,
+                    "ticket": 1,
+                    "sender": rng.choice([7, 1]),
+                    "sender_name": rng.choice(["homeowner1", "admin"]),
+                    "sender_type": rng.choice(["homeowner", "admin"]),
+                    "body": "I paid via MTN Mobile Money but my subscription is still not active. " * rng.randint(1, 3),
+                    "created_at": f"2025-01-01T10:{i % 60:02d}:00Z",
+                }
+                for i in range(messages)
+            ],
+        }
+        return JSONRenderer().render(data)
+
+    def _maid_csv(self, rng, count):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["Name", "Age", "Gender", "Phone number", "Location"])
+        for i in range(count):
+            writer.writerow([
+                f"Maid Number {i}",
+                rng.randint(18, 50),
+                rng.choice(["female", "male"]),
+                f"+2567{rng.randint(10000000, 99999999)}",
+                rng.choice(LOCATIONS),
+            ])
+        return out.getvalue().encode("utf-8")
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts import hashing
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare password-login throughput per core: hashing inline on the request "
+        "worker (the old path) versus the bounded hashing pool, sync and async"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=64, help="Simultaneous logins (storm size)")
+        parser.add_argument("--logins", type=int, default=400, help="Logins per configuration")
+        parser.add_argument("--threads", type=int, default=0, help="Hashing pool threads (0 = one per CPU)")
+        parser.add_argument("--max-pending", type=int, default=32, help="Hashing pool queue depth")
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        user = User(username="bench", phone_number="+256700000000")
+        user.set_password("correct horse battery staple")
+
+        overrides = {
+            "PASSWORD_HASH_THREADS": options["threads"],
+            "PASSWORD_HASH_MAX_PENDING": options["max_pending"],
+        }
+        with override_settings(**overrides):
+            hashing._executor = None
+            workers = hashing.get_executor().workers
+            results = {
+                "inline (sync)": self._run_threads(user.check_password, options),
+                "bounded pool (sync)": self._run_threads(
+                    lambda raw: hashing.check_password(user, raw), options
+                ),
+                "bounded pool (async)": asyncio.run(self._run_async(user, options)),
+            }
+        hashing._executor = None
+
+        self.stdout.write(
+            f"{cores} CPUs, pool of {workers} threads + {options['max_pending']} pending, "
+            f"{options['concurrency']} concurrent logins"
+        )
+        self.stdout.write(
+            f"{'path':<22}{'ok/s':>9}{'ok/s/core':>11}{'shed':>7}{'p50 ms':>9}{'p99 ms':>9}"
+        )
+        for label, (elapsed, latencies, shed) in results.items():
+            rate = len(latencies) / elapsed
+            p50, p99 = self._percentiles(latencies)
+            self.stdout.write(
+                f"{label:<22}{rate:>9.1f}{rate / cores:>11.1f}{shed:>7}{p50:>9.1f}{p99:>9.1f}"
+            )
+
+    def _run_threads(self, check, options):
+        """One thread per simulated sync worker, all logging in at once."""
+        remaining = [options["logins"]]
+        lock = threading.Lock()
+        latencies, shed = [], [0]
+
+        def worker():
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    assert check("correct horse battery staple")
+                except hashing.HashingOverloaded:
+                    with lock:
+                        shed[0] += 1
+                    # A shed request returns at once; clients back off before retrying.
+                    time.sleep(0.01)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, shed[0]
+
+    async def _run_async(self, user, options):
+        """One task per in-flight request on a single event loop."""
+        queue = asyncio.Queue()
+        for _ in range(options["logins"]):
+            queue.put_nowait(None)
+        latencies, shed = [], 0
+
+        async def worker():
+            nonlocal shed
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    assert await hashing.acheck_password(user, "correct horse battery staple")
+                except hashing.HashingOverloaded:
+                    shed += 1
+                    # A shed request returns at once; clients back off before retrying.
+                    await asyncio.sleep(0.01)
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+        return time.perf_counter() - start, latencies, shed
+
+    @staticmethod
+    def _percentiles(latencies):
+        if len(latencies) < 2:
+            return 0.0, 0.0
+        cuts = statistics.quantiles(latencies, n=100)
+        return cuts[49] * 1000, cuts[98] * 1000
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+# The stack as it was before the cookie middleware became route-scoped.
+FULL_COOKIE_STACK = {
+    "backend.middleware.RouteScopedSessionMiddleware": "django.contrib.sessions.middleware.SessionMiddleware",
+    "backend.middleware.RouteScopedCsrfViewMiddleware": "django.middleware.csrf.CsrfViewMiddleware",
+    "backend.middleware.RouteScopedAuthenticationMiddleware": "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend.middleware.RouteScopedMessageMiddleware": "django.contrib.messages.middleware.MessageMiddleware",
+}
+
+
+class Command(BaseCommand):
+    help = "Compare per-request overhead of the full cookie middleware stack versus the route-scoped one on /api/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/cleaning-company/ping/", help="API path to request")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--session-cookie",
+            action="store_true",
+            help="Send a sessionid cookie, as browsers that also used the admin do",
+        )
+
+    def handle(self, *args, **options):
+        full = [FULL_COOKIE_STACK.get(path, path) for path in settings.MIDDLEWARE]
+        results = {}
+        for label, middleware in (("full cookie stack", full), ("route-scoped", list(settings.MIDDLEWARE))):
+            with override_settings(MIDDLEWARE=middleware):
+                results[label] = self._run(options)
+
+        self.stdout.write(f"{'config':<20}{'us/request':>12}{'queries/request':>18}")
+        for label, (per_request, queries) in results.items():
+            self.stdout.write(f"{label:<20}{per_request * 1e6:>12.1f}{queries:>18.2f}")
+        saved = results["full cookie stack"][0] - results["route-scoped"][0]
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved * 1e6:.1f} us per request on {options['path']}"))
+
+    def _run(self, options):
+        client = Client()
+        if options["session_cookie"]:
+            client.cookies[settings.SESSION_COOKIE_NAME] = "0" * 32
+        # Warm up (loads middleware, resolves URLs, imports views).
+        for _ in range(20):
+            client.get(options["path"])
+
+        count = options["requests"]
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(count):
+                client.get(options["path"])
+            elapsed = time.perf_counter() - start
+        return elapsed / count, len(queries) / count
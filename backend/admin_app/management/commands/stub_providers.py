@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from backend.stub_providers import OUTCOMES, build_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Run local stand-ins for the Pesapal and WhatsApp APIs. Point PESAPAL_BASE_URL at "
+        "http://HOST:PORT/v3 and WHATSAPP_API_BASE_URL at http://HOST:PORT/v20.0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each response")
+        parser.add_argument("--outcome", choices=[*OUTCOMES, "random"], default="completed")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of calls answered with 500")
+
+    def handle(self, *args, **options):
+        server = build_server(
+            options["host"], options["port"], options["delay"], options["outcome"], options["fail_rate"],
+        )
+        base = f"http://{options['host']}:{server.server_port}"
+        self.stdout.write(f"Pesapal stub on {base}/v3, WhatsApp stub on {base}/v20.0")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,77 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a minimal OTLP/HTTP JSON trace collector for local use "
+        "(TRACING_EXPORTER=otlp). Prints a per-trace summary and optionally "
+        "appends received spans to a JSON-lines file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=4318)
+        parser.add_argument("--output", help="Append received spans to this JSON-lines file")
+
+    def handle(self, *args, **options):
+        command = self
+        output = options["output"]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/traces":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self.send_error(400, "Expected OTLP JSON")
+                    return
+                spans = [
+                    item
+                    for resource in payload.get("resourceSpans", [])
+                    for scope in resource.get("scopeSpans", [])
+                    for item in scope.get("spans", [])
+                ]
+                command.report(spans)
+                if output:
+                    with open(output, "a", encoding="utf-8") as fh:
+                        for item in spans:
+                            fh.write(json.dumps(item) + "\n")
+                body = b"{}"
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options["host"], options["port"]), Handler)
+        self.stdout.write(f"Collecting traces on http://{options['host']}:{options['port']}/v1/traces")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def report(self, spans):
+        by_trace = {}
+        for item in spans:
+            by_trace.setdefault(item["traceId"], []).append(item)
+        for trace_id, items in by_trace.items():
+            # The server span; its parent may be remote (incoming traceparent).
+            root = next((item for item in items if item.get("kind") == 2), items[0])
+            duration = (int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])) / 1e6
+            db = [item for item in items if item["name"] == "db.query"]
+            db_ms = sum((int(i["endTimeUnixNano"]) - int(i["startTimeUnixNano"])) / 1e6 for i in db)
+            self.stdout.write(
+                f"{trace_id}  {root['name']:<45} {duration:>9.1f} ms  "
+                f"{len(items):>4} spans  {len(db):>3} queries ({db_ms:.1f} ms)"
+            )
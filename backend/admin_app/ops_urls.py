@@ -0,0 +1,17 @@
+from django.urls import path
+
+from .views import (
+    ProfileCaptureDetailView,
+    ProfileCaptureDownloadView,
+    ProfileCaptureListView,
+    QueryStatsReportView,
+    metrics_view,
+)
+
+urlpatterns = [
+    path("metrics/", metrics_view, name="ops-metrics"),
+    path("query-stats/", QueryStatsReportView.as_view(), name="ops-query-stats"),
+    path("profiles/", ProfileCaptureListView.as_view(), name="ops-profile-list"),
+    path("profiles/<str:capture_id>/", ProfileCaptureDetailView.as_view(), name="ops-profile-detail"),
+    path("profiles/<str:capture_id>/download/", ProfileCaptureDownloadView.as_view(), name="ops-profile-download"),
+]
@@ -1,7 +1,16 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
 from django.utils import timezone
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from backend import metrics, profiling, querystats
+from backend.idempotency import IdempotentCreateMixin
 
 from .models import SupportTicket, TicketMessage
 from .serializers import (
@@ -23,7 +32,17 @@ class IsAdminOrOwner(permissions.BasePermission):
         return obj.created_by_id == user.id
 
 
-class SupportTicketViewSet(viewsets.ModelViewSet):
+class IsStaffOrAdminUserType(permissions.BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user
+            and user.is_authenticated
+            and (user.is_staff or getattr(user, "user_type", None) == "admin")
+        )
+
+
+class SupportTicketViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = SupportTicket.objects.all().select_related("created_by").prefetch_related("messages")
     serializer_class = SupportTicketSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwner]
@@ -92,3 +111,75 @@ class SupportTicketViewSet(viewsets.ModelViewSet):
         ticket.satisfaction_comment = serializer.validated_data.get("satisfaction_comment", "")
         ticket.save(update_fields=["was_helped", "satisfaction_comment", "updated_at"])
         return Response({"detail": "Thank you for your feedback."})
+
+
+class QueryStatsReportView(APIView):
+    """Per-view query counts, DB time and likely N+1 templates for this worker.
+
+    Populated by ``backend.querystats.QueryStatsMiddleware`` when
+    ``QUERY_STATS_ENABLED`` is on. DELETE resets the totals.
+    """
+
+    permission_classes = [IsStaffOrAdminUserType]
+
+    def get(self, request):
+        return Response({
+            "enabled": bool(getattr(settings, "QUERY_STATS_ENABLED", False)),
+            "n_plus_one_threshold": getattr(settings, "QUERY_STATS_N_PLUS_ONE_THRESHOLD", 5),
+            "pid": os.getpid(),
+            "views": querystats.report.snapshot(),
+        })
+
+    def delete(self, request):
+        querystats.report.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint (see ``backend.metrics``)."""
+    token = getattr(settings, "METRICS_AUTH_TOKEN", "")
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
+class ProfileCaptureListView(APIView):
+    """Stored request profiles, newest first (see ``backend.profiling``)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(profiling.list_captures())
+
+
+class ProfileCaptureDetailView(APIView):
+    """Summary, SQL log and top functions of one capture; DELETE removes it."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, capture_id):
+        try:
+            return Response(profiling.load_capture(capture_id))
+        except FileNotFoundError:
+            raise Http404
+
+    def delete(self, request, capture_id):
+        profiling.delete_capture(capture_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProfileCaptureDownloadView(APIView):
+    """Raw cProfile output for ``pstats``/snakeviz."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, capture_id):
+        try:
+            path = profiling.profile_file(capture_id)
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{capture_id}.prof")
@@ -0,0 +1,173 @@
+"""SQLite-file cache backend shared by all worker processes on a host.
+
+Django's default local-memory cache is per process, so anything that must be
+seen by every worker (rate-limit buckets, the access-token denylist) needs a
+shared store. This backend keeps entries in one SQLite file in WAL mode:
+reads do not block each other, and read-modify-write operations (``incr``,
+``take_tokens``) run inside ``BEGIN IMMEDIATE`` so concurrent workers never
+lose an update. Multi-host deployments should point the same cache alias at
+a networked backend instead.
+
+    CACHES = {
+        "shared": {
+            "BACKEND": "backend.cache.SQLiteCache",
+            "LOCATION": "/var/tmp/maidmatch-cache.sqlite3",
+        },
+    }
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+)
+"""
+
+# Fraction of writes that also delete expired rows.
+CULL_PROBABILITY = 0.01
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Exclusive write transaction; reads inside it see the latest state."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        if random.random() < CULL_PROBABILITY:
+            conn.execute("DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
+    def _expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else time.time() + timeout
+
+    @staticmethod
+    def _live(row, now):
+        return row is not None and (row[1] is None or row[1] > now)
+
+    def _select(self, conn, key):
+        return conn.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+
+    def _store(self, conn, key, value, expires):
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._select(self._connection(), key)
+        if not self._live(row, time.time()):
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as conn:
+            self._store(conn, key, value, self._expiry(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as conn:
+            if self._live(self._select(conn, key), time.time()):
+                return False
+            self._store(conn, key, value, self._expiry(timeout))
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (self._expiry(timeout), key, time.time()),
+            )
+            return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as conn:
+            return conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._live(self._select(self._connection(), key), time.time())
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as conn:
+            row = self._select(conn, key)
+            if not self._live(row, time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            self._store(conn, key, value, row[1])
+        return value
+
+    def clear(self):
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_entries")
+
+    def take_tokens(self, key, rate, capacity, cost=1, peek=False, version=None):
+        """Atomically take ``cost`` tokens from the bucket stored at ``key``.
+
+        The bucket holds at most ``capacity`` tokens and refills at ``rate``
+        tokens per second. Returns 0 if the tokens were taken, otherwise the
+        number of seconds until enough will be available (nothing is taken).
+        With ``peek`` the bucket is only checked, never drawn from.
+        """
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as conn:
+            row = self._select(conn, key)
+            if self._live(row, now):
+                tokens, updated = pickle.loads(row[0])
+                tokens = min(capacity, tokens + (now - updated) * rate)
+            else:
+                tokens = capacity
+            if peek:
+                return 0 if tokens >= cost else (cost - tokens) / rate
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (cost - tokens) / rate
+            # The entry can go once the bucket would be full again anyway.
+            self._store(conn, key, (tokens, now), now + (capacity - tokens) / rate + 1)
+        return wait
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests.
+        pass
@@ -0,0 +1,121 @@
+"""Conditional GET (ETag / Last-Modified) for profile and list endpoints.
+
+Validators are computed from ``updated_at`` columns, row counts and the query
+string without serializing anything, so an unchanged resource costs one small
+query and is answered with ``304 Not Modified``. Lists only get an ETag: a
+row leaving the filter does not move the newest ``updated_at``, so a
+Last-Modified date would keep validating a stale copy.
+
+Responses are per-user (distance, ownership) so the requesting user's id is
+part of every ETag and responses are marked ``private``. The current date is
+included too because some fields (age) change at midnight.
+"""
+
+import hashlib
+from datetime import date
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def _request_parts(request):
+    params = sorted(request.query_params.lists()) if hasattr(request, "query_params") else []
+    return (request.path, params, getattr(request.user, "pk", None), date.today().isoformat())
+
+
+def _make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def object_validators(request, *instances):
+    """Return ``(etag, last_modified)`` for a response built from ``instances``.
+
+    Each instance must have an ``updated_at`` attribute; ``None`` entries are
+    skipped (e.g. an optional related profile).
+    """
+    stamps = [
+        (obj._meta.label_lower, obj.pk, obj.updated_at)
+        for obj in instances
+        if obj is not None
+    ]
+    last_modified = max((stamp for _, _, stamp in stamps if stamp), default=None)
+    return _make_etag(_request_parts(request), stamps), last_modified
+
+
+def queryset_validators(request, queryset, timestamp_fields=("updated_at",), extra=()):
+    """Return the ETag for a list rendered from ``queryset``.
+
+    Uses a single aggregate query: row count plus ``Max`` of each timestamp
+    field (related fields such as ``user__updated_at`` are allowed).
+    """
+    aggregates = {f"ts_{i}": Max(field) for i, field in enumerate(timestamp_fields)}
+    stats = queryset.order_by().aggregate(row_count=Count("pk"), **aggregates)
+    stamps = [stats[f"ts_{i}"] for i in range(len(timestamp_fields))]
+    return _make_etag(_request_parts(request), stats["row_count"], stamps, tuple(extra))
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """Return a 304 response if the client's cached copy is still valid, else None."""
+    django_request = getattr(request, "_request", request)
+    return get_conditional_response(
+        django_request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def apply_validators(response, etag, last_modified=None):
+    """Attach validators and revalidation headers to a 200 response."""
+    if response.status_code != 200:
+        return response
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+def conditional_object_response(request, build_response, *instances):
+    """Serve ``build_response()`` for ``instances`` unless the client's copy is fresh."""
+    etag, last_modified = object_validators(request, *instances)
+    cached = not_modified_response(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    return apply_validators(build_response(), etag, last_modified)
+
+
+class ConditionalListMixin:
+    """List view mixin answering ``If-None-Match`` with 304."""
+
+    conditional_timestamp_fields = ("updated_at",)
+
+    def get_conditional_extra(self):
+        """Extra state (besides the queryset) the rendered list depends on."""
+        return ()
+
+    def conditional_list_response(self, request, queryset, build_response):
+        etag = queryset_validators(
+            request,
+            queryset,
+            timestamp_fields=self.conditional_timestamp_fields,
+            extra=self.get_conditional_extra(),
+        )
+        cached = not_modified_response(request, etag)
+        if cached is not None:
+            return cached
+        return apply_validators(build_response(), etag)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_list_response(request, queryset, lambda: self.list_response(queryset))
+
+    def list_response(self, queryset):
+        """DRF's ``ListModelMixin.list`` for an already filtered ``queryset``."""
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
@@ -0,0 +1,114 @@
+"""Sparse fieldsets for list/detail serializers.
+
+Clients can ask for a subset of a serializer's fields with ``?fields=a,b`` or
+drop some with ``?omit=c,d``. Fields that are not requested are removed before
+serialization, so their SerializerMethodFields (distance, age, photo URLs) are
+never evaluated. Serializers can also declare which joins/prefetches each field
+needs so that views only load related rows for the fields actually returned.
+"""
+
+from rest_framework import serializers
+
+
+def _split(value):
+    if not value:
+        return set()
+    return {name.strip() for name in str(value).split(",") if name.strip()}
+
+
+def parse_fieldset_params(request):
+    """Return ``(fields, omit)`` from the request's query string.
+
+    ``fields`` is None when the client did not restrict the field list.
+    """
+    if request is None:
+        return None, set()
+    params = getattr(request, "query_params", None) or getattr(request, "GET", {})
+    fields = _split(params.get("fields")) or None
+    omit = _split(params.get("omit"))
+    return fields, omit
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin honouring ``?fields=`` / ``?omit=``.
+
+    Only the top-level serializer (or the child of a top-level ``many=True``
+    list) reads the query string; nested copies of the same serializer always
+    render in full. ``fields`` / ``omit`` can also be passed explicitly as
+    constructor kwargs.
+    """
+
+    #: field name -> select_related lookups it needs
+    select_related_fields = {}
+    #: field name -> prefetch_related lookups it needs
+    prefetch_related_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        self._requested_fields = kwargs.pop("fields", None)
+        self._omitted_fields = kwargs.pop("omit", None)
+        super().__init__(*args, **kwargs)
+
+    def _is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, omitted = self._requested_fields, self._omitted_fields
+        if requested is None and omitted is None and self._is_top_level():
+            requested, omitted = parse_fieldset_params(self.context.get("request"))
+        if requested:
+            for name in set(fields) - set(requested):
+                fields.pop(name)
+        for name in omitted or ():
+            fields.pop(name, None)
+        return fields
+
+    @classmethod
+    def requested_field_names(cls, request=None):
+        """Field names that will be rendered for this request."""
+        names = set(cls.Meta.fields)
+        requested, omitted = parse_fieldset_params(request)
+        if requested:
+            names &= requested
+        return names - omitted
+
+    @classmethod
+    def setup_queryset(cls, queryset, request=None):
+        """Load only the relations needed by the requested fields.
+
+        Any select_related/prefetch_related already on ``queryset`` is
+        replaced, so the serializer's declarations must be complete.
+        """
+        names = cls.requested_field_names(request)
+        selects = {
+            lookup
+            for name, lookups in cls.select_related_fields.items()
+            if name in names
+            for lookup in lookups
+        }
+        prefetches = {
+            lookup
+            for name, lookups in cls.prefetch_related_fields.items()
+            if name in names
+            for lookup in lookups
+        }
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if selects:
+            queryset = queryset.select_related(*sorted(selects))
+        if prefetches:
+            queryset = queryset.prefetch_related(*sorted(prefetches))
+        return queryset
+
+
+class SparseFieldsetViewMixin:
+    """Generic view mixin that lets a DynamicFieldsMixin serializer shape the queryset."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, DynamicFieldsMixin):
+            queryset = serializer_class.setup_queryset(queryset, self.request)
+        return queryset
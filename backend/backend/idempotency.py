@@ -0,0 +1,142 @@
+"""``Idempotency-Key`` support for POST endpoints.
+
+Clients that may retry a request (the mobile app on a flaky network) send an
+``Idempotency-Key`` header with a value unique to the operation, such as a
+UUID. The first request with a key runs normally, and its response is stored
+in ``IDEMPOTENCY_CACHE`` for ``IDEMPOTENCY_TTL`` seconds together with a
+fingerprint of the request. A retry with the same key gets the stored
+response back (body, status and the ``REPLAYED_HEADERS`` such as
+``Location``), with an ``Idempotent-Replayed: true`` header, without the view
+running again. Reusing a key for a different request is answered with 422.
+
+While the first request is still running, a duplicate waits up to
+``IDEMPOTENCY_LOCK_WAIT`` seconds for its response and then gets 409 with
+``Retry-After``. The lock is a ``cache.add`` entry, so it is shared by all
+workers when the cache is (``backend.cache.SQLiteCache``).
+
+Keys are scoped per user and path, and only authenticated requests take part.
+Server errors (5xx), 409 and 429 responses are not stored, so those can be
+retried with the same key.
+
+    class JobViewSet(IdempotentCreateMixin, viewsets.ModelViewSet): ...
+
+    class PaymentInitiateView(APIView):
+        @idempotent
+        def post(self, request): ...
+"""
+
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import RequestDataTooBig
+from django.http.request import RawPostDataException
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+NOT_STORED = {status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS}
+# Response headers that are part of the stored response.
+REPLAYED_HEADERS = ("Location", "Content-Location", "ETag", "Last-Modified")
+
+
+def _cache():
+    return caches[getattr(settings, "IDEMPOTENCY_CACHE", "default")]
+
+
+def fingerprint(request):
+    """Digest of what makes two requests "the same" for a key."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path(), request.content_type or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    try:
+        digest.update(request._request.body)
+    except (RequestDataTooBig, RawPostDataException):
+        # Large or already-consumed bodies are identified by their size only.
+        digest.update(str(request.META.get("CONTENT_LENGTH", "")).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _replay(stored):
+    response = Response(stored["data"], status=stored["status"], headers=stored.get("headers"))
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _error(detail, code, retry_after=None):
+    response = Response({"detail": detail}, status=code)
+    if retry_after:
+        response["Retry-After"] = str(retry_after)
+    return response
+
+
+def idempotent(handler):
+    """Make a DRF view handler (``post``/``create``) honour ``Idempotency-Key``."""
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not getattr(settings, "IDEMPOTENCY_ENABLED", True) or not request.user.is_authenticated:
+            return handler(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.", status.HTTP_400_BAD_REQUEST)
+
+        cache = _cache()
+        scope = hashlib.sha256(f"{request.user.pk}:{request.path}:{key}".encode("utf-8")).hexdigest()
+        cache_key, lock_key = f"idempotency:{scope}", f"idempotency-lock:{scope}"
+        request_fingerprint = fingerprint(request)
+
+        waited_until = time.monotonic() + settings.IDEMPOTENCY_LOCK_WAIT
+        while True:
+            stored = cache.get(cache_key)
+            if stored is None and cache.add(lock_key, True, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                # The first request may have finished between the two calls.
+                stored = cache.get(cache_key)
+                if stored is None:
+                    break
+                cache.delete(lock_key)
+            if stored is not None:
+                if stored["fingerprint"] != request_fingerprint:
+                    return _error(
+                        f"This {HEADER} was already used for a different request.",
+                        status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                return _replay(stored)
+            if time.monotonic() >= waited_until:
+                return _error(
+                    f"A request with this {HEADER} is still being processed.",
+                    status.HTTP_409_CONFLICT,
+                    retry_after=1,
+                )
+            time.sleep(0.1)
+
+        try:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code < 500 and response.status_code not in NOT_STORED:
+                cache.set(
+                    cache_key,
+                    {
+                        "fingerprint": request_fingerprint,
+                        "status": response.status_code,
+                        "data": response.data,
+                        "headers": {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+                    },
+                    settings.IDEMPOTENCY_TTL,
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
+
+
+class IdempotentCreateMixin:
+    """Viewset mixin: ``create`` honours ``Idempotency-Key``."""
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
@@ -0,0 +1,169 @@
+"""Structured logging.
+
+* ``RequestContextMiddleware`` assigns each request an id (taken from an
+  incoming ``X-Request-ID`` header when present) and echoes it back.
+* ``RequestContextFilter`` stamps every record with that request id and with
+  the user id and resolved view name of the current request.
+* ``JSONFormatter`` renders records as one JSON object per line, including
+  any ``extra={...}`` fields.
+* ``QueueingStreamHandler`` formats on the calling thread but does the write
+  from a background thread, so requests never block on stdout. When its queue
+  is full, records are dropped rather than stalling the request. The thread
+  is started on the first record in each process, so workers forked after
+  settings are loaded (gunicorn ``--preload``) get their own.
+* ``SamplingFilter`` keeps a fraction of low-severity records from noisy
+  loggers; warnings and errors always pass.
+
+Everything is wired up in ``LOGGING`` in settings.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+_current_request = ContextVar("current_request", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra``.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "user_id", "view", "request",
+}
+
+
+def current_request_id():
+    request = _current_request.get()
+    return getattr(request, "request_id", None) if request is not None else None
+
+
+class RequestContextMiddleware:
+    """Make the current request available to log records and tag it with an id."""
+
+    header = "X-Request-ID"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.headers.get(self.header, "")
+        request.request_id = incoming[:64] if incoming and incoming.isprintable() else uuid.uuid4().hex
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        response[self.header] = request.request_id
+        return response
+
+
+class RequestContextFilter(logging.Filter):
+    """Add ``request_id``, ``user_id`` and ``view`` to each record.
+
+    The user and view are read when the record is emitted: on API routes the
+    user is only known once DRF has authenticated the request.
+    """
+
+    def filter(self, record):
+        # django.request logs 4xx/5xx after the middleware chain has returned,
+        # but passes the request along on the record.
+        request = _current_request.get() or getattr(record, "request", None)
+        if request is None:
+            record.request_id = record.user_id = record.view = None
+            return True
+        record.request_id = getattr(request, "request_id", None)
+        user = getattr(request, "user", None)
+        record.user_id = user.pk if user is not None and user.is_authenticated else None
+        match = getattr(request, "resolver_match", None)
+        record.view = (match.view_name or match._func_path) if match else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only ``rate`` (0..1) of records below ``max_level``."""
+
+    def __init__(self, rate=1.0, max_level="INFO", name=""):
+        super().__init__(name)
+        self.rate = float(rate)
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "user_id": getattr(record, "user_id", None),
+            "view": getattr(record, "view", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str)
+
+
+class QueueingStreamHandler(logging.handlers.QueueHandler):
+    """Write formatted records to ``stream`` from a background thread."""
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        # Records arrive already formatted (see QueueHandler.prepare).
+        self.target.setFormatter(logging.Formatter("%(message)s"))
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self._stop_listener)
+
+    def _after_fork(self):
+        # The parent's thread does not exist here, and its queue or lock may
+        # have been mid-use at the fork.
+        self._start_lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=self.maxsize)
+        self.listener = None
+        self._pid = None
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.listener = logging.handlers.QueueListener(self.queue, self.target)
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _stop_listener(self):
+        # Flushes queued records; safe to call more than once.
+        if self._pid == os.getpid() and self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self._stop_listener()
+        super().close()
@@ -0,0 +1,161 @@
+"""Prometheus metrics.
+
+Request latency, status counts and in-flight requests are recorded by
+``MetricsMiddleware``; outbound calls are timed with ``observe_outbound``;
+business events increment the counters below. Everything is served in the
+Prometheus text format at ``/api/ops/metrics/``.
+
+Multi-worker deployments (gunicorn) must point ``PROMETHEUS_MULTIPROC_DIR``
+at an empty, writable directory shared by the workers before they start.
+Each worker then writes its samples to memory-mapped files there and the
+metrics endpoint aggregates all of them, whichever worker serves the scrape.
+Call ``mark_process_dead(worker.pid)`` from gunicorn's ``child_exit`` hook so
+gauges of exited workers are dropped.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .tracing import KIND_CLIENT, span
+
+REQUEST_LATENCY = Histogram(
+    "maidmatch_http_request_duration_seconds",
+    "Time spent handling a request, by resolved view.",
+    ["view", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSES = Counter(
+    "maidmatch_http_responses_total",
+    "Responses by resolved view and status code.",
+    ["view", "method", "status"],
+)
+IN_FLIGHT = Gauge(
+    "maidmatch_http_requests_in_flight",
+    "Requests currently being handled.",
+    multiprocess_mode="livesum",
+)
+OUTBOUND_LATENCY = Histogram(
+    "maidmatch_outbound_request_duration_seconds",
+    "Time spent in calls to external providers.",
+    ["provider", "operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0),
+)
+OTP_SENT = Counter(
+    "maidmatch_otp_sent_total",
+    "Login codes sent.",
+    ["channel"],
+)
+JOB_APPLICATIONS_CREATED = Counter(
+    "maidmatch_job_applications_created_total",
+    "Job applications created, by applicant type.",
+    ["applicant_type"],
+)
+THROTTLED = Counter(
+    "maidmatch_throttled_requests_total",
+    "Requests rejected by a rate limit, by throttle scope.",
+    ["scope"],
+)
+OUTBOX_EVENTS = Counter(
+    "maidmatch_outbox_events_total",
+    "Outbox event delivery attempts, by topic and outcome.",
+    ["topic", "outcome"],
+)
+
+
+def view_label(request):
+    """Low-cardinality label for the view that handled ``request``."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """Record latency, status code and in-flight count for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        RESPONSES.labels(view, request.method, str(response.status_code)).inc()
+        return response
+
+
+@contextmanager
+def observe_outbound(provider, operation):
+    """Time (and trace) a call to an external provider (``"pesapal"``, ``"whatsapp"``)."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(f"{provider}.{operation}", KIND_CLIENT, provider=provider):
+            yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        OUTBOUND_LATENCY.labels(provider, operation, outcome).observe(time.perf_counter() - start)
+
+
+class PaymentStatusCollector:
+    """Payment transactions by status and purpose, read from the database.
+
+    Collected at scrape time so the numbers are exact across workers and
+    include changes made from the admin or management commands.
+    """
+
+    def collect(self):
+        from django.db.models import Count
+
+        from payments.models import MobileMoneyTransaction
+
+        family = GaugeMetricFamily(
+            "maidmatch_payment_transactions",
+            "Mobile money transactions by status and purpose.",
+            labels=["status", "purpose"],
+        )
+        rows = (
+            MobileMoneyTransaction.objects.order_by()
+            .values_list("status", "purpose")
+            .annotate(n=Count("id"))
+        )
+        for tx_status, purpose, n in rows:
+            family.add_metric([tx_status, purpose], n)
+        yield family
+
+
+_db_registry = CollectorRegistry(auto_describe=False)
+_db_registry.register(PaymentStatusCollector())
+
+
+def render_latest():
+    """Return ``(body, content_type)`` for a scrape."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest(REGISTRY)
+    body += generate_latest(_db_registry)
+    return body, CONTENT_TYPE_LATEST
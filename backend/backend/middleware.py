@@ -0,0 +1,192 @@
+"""Project-wide middleware."""
+
+import gzip
+import secrets
+import zlib
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+
+DEFAULT_COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "text/csv",
+    "text/html",
+    "text/plain",
+)
+
+
+def _random_filename(max_random_bytes):
+    # A random-length file name in the gzip header varies the compressed size
+    # of identical bodies (BREACH mitigation, same approach as Django's
+    # GZipMiddleware).
+    length = 1 + secrets.randbelow(max_random_bytes)
+    return secrets.token_hex(length)[:length].encode("ascii")
+
+
+def gzip_bytes(data, level=6, max_random_bytes=100):
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if not max_random_bytes:
+        return compressed
+    header = bytearray(compressed[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + _random_filename(max_random_bytes) + b"\x00" + compressed[10:]
+
+
+def gzip_chunks(chunks, level=6, max_random_bytes=100):
+    """Compress an iterable of byte chunks, flushing after each one.
+
+    Flushing keeps streamed responses (CSV exports) flowing to the client
+    instead of buffering the whole body.
+    """
+    buf = BytesIO()
+    filename = _random_filename(max_random_bytes) if max_random_bytes else None
+    with gzip.GzipFile(filename=filename, mode="wb", compresslevel=level, fileobj=buf, mtime=0) as zfile:
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        for chunk in chunks:
+            zfile.write(chunk)
+            zfile.flush(zlib.Z_SYNC_FLUSH)
+            data = buf.getvalue()
+            if data:
+                yield data
+                buf.seek(0)
+                buf.truncate()
+    yield buf.getvalue()
+
+
+def compression_options(path):
+    """Resolve compression options for ``path`` from settings.
+
+    ``COMPRESSION_ROUTES`` is a list of ``(path_prefix, overrides)`` pairs;
+    the first matching prefix wins. Overrides may set ``enabled``,
+    ``min_size``, ``level`` and ``content_types``.
+    """
+    options = {
+        "enabled": getattr(settings, "COMPRESSION_ENABLED", True),
+        "min_size": getattr(settings, "COMPRESSION_MIN_SIZE", 1024),
+        "level": getattr(settings, "COMPRESSION_LEVEL", 6),
+        "content_types": getattr(settings, "COMPRESSION_CONTENT_TYPES", DEFAULT_COMPRESSION_CONTENT_TYPES),
+    }
+    for prefix, overrides in getattr(settings, "COMPRESSION_ROUTES", ()):
+        if path.startswith(prefix):
+            options.update(overrides)
+            break
+    return options
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Gzip JSON/CSV/HTML responses for clients that accept it.
+
+    Like Django's GZipMiddleware, but with a configurable size threshold,
+    compression level and content-type allowlist, and per-route overrides
+    (see ``compression_options``). Streaming responses are compressed chunk
+    by chunk.
+    """
+
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+
+        options = compression_options(request.path)
+        if not options["enabled"]:
+            return response
+
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in options["content_types"]:
+            return response
+
+        if not response.streaming and len(response.content) < options["min_size"]:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if not re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+            return response
+
+        level = options["level"]
+        if response.streaming:
+            if response.is_async:
+                original_iterator = response.streaming_content
+
+                async def gzip_wrapper():
+                    async for chunk in original_iterator:
+                        yield gzip_bytes(chunk, level, self.max_random_bytes)
+
+                response.streaming_content = gzip_wrapper()
+            else:
+                response.streaming_content = gzip_chunks(
+                    response.streaming_content, level, self.max_random_bytes
+                )
+            del response.headers["Content-Length"]
+        else:
+            compressed = gzip_bytes(response.content, level, self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "gzip"
+        return response
+
+
+def uses_cookie_stack(path):
+    """Whether ``path`` needs the session/CSRF/auth/messages middleware.
+
+    API routes authenticate with bearer tokens only, so they skip the cookie
+    stack; ``/admin/`` and any paths in ``STATELESS_PATH_EXCEPTIONS`` (e.g.
+    the CSRF cookie endpoint) keep it.
+    """
+    for prefix in getattr(settings, "STATELESS_PATH_EXCEPTIONS", ()):
+        if path.startswith(prefix):
+            return True
+    for prefix in getattr(settings, "STATELESS_PATH_PREFIXES", ()):
+        if path.startswith(prefix):
+            return False
+    return True
+
+
+class CookieRoutesOnlyMixin:
+    """Run the wrapped middleware only for routes that use cookies.
+
+    The wrapped classes subclass Django's own middleware so the admin's
+    system checks still find them in ``MIDDLEWARE``.
+    """
+
+    def __call__(self, request):
+        if not uses_cookie_stack(request.path_info):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class RouteScopedSessionMiddleware(CookieRoutesOnlyMixin, SessionMiddleware):
+    pass
+
+
+class RouteScopedCsrfViewMiddleware(CookieRoutesOnlyMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # process_view is invoked by the handler directly, not via __call__.
+        if not uses_cookie_stack(request.path_info):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class RouteScopedAuthenticationMiddleware(CookieRoutesOnlyMixin, AuthenticationMiddleware):
+    pass
+
+
+class RouteScopedMessageMiddleware(CookieRoutesOnlyMixin, MessageMiddleware):
+    pass
@@ -0,0 +1,88 @@
+"""Wake requests that are waiting for something to happen elsewhere.
+
+A long-polling view calls ``wait_for(topic, check, timeout)``. The code that
+makes the change calls ``notify(topic)`` once it is committed. There are two
+ways a waiter gets woken:
+
+* in-process: waiters in the same worker process block on an Event that
+  ``notify`` sets, so they return immediately;
+* across workers: ``notify`` also bumps a version stamp for the topic in
+  ``NOTIFY_CACHE``. Every ``NOTIFY_POLL_INTERVAL`` seconds each waiter reads
+  that stamp, which is one cheap cache read, and re-runs ``check`` only when
+  it moved.
+
+``check`` (typically one database query) is the source of truth. It runs
+when the wait starts, after each wake-up, and once more at the timeout, so a
+missed notification costs latency but never correctness.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_waiters = defaultdict(set)
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, "NOTIFY_CACHE", "default")]
+
+
+def _stamp_key(topic):
+    return f"notify:{topic}"
+
+
+def notify(topic):
+    """Wake everyone waiting on ``topic``, in this process and in others."""
+    _cache().set(_stamp_key(topic), time.time(), getattr(settings, "NOTIFY_STAMP_TTL", 300))
+    with _lock:
+        events = list(_waiters.get(topic, ()))
+    for event in events:
+        event.set()
+
+
+def waiting(topic=None):
+    """Number of requests in this process waiting (on ``topic``)."""
+    with _lock:
+        if topic is not None:
+            return len(_waiters.get(topic, ()))
+        return sum(len(events) for events in _waiters.values())
+
+
+def wait_for(topic, check, timeout, max_waiters=None):
+    """Return ``check()`` as soon as it is truthy, or its last value after
+    ``timeout`` seconds.
+
+    When ``max_waiters`` requests of this process are already waiting (on
+    any topic), ``check()`` is returned straight away instead.
+    """
+    cache = _cache()
+    poll_interval = getattr(settings, "NOTIFY_POLL_INTERVAL", 1.0)
+    event = threading.Event()
+    with _lock:
+        if max_waiters is not None and sum(len(events) for events in _waiters.values()) >= max_waiters:
+            return check()
+        _waiters[topic].add(event)
+    try:
+        stamp = cache.get(_stamp_key(topic))
+        result = check()
+        deadline = time.monotonic() + timeout
+        while not result:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return check()
+            woken = event.wait(min(poll_interval, left))
+            event.clear()
+            latest = cache.get(_stamp_key(topic))
+            if woken or latest != stamp:
+                stamp = latest
+                result = check()
+        return result
+    finally:
+        with _lock:
+            _waiters[topic].discard(event)
+            if not _waiters[topic]:
+                del _waiters[topic]
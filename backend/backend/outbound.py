@@ -0,0 +1,192 @@
+"""Outbound HTTP to external providers (Pesapal, WhatsApp).
+
+Every provider gets one ``ProviderClient`` (``get_client("pesapal")``),
+configured in ``OUTBOUND_PROVIDERS``:
+
+* connections are reused through one pooled ``requests.Session``;
+* at most ``MAX_CONCURRENCY`` calls to the provider are in flight per
+  process; further callers wait for a slot for at most ``QUEUE_TIMEOUT``
+  seconds (and never past their deadline) and then fail with
+  ``ProviderBusy`` instead of tying up a worker behind a slow provider;
+* timeouts are deadline-aware: ``with deadline(seconds):`` (and
+  ``OutboundDeadlineMiddleware`` for every request) caps the time all calls
+  in the block may take together, so two sequential 15 s calls cannot hold a
+  request for 30 s. Each call's timeout is the smaller of its own and what is
+  left of the deadline;
+* ``submit()`` runs work on the provider's bounded worker pool and returns a
+  future (fire-and-forget sends, fan-out); ``arequest()`` awaits a call from
+  async code the same way.
+
+Base URLs are settings, so the ``stub_providers`` management command can
+stand in for the real services locally and in tests.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from requests.adapters import HTTPAdapter
+
+from .metrics import observe_outbound
+
+
+class ProviderBusy(requests.RequestException):
+    """No concurrency slot for the provider became free in time."""
+
+
+class DeadlineExceeded(requests.RequestException):
+    """The deadline for outbound calls has passed."""
+
+
+_deadline = ContextVar("outbound_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """Limit the total time outbound calls made inside the block may take.
+
+    Nested deadlines can only shorten the enclosing one.
+    """
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+class OutboundDeadlineMiddleware:
+    """Give each request ``OUTBOUND_REQUEST_DEADLINE`` seconds for outbound calls."""
+
+    def __init__(self, get_response):
+        self.seconds = getattr(settings, "OUTBOUND_REQUEST_DEADLINE", None)
+        if not self.seconds:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with deadline(self.seconds):
+            return self.get_response(request)
+
+
+class ProviderClient:
+    def __init__(self, name, base_url, max_concurrency=8, timeout=15, connect_timeout=3.05, max_queued=None,
+                 queue_timeout=1.0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._queued = threading.BoundedSemaphore(max_queued or 4 * max_concurrency)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _budget(self, timeout):
+        budget = timeout or self.timeout
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f"No time left for {self.name} call")
+            budget = min(budget, left)
+        return budget
+
+    def request(self, method, path, operation, timeout=None, **kwargs):
+        """Make one call; ``operation`` names it in metrics and traces."""
+        with observe_outbound(self.name, operation):
+            budget = self._budget(timeout)
+            started = time.monotonic()
+            if not self._slots.acquire(timeout=min(budget, self.queue_timeout)):
+                raise ProviderBusy(f"All {self.max_concurrency} {self.name} connections are busy")
+            try:
+                budget -= time.monotonic() - started
+                if budget <= 0:
+                    raise DeadlineExceeded(f"No time left for {self.name} call")
+                return self.session.request(
+                    method,
+                    self.url(path),
+                    timeout=(min(self.connect_timeout, budget), budget),
+                    **kwargs,
+                )
+            finally:
+                self._slots.release()
+
+    def get(self, path, operation, **kwargs):
+        return self.request("GET", path, operation, **kwargs)
+
+    def post(self, path, operation, **kwargs):
+        return self.request("POST", path, operation, **kwargs)
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix=f"outbound-{self.name}"
+                )
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn`` (typically a call through this client) on the provider's
+        worker pool and return a Future.
+
+        The caller's deadline, trace and log context carry over. Raises
+        ``ProviderBusy`` at once when too many calls are already queued.
+        """
+        if not self._queued.acquire(blocking=False):
+            raise ProviderBusy(f"Too many queued {self.name} calls")
+        context = contextvars.copy_context()
+        try:
+            future = self._pool().submit(context.run, fn, *args, **kwargs)
+        except BaseException:
+            self._queued.release()
+            raise
+        future.add_done_callback(lambda _: self._queued.release())
+        return future
+
+    async def arequest(self, method, path, operation, **kwargs):
+        return await asyncio.wrap_future(self.submit(self.request, method, path, operation, **kwargs))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """The shared client for provider ``name`` (an ``OUTBOUND_PROVIDERS`` key)."""
+    with _clients_lock:
+        if name not in _clients:
+            config = settings.OUTBOUND_PROVIDERS[name]
+            _clients[name] = ProviderClient(
+                name,
+                config["BASE_URL"],
+                max_concurrency=config.get("MAX_CONCURRENCY", 8),
+                timeout=config.get("TIMEOUT", 15),
+                connect_timeout=config.get("CONNECT_TIMEOUT", 3.05),
+                max_queued=config.get("MAX_QUEUED"),
+                queue_timeout=config.get("QUEUE_TIMEOUT", 1.0),
+            )
+        return _clients[name]
@@ -0,0 +1,209 @@
+"""On-demand per-request profiling for staff users.
+
+A staff user adds ``X-Profile: 1`` (or ``?_profile=1``) to a request. The
+request is then run under cProfile while every SQL statement is logged with
+its timing, and the capture is written to ``PROFILING_DIR``: a ``.prof`` file
+(open with pstats or snakeviz) and a ``.json`` summary with the request
+details, the SQL log and the top functions by cumulative time. Only the newest
+``PROFILING_MAX_CAPTURES`` captures are kept.
+
+Captures are listed and downloaded through ``/api/ops/profiles/``. Bodies of
+streaming responses (CSV exports) are produced after the view returns and are
+not included in the profile.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework import exceptions
+
+from accounts.authentication import SimpleJWTAuthentication
+
+CAPTURE_ID_RE = re.compile(r"^[0-9]{20}-[0-9a-f]{8}$")
+
+# Only one cProfile profiler may be active per process.
+_profiler_lock = threading.Lock()
+
+
+def profiling_dir():
+    return getattr(settings, "PROFILING_DIR", os.path.join(settings.BASE_DIR, "profiles"))
+
+
+def _capture_path(capture_id, suffix):
+    if not CAPTURE_ID_RE.match(capture_id):
+        raise FileNotFoundError(capture_id)
+    return os.path.join(profiling_dir(), capture_id + suffix)
+
+
+def list_captures():
+    """Summaries of stored captures, newest first."""
+    directory = profiling_dir()
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        data.pop("queries", None)
+        data.pop("top_functions", None)
+        captures.append(data)
+    return captures
+
+
+def load_capture(capture_id):
+    with open(_capture_path(capture_id, ".json"), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def profile_file(capture_id):
+    """Path of the raw ``.prof`` file; raises FileNotFoundError if missing."""
+    path = _capture_path(capture_id, ".prof")
+    if not os.path.exists(path):
+        raise FileNotFoundError(capture_id)
+    return path
+
+
+def delete_capture(capture_id):
+    for suffix in (".json", ".prof"):
+        try:
+            os.remove(_capture_path(capture_id, suffix))
+        except FileNotFoundError:
+            pass
+
+
+def _prune(keep):
+    directory = profiling_dir()
+    ids = sorted(
+        {name.rsplit(".", 1)[0] for name in os.listdir(directory) if CAPTURE_ID_RE.match(name.rsplit(".", 1)[0])},
+        reverse=True,
+    )
+    for capture_id in ids[keep:]:
+        delete_capture(capture_id)
+
+
+def _top_functions(profiler, limit=40):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+class _SQLLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "sql": sql,
+                "params": repr(params)[:500],
+                "many": many,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def _profiling_requested(request):
+    return request.headers.get("X-Profile") == "1" or request.GET.get("_profile") == "1"
+
+
+def _staff_user(request):
+    """The requesting staff user, or None.
+
+    Cookie routes have ``request.user`` from the auth middleware; API routes
+    are authenticated by DRF inside the view, so the bearer token is checked
+    here (only for requests that ask to be profiled).
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = SimpleJWTAuthentication().authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        user = result[0] if result else None
+    if user is not None and user.is_staff:
+        return user
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile requests from staff users that ask for it (see module docstring)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _profiling_requested(request):
+            return self.get_response(request)
+        user = _staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        if not _profiler_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile-Skipped"] = "another request is being profiled"
+            return response
+        try:
+            return self._profile(request, user)
+        finally:
+            _profiler_lock.release()
+
+    def _profile(self, request, user):
+        profiler = cProfile.Profile()
+        sql_log = _SQLLog()
+        started_at = timezone.now()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(sql_log))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        capture_id = f"{started_at:%Y%m%d%H%M%S%f}-{secrets.token_hex(4)}"
+        match = getattr(request, "resolver_match", None)
+        summary = {
+            "id": capture_id,
+            "created_at": started_at.isoformat(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": (match.view_name or match._func_path) if match else None,
+            "user_id": user.pk,
+            "status_code": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "query_count": len(sql_log.queries),
+            "db_time_ms": round(sum(q["ms"] for q in sql_log.queries), 2),
+            "queries": sql_log.queries,
+            "top_functions": _top_functions(profiler),
+        }
+        os.makedirs(profiling_dir(), exist_ok=True)
+        profiler.dump_stats(_capture_path(capture_id, ".prof"))
+        with open(_capture_path(capture_id, ".json"), "w", encoding="utf-8") as fh:
+            json.dump(summary, fh)
+        _prune(getattr(settings, "PROFILING_MAX_CAPTURES", 50))
+
+        response["X-Profile-Id"] = capture_id
+        return response
@@ -0,0 +1,162 @@
+"""Per-request query counting, DB timing and N+1 detection.
+
+Enable with ``QUERY_STATS_ENABLED = True``. For every request the middleware
+records the number of queries, the total time spent in the database and how
+often each SQL template (the statement with its parameters left as
+placeholders) ran. A template executed more than
+``QUERY_STATS_N_PLUS_ONE_THRESHOLD`` times in one request is flagged as a
+likely N+1.
+
+Staff users get the numbers back in ``X-Query-*`` response headers, and the
+per-view totals are available from the admin report endpoint. Totals are kept
+in memory per worker process.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_in_list_re = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_space_re = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so that queries differing only by values compare equal."""
+    sql = _in_list_re.sub("(%s, ...)", sql)
+    sql = _literal_re.sub("?", sql)
+    return _space_re.sub(" ", sql).strip()
+
+
+class RequestQueryStats:
+    """Collects query stats for a single request via ``execute_wrapper``."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.templates[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        """Templates executed more than ``threshold`` times, most frequent first."""
+        return [(sql, n) for sql, n in self.templates.most_common() if n > threshold]
+
+
+class QueryStatsReport:
+    """Thread-safe per-view aggregation of RequestQueryStats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, stats, repeated):
+        with self._lock:
+            entry = self._views.setdefault(view_name, {
+                "requests": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_time_ms": 0.0,
+                "n_plus_one_requests": 0,
+                "n_plus_one": Counter(),
+            })
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            entry["db_time_ms"] += stats.duration * 1000
+            if repeated:
+                entry["n_plus_one_requests"] += 1
+                for sql, n in repeated:
+                    entry["n_plus_one"][sql] = max(entry["n_plus_one"][sql], n)
+
+    def snapshot(self):
+        with self._lock:
+            rows = []
+            for view_name, entry in self._views.items():
+                rows.append({
+                    "view": view_name,
+                    "requests": entry["requests"],
+                    "avg_queries": round(entry["queries"] / entry["requests"], 2),
+                    "max_queries": entry["max_queries"],
+                    "avg_db_time_ms": round(entry["db_time_ms"] / entry["requests"], 2),
+                    "n_plus_one_requests": entry["n_plus_one_requests"],
+                    "n_plus_one": [
+                        {"sql": sql, "max_per_request": n}
+                        for sql, n in entry["n_plus_one"].most_common(10)
+                    ],
+                })
+        return sorted(rows, key=lambda row: row["avg_queries"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+report = QueryStatsReport()
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return f"{request.method} {match.view_name or match._func_path}"
+
+
+def _is_staff(request):
+    # On /api/ routes the user is attached by DRF authentication during the view.
+    user = getattr(request, "user", None)
+    return bool(
+        getattr(user, "is_staff", False) or getattr(user, "user_type", "") == "admin"
+    )
+
+
+class QueryStatsMiddleware:
+    """Record query count, DB time and repeated SQL templates per request."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_STATS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, "QUERY_STATS_N_PLUS_ONE_THRESHOLD", 5)
+
+    def __call__(self, request):
+        stats = RequestQueryStats()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+
+        repeated = stats.repeated(self.threshold)
+        view_name = _view_name(request)
+        report.record(view_name, stats, repeated)
+        if repeated:
+            logger.warning(
+                "Possible N+1 in %s: %d queries, most repeated %dx: %s",
+                view_name, stats.count, repeated[0][1], repeated[0][0][:300],
+            )
+
+        if _is_staff(request):
+            response["X-Query-Count"] = str(stats.count)
+            response["X-Query-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+            if repeated:
+                sql, n = repeated[0]
+                digest = hashlib.md5(sql.encode("utf-8")).hexdigest()[:8]
+                response["X-Query-N-Plus-One"] = f"{len(repeated)} template(s); top {n}x [{digest}] {sql[:200]}"
+        return response
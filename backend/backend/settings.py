@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from corsheaders.defaults import default_headers
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,19 +55,43 @@ INSTALLED_APPS = [
     'cleaning_company',
     'home_nursing',
     'payments',
+    'outbox',
 ]
 
 MIDDLEWARE = [
+    # Request id / user / view for structured logs (see LOGGING).
+    'backend.logs.RequestContextMiddleware',
+    # Opt-in request tracing; no-op unless TRACING_ENABLED.
+    'backend.tracing.TracingMiddleware',
+    # Outermost so latency covers the whole middleware stack.
+    'backend.metrics.MetricsMiddleware',
+    # Shared time budget for outbound provider calls (OUTBOUND_REQUEST_DEADLINE).
+    'backend.outbound.OutboundDeadlineMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Opt-in query/DB-time instrumentation; no-op unless QUERY_STATS_ENABLED.
+    'backend.querystats.QueryStatsMiddleware',
+    # Compresses response bodies, so it must run after (i.e. be listed
+    # before) anything that reads or rewrites the body.
+    'backend.middleware.CompressionMiddleware',
+    # Session/CSRF/auth/messages only run for cookie-based routes (admin,
+    # CSRF endpoint); /api/ uses JWT bearer tokens. See STATELESS_PATH_*.
+    'backend.middleware.RouteScopedSessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'backend.middleware.RouteScopedCsrfViewMiddleware',
+    'backend.middleware.RouteScopedAuthenticationMiddleware',
+    # Staff-triggered cProfile captures (X-Profile: 1); needs request.user
+    # on cookie routes, so it comes after authentication.
+    'backend.profiling.ProfilingMiddleware',
+    'backend.middleware.RouteScopedMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Paths served without the session/CSRF/auth/messages middleware (token
+# auth only), and exceptions under those prefixes that still need cookies.
+STATELESS_PATH_PREFIXES = ['/api/']
+STATELESS_PATH_EXCEPTIONS = ['/api/accounts/csrf/']
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -165,10 +190,138 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # JSONRenderer that records a span while tracing.
+        'backend.tracing.TracedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Reverse proxies in front of the app. Client IPs (throttling) are read
+    # from X-Forwarded-For only this many hops back; 0 uses REMOTE_ADDR.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
+}
+
+# JWT lifetimes (accounts.authentication). Access tokens carry the user's
+# role/status claims and are short-lived; refresh tokens are stored
+# server-side and rotated on every use. Revoked access tokens are kept in
+# TOKEN_DENYLIST_CACHE until they expire - it must be shared by all workers.
+ACCESS_TOKEN_LIFETIME_MINUTES = config('ACCESS_TOKEN_LIFETIME_MINUTES', default=15, cast=int)
+REFRESH_TOKEN_LIFETIME_DAYS = config('REFRESH_TOKEN_LIFETIME_DAYS', default=30, cast=int)
+TOKEN_DENYLIST_CACHE = 'shared'
+
+# Password hashing pool (accounts.hashing). PBKDF2 runs on
+# PASSWORD_HASH_THREADS threads (0 = one per CPU); at most
+# PASSWORD_HASH_MAX_PENDING more calls may queue, beyond that requests get an
+# immediate 503 with Retry-After: PASSWORD_HASH_RETRY_AFTER.
+# ASYNC_AUTH_VIEWS routes register/login to async views (for ASGI servers).
+PASSWORD_HASH_THREADS = config('PASSWORD_HASH_THREADS', default=0, cast=int)
+PASSWORD_HASH_MAX_PENDING = config('PASSWORD_HASH_MAX_PENDING', default=32, cast=int)
+PASSWORD_HASH_TIMEOUT = config('PASSWORD_HASH_TIMEOUT', default=10, cast=int)
+PASSWORD_HASH_RETRY_AFTER = config('PASSWORD_HASH_RETRY_AFTER', default=1, cast=int)
+ASYNC_AUTH_VIEWS = config('ASYNC_AUTH_VIEWS', default=False, cast=bool)
+
+# WhatsApp login codes (accounts.otp). Purge expired ones periodically with
+# `manage.py purge_login_otps`.
+LOGIN_OTP_TTL_SECONDS = config('LOGIN_OTP_TTL_SECONDS', default=300, cast=int)
+LOGIN_OTP_MAX_ATTEMPTS = config('LOGIN_OTP_MAX_ATTEMPTS', default=5, cast=int)
+
+# Raw Pesapal payloads (payments.ProviderPayload). Bodies of at least
+# PAYMENT_PAYLOAD_COMPRESS_MIN_BYTES are zlib-compressed (0 stores them as-is);
+# `manage.py prune_payment_payloads` deletes those older than the retention
+# period.
+PAYMENT_PAYLOAD_COMPRESS_MIN_BYTES = config('PAYMENT_PAYLOAD_COMPRESS_MIN_BYTES', default=512, cast=int)
+PAYMENT_PAYLOAD_RETENTION_DAYS = config('PAYMENT_PAYLOAD_RETENTION_DAYS', default=180, cast=int)
+
+# Payment status long-poll (payments.TransactionStatusView). Waiters are woken
+# in-process by the IPN handler and, across workers, by a stamp in
+# NOTIFY_CACHE that each waiter reads every NOTIFY_POLL_INTERVAL seconds
+# (backend.notify). A waiting request holds one of the worker's threads, so
+# PAYMENT_STATUS_MAX_WAITERS caps them per worker process, by default at half
+# of WORKER_THREADS (the server's threads per worker, e.g. gunicorn
+# --threads). Single-threaded workers (the default) answer at once and never
+# wait, so deployments that want long-polling must set WORKER_THREADS; see
+# documentation/backend/backend_README.md.
+NOTIFY_CACHE = 'shared'
+NOTIFY_POLL_INTERVAL = config('NOTIFY_POLL_INTERVAL', default=1.0, cast=float)
+WORKER_THREADS = config('WORKER_THREADS', default=1, cast=int)
+PAYMENT_STATUS_MAX_WAIT = config('PAYMENT_STATUS_MAX_WAIT', default=25, cast=int)
+PAYMENT_STATUS_MAX_WAITERS = config('PAYMENT_STATUS_MAX_WAITERS', default=WORKER_THREADS // 2, cast=int)
+
+# Transactional outbox (outbox app). `manage.py dispatch_outbox` delivers
+# events in batches; failed deliveries are retried after
+# OUTBOX_RETRY_BACKOFF * 2^(attempt-1) seconds (at most an hour) and given up
+# after OUTBOX_MAX_ATTEMPTS. An idle dispatcher is woken when events are
+# recorded, and rechecks for retries every OUTBOX_IDLE_WAIT seconds.
+# With OUTBOX_DISPATCH_ON_COMMIT the request that records events also
+# delivers a batch after it commits, so maid ratings and closed-job logs stay
+# current without the worker; turn it off once the worker runs (see
+# documentation/backend/backend_README.md).
+OUTBOX_DISPATCH_ON_COMMIT = config('OUTBOX_DISPATCH_ON_COMMIT', default=True, cast=bool)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_RETRY_BACKOFF = config('OUTBOX_RETRY_BACKOFF', default=30, cast=int)
+OUTBOX_IDLE_WAIT = config('OUTBOX_IDLE_WAIT', default=30, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Provider job feed (/api/homeowner/jobs/feed/, homeowner.feed). Jobs within
+# JOB_FEED_RADIUS_KM of the provider are ranked by distance in bands of
+# JOB_FEED_BAND_KM, newest first within a band; jobs further away, then jobs
+# without coordinates follow, newest first.
+JOB_FEED_RADIUS_KM = config('JOB_FEED_RADIUS_KM', default=50, cast=float)
+JOB_FEED_BAND_KM = config('JOB_FEED_BAND_KM', default=5, cast=float)
+JOB_FEED_PAGE_SIZE = config('JOB_FEED_PAGE_SIZE', default=20, cast=int)
+JOB_FEED_MAX_PAGE_SIZE = 50
+
+# Job lifecycle (homeowner.lifecycle, `manage.py archive_jobs` daily). Open
+# jobs expire after their date; completed, cancelled and expired jobs move
+# to the archive tables JOB_ARCHIVE_AFTER_DAYS after they last changed, in
+# batches of JOB_ARCHIVE_BATCH_SIZE.
+JOB_ARCHIVE_AFTER_DAYS = config('JOB_ARCHIVE_AFTER_DAYS', default=30, cast=int)
+JOB_ARCHIVE_BATCH_SIZE = config('JOB_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+# Caches. 'shared' is seen by every worker process on the host (a SQLite
+# file, backend.cache.SQLiteCache); it holds rate-limit buckets and the
+# access-token denylist.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'backend.cache.SQLiteCache',
+        'LOCATION': config('SHARED_CACHE_PATH', default=str(BASE_DIR / 'cache' / 'shared.sqlite3')),
+    },
+}
+
+# `manage.py test` points the 'shared' cache at a temporary file, so running
+# the suite leaves the development cache alone.
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
+# Rate limits (backend.throttling): token buckets of "<requests>/<period>",
+# e.g. "3/10m" allows a burst of 3 and one more every 200 seconds. OTP sends
+# cost WhatsApp quota and have their own, tighter limits.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_CACHE = 'shared'
+THROTTLE_RATES = {
+    'otp_send_ip': config('THROTTLE_OTP_SEND_IP', default='10/h'),
+    'otp_send_phone': config('THROTTLE_OTP_SEND_PHONE', default='3/10m'),
+    'otp_verify_phone': config('THROTTLE_OTP_VERIFY_PHONE', default='10/10m'),
+    'login_ip': config('THROTTLE_LOGIN_IP', default='30/m'),
+    'login_phone': config('THROTTLE_LOGIN_PHONE', default='10/10m'),
+    'browse': config('THROTTLE_BROWSE', default='120/m'),
 }
 
+# Idempotency-Key handling for retried POSTs (backend.idempotency). Stored
+# responses and in-progress locks live in IDEMPOTENCY_CACHE, which must be
+# shared by all workers.
+IDEMPOTENCY_ENABLED = config('IDEMPOTENCY_ENABLED', default=True, cast=bool)
+IDEMPOTENCY_CACHE = 'shared'
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=24 * 60 * 60, cast=int)
+# A lock outlives a crashed request by at most this many seconds.
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+# How long a concurrent duplicate waits for the first response before a 409.
+IDEMPOTENCY_LOCK_WAIT = config('IDEMPOTENCY_LOCK_WAIT', default=5, cast=float)
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React web app
@@ -179,6 +332,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 # Allow all origins in development (change in production)
 CORS_ALLOW_ALL_ORIGINS = DEBUG
@@ -211,3 +366,142 @@ else:
 # WhatsApp Cloud API
 WHATSAPP_ACCESS_TOKEN = config('WHATSAPP_ACCESS_TOKEN', default='')
 WHATSAPP_PHONE_NUMBER_ID = config('WHATSAPP_PHONE_NUMBER_ID', default='')
+
+# Outbound provider calls (backend.outbound). Per provider: base URL (point
+# at `manage.py stub_providers` for local testing), concurrent calls per
+# process, how long a caller waits for a free slot before giving up with
+# ProviderBusy, and default timeout in seconds. All calls made while handling
+# one request share OUTBOUND_REQUEST_DEADLINE seconds.
+OUTBOUND_PROVIDERS = {
+    'pesapal': {
+        'BASE_URL': config('PESAPAL_BASE_URL', default='https://pay.pesapal.com/v3'),
+        'MAX_CONCURRENCY': config('PESAPAL_MAX_CONCURRENCY', default=8, cast=int),
+        'QUEUE_TIMEOUT': 1,
+        'TIMEOUT': 15,
+    },
+    'whatsapp': {
+        'BASE_URL': config('WHATSAPP_API_BASE_URL', default='https://graph.facebook.com/v20.0'),
+        'MAX_CONCURRENCY': config('WHATSAPP_MAX_CONCURRENCY', default=4, cast=int),
+        'QUEUE_TIMEOUT': 1,
+        'TIMEOUT': 10,
+    },
+}
+OUTBOUND_REQUEST_DEADLINE = config('OUTBOUND_REQUEST_DEADLINE', default=25, cast=int)
+
+# Country calling code assumed for phone numbers typed in local form
+# ("0772...") when computing users.phone_e164 (see accounts.phone).
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='256')
+
+# Response compression (backend.middleware.CompressionMiddleware)
+#
+# Most clients are on metered mobile data, so JSON/CSV responses above the
+# threshold are gzipped. Level 6 is the usual sweet spot; run
+# `python manage.py benchmark_compression` to compare levels on our payloads.
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_LEVEL = config('COMPRESSION_LEVEL', default=6, cast=int)
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'text/csv',
+    'text/html',
+    'text/plain',
+]
+# (path prefix, overrides) - first match wins
+COMPRESSION_ROUTES = [
+    # Login/registration responses carry access tokens; don't compress them
+    # alongside attacker-influenced input (BREACH).
+    ('/api/accounts/login/', {'enabled': False}),
+    ('/api/accounts/register/', {'enabled': False}),
+    ('/api/accounts/token/refresh/', {'enabled': False}),
+    # Large admin CSV exports: favour speed over the last few percent.
+    ('/api/maid/profiles/export_maids/', {'level': 4}),
+    ('/api/homeowner/profiles/export_homeowners/', {'level': 4}),
+]
+
+# Query instrumentation (backend.querystats.QueryStatsMiddleware)
+#
+# Off by default. When enabled, staff responses carry X-Query-Count,
+# X-Query-Time-Ms and X-Query-N-Plus-One headers, and per-view totals are
+# served at /api/ops/query-stats/. A SQL template run more than the threshold
+# times in one request is reported as a likely N+1.
+QUERY_STATS_ENABLED = config('QUERY_STATS_ENABLED', default=False, cast=bool)
+QUERY_STATS_N_PLUS_ONE_THRESHOLD = config('QUERY_STATS_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
+# Prometheus metrics (backend.metrics), served at /api/ops/metrics/.
+#
+# Scrapers authenticate with "Authorization: Bearer <METRICS_AUTH_TOKEN>".
+# Without a token the endpoint is only served when DEBUG is on. For
+# multi-worker deployments set PROMETHEUS_MULTIPROC_DIR in the workers'
+# environment (see backend/metrics.py).
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+
+# Per-request profiling (backend.profiling.ProfilingMiddleware)
+#
+# Staff users send "X-Profile: 1" (or ?_profile=1) to capture a cProfile
+# profile and SQL log of that request. Captures are listed and downloaded at
+# /api/ops/profiles/; only the newest PROFILING_MAX_CAPTURES are kept.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_DIR = config('PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_CAPTURES = config('PROFILING_MAX_CAPTURES', default=50, cast=int)
+
+# Logging (backend.logs)
+#
+# JSON lines on stdout with request_id, user_id and view on every record,
+# written from a background thread. LOG_LEVELS sets per-logger levels;
+# LOG_SAMPLE_RATES keeps only that fraction of INFO-and-below records from
+# noisy loggers (warnings and errors are always kept).
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_LEVELS = {
+    'django': config('DJANGO_LOG_LEVEL', default='INFO'),
+    'django.db.backends': 'WARNING',
+    'accounts': LOG_LEVEL,
+    'payments': LOG_LEVEL,
+    'backend': LOG_LEVEL,
+}
+LOG_SAMPLE_RATES = {
+    'accounts.whatsapp': config('LOG_SAMPLE_RATE_WHATSAPP', default=0.1, cast=float),
+}
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'backend.logs.JSONFormatter'},
+    },
+    'filters': {
+        'request_context': {'()': 'backend.logs.RequestContextFilter'},
+        **{
+            f'sample:{name}': {'()': 'backend.logs.SamplingFilter', 'rate': rate}
+            for name, rate in LOG_SAMPLE_RATES.items()
+        },
+    },
+    'handlers': {
+        'console': {
+            '()': 'backend.logs.QueueingStreamHandler',
+            'formatter': 'json',
+            'filters': ['request_context'],
+        },
+    },
+    'root': {'handlers': ['console'], 'level': LOG_LEVEL},
+    'loggers': {name: {'level': level} for name, level in LOG_LEVELS.items()},
+}
+for _name in LOG_SAMPLE_RATES:
+    LOGGING['loggers'].setdefault(_name, {})['filters'] = [f'sample:{_name}']
+# Django's own default handlers are replaced, not added to.
+LOGGING['loggers']['django'].update(handlers=['console'], propagate=False)
+
+# Tracing (backend.tracing)
+#
+# Off by default. Sampled requests get a trace with spans for SQL queries,
+# Pesapal/WhatsApp calls, serializers and JSON rendering. TRACING_EXPORTER
+# is 'jsonl' (append spans to TRACING_JSONL_PATH) or 'otlp' (POST OTLP/HTTP
+# JSON to TRACING_OTLP_ENDPOINT; `python manage.py trace_collector` is a
+# local stand-in collector). A sampled incoming traceparent forces a trace only
+# from TRACING_TRUSTED_CLIENTS (comma-separated addresses or networks, e.g.
+# the gateway); from anyone else it is sampled at TRACING_SAMPLE_RATE.
+TRACING_ENABLED = config('TRACING_ENABLED', default=False, cast=bool)
+TRACING_SAMPLE_RATE = config('TRACING_SAMPLE_RATE', default=1.0, cast=float)
+TRACING_TRUSTED_CLIENTS = config('TRACING_TRUSTED_CLIENTS', default='', cast=Csv())
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='jsonl')
+TRACING_JSONL_PATH = config('TRACING_JSONL_PATH', default=os.path.join(BASE_DIR, 'traces', 'spans.jsonl'))
+TRACING_OTLP_ENDPOINT = config('TRACING_OTLP_ENDPOINT', default='http://localhost:4318/v1/traces')
+TRACING_SERVICE_NAME = config('TRACING_SERVICE_NAME', default='maidmatch-api')
@@ -0,0 +1,121 @@
+"""Local stand-ins for the Pesapal v3 and WhatsApp Cloud APIs.
+
+``build_server`` returns an HTTP server answering the endpoints the payment
+and messaging code calls, with configurable latency, failures and payment
+outcome. The ``stub_providers`` command runs it for load tests and local
+development; tests start it on a free port in a thread.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up (timeouts under test) are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+OUTCOMES = {
+    "completed": ("COMPLETED", "Completed", 1),
+    "failed": ("FAILED", "Failed", 2),
+    "pending": ("PENDING", "Pending", 0),
+}
+
+
+def build_server(host="127.0.0.1", port=8025, delay=0.0, outcome="completed", fail_rate=0.0):
+    """A stand-in for the Pesapal v3 and WhatsApp Cloud APIs.
+
+    Serves ``/v3/api/Auth/RequestToken``, ``/v3/api/Transactions/SubmitOrderRequest``,
+    ``/v3/api/Transactions/GetTransactionStatus`` and ``/v20.0/<id>/messages``.
+    Each response waits ``delay`` seconds; a ``fail_rate`` fraction answer 500.
+    ``outcome`` is the payment status reported for orders ("completed",
+    "failed", "pending" or "random"). Use ``port=0`` for a free port and run
+    ``serve_forever`` in a thread to use it from tests.
+    """
+    orders = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return {}
+
+        def _simulate(self):
+            if delay:
+                time.sleep(delay)
+            if fail_rate and random.random() < fail_rate:
+                self._reply(500, {"error": {"message": "stub failure"}})
+                return False
+            return True
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = self._body()
+            if not self._simulate():
+                return
+            if path == "/v3/api/Auth/RequestToken":
+                self._reply(200, {"token": f"stub-{uuid.uuid4().hex}", "status": "200", "error": None})
+            elif path == "/v3/api/Transactions/SubmitOrderRequest":
+                tracking_id = str(uuid.uuid4())
+                with lock:
+                    orders[tracking_id] = body.get("id")
+                self._reply(200, {
+                    "order_tracking_id": tracking_id,
+                    "merchant_reference": body.get("id"),
+                    "redirect_url": f"http://{self.headers.get('Host')}/pay/{tracking_id}",
+                    "status": "200",
+                    "error": None,
+                })
+            elif path.startswith("/v20.0/") and path.endswith("/messages"):
+                self._reply(200, {"messages": [{"id": f"wamid.stub{uuid.uuid4().hex[:12]}"}]})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/v3/api/Transactions/GetTransactionStatus":
+                self._reply(404, {"error": "not found"})
+                return
+            if not self._simulate():
+                return
+            tracking_id = parse_qs(url.query).get("orderTrackingId", [""])[0]
+            name = random.choice(list(OUTCOMES)) if outcome == "random" else outcome
+            payment_status, description, code = OUTCOMES[name]
+            with lock:
+                reference = orders.get(tracking_id)
+            self._reply(200, {
+                "payment_status": payment_status,
+                "payment_status_description": description,
+                "status_code": code,
+                "order_tracking_id": tracking_id,
+                "merchant_reference": reference,
+                "status": "200",
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubServer((host, port), Handler)
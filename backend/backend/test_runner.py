@@ -0,0 +1,28 @@
+"""Test runner that keeps the suite away from the developer's shared cache.
+
+The 'shared' cache is a SQLite file next to the project; tests clear it and
+fill it with rate-limit buckets, denylisted tokens and idempotency records.
+For the duration of the run it is pointed at a file in a temporary directory
+instead.
+"""
+
+import os
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory()
+        shared = {**settings.CACHES['shared'], 'LOCATION': os.path.join(self._cache_dir.name, 'shared.sqlite3')}
+        self._cache_settings = override_settings(CACHES={**settings.CACHES, 'shared': shared})
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,444 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from .cache import SQLiteCache
+from .idempotency import idempotent
+from .logs import QueueingStreamHandler
+from .notify import notify, wait_for, waiting
+from .outbound import DeadlineExceeded, ProviderBusy, ProviderClient, deadline, remaining
+from .stub_providers import build_server
+from .throttling import LoginIPThrottle, LoginPhoneThrottle, throttle_wait
+from .tracing import KIND_INTERNAL, JSONLinesExporter, Span, Trace, TracingMiddleware
+
+
+class SQLiteCacheTokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(os.path.join(directory.name, "cache.sqlite3"), {})
+        self.now = 1000.0
+        patcher = mock.patch("backend.cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def take(self, **kwargs):
+        # 3 tokens, one more every 10 seconds
+        return self.cache.take_tokens("bucket", 0.1, 3, **kwargs)
+
+    def test_burst_then_rejection(self):
+        self.assertEqual([self.take() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.take(), 10)
+        self.assertAlmostEqual(self.take(), 10)
+
+    def test_refill(self):
+        for _ in range(3):
+            self.take()
+        self.now += 4
+        self.assertAlmostEqual(self.take(), 6)
+        self.now += 6
+        self.assertEqual(self.take(), 0)
+        self.assertAlmostEqual(self.take(), 10)
+
+    def test_refill_is_capped_at_capacity(self):
+        self.take()
+        self.now += 3600
+        self.assertEqual([self.take() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.take(), 0)
+
+    def test_peek_takes_nothing(self):
+        self.take(cost=2)
+        self.assertEqual(self.take(peek=True), 0)
+        self.assertAlmostEqual(self.take(cost=2, peek=True), 10)
+        self.assertEqual(self.take(), 0)
+        self.assertGreater(self.take(), 0)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={"login_ip": "5/m", "login_phone": "2/m"})
+class ThrottleWaitTests(SimpleTestCase):
+    throttles = [LoginIPThrottle, LoginPhoneThrottle]
+
+    def setUp(self):
+        caches["shared"].clear()
+
+    def request(self, phone, **extra):
+        django_request = APIRequestFactory().post(
+            "/api/accounts/login/", {"phone_number": phone}, format="json", REMOTE_ADDR="10.0.0.1", **extra,
+        )
+        return Request(django_request, parsers=[JSONParser()])
+
+    def wait(self, phone, **extra):
+        return throttle_wait(self.request(phone, **extra), None, self.throttles)
+
+    def test_refused_request_does_not_drain_other_buckets(self):
+        self.assertIsNone(self.wait("+256700000001"))
+        self.assertIsNone(self.wait("+256700000001"))
+        for _ in range(10):
+            self.assertIsNotNone(self.wait("+256700000001"))
+        # Only the two allowed requests counted against the IP bucket
+        self.assertEqual([self.wait(f"+25670000001{n}") for n in range(3)], [None, None, None])
+        self.assertIsNotNone(self.wait("+256700000020"))
+
+    def test_forwarded_for_is_not_trusted(self):
+        for n in range(5):
+            self.assertIsNone(self.wait(f"+25670000001{n}", HTTP_X_FORWARDED_FOR=f"192.0.2.{n}"))
+        self.assertIsNotNone(self.wait("+256700000020", HTTP_X_FORWARDED_FOR="192.0.2.99"))
+
+
+@override_settings(IDEMPOTENCY_ENABLED=True, IDEMPOTENCY_LOCK_WAIT=0.2)
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.calls = 0
+        self.statuses = []
+        self.entered, self.release = threading.Event(), threading.Event()
+        self.addCleanup(self.release.set)
+        self.hold = False
+        tests = self
+
+        class CreateView(APIView):
+            permission_classes = []
+            throttle_classes = []
+
+            @idempotent
+            def post(self, request):
+                tests.calls += 1
+                call = tests.calls
+                if tests.hold:
+                    tests.entered.set()
+                    tests.release.wait(5)
+                code = tests.statuses.pop(0) if tests.statuses else 201
+                return Response({"call": call}, status=code, headers={"Location": f"/things/{call}/", "ETag": f'"{call}"'})
+
+        self.view = CreateView.as_view()
+
+    def post(self, body=None, key="key-1", user=1, path="/things/"):
+        request = APIRequestFactory().post(path, body or {"name": "a"}, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, user=SimpleNamespace(pk=user, is_authenticated=True))
+        return self.view(request)
+
+    def test_retry_is_replayed_with_headers(self):
+        first, retry = self.post(), self.post()
+        self.assertEqual((retry.status_code, retry.data), (201, {"call": 1}))
+        self.assertEqual((retry["Location"], retry["ETag"]), (first["Location"], first["ETag"]))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse(first.has_header("Idempotent-Replayed"))
+        self.assertEqual(self.calls, 1)
+
+    def test_key_reused_for_different_request(self):
+        self.post()
+        self.assertEqual(self.post({"name": "b"}).status_code, 422)
+        self.assertEqual(self.post(path="/other/").data, {"call": 2})
+        self.assertEqual(self.calls, 2)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post()
+        self.assertEqual(self.post(user=2).data, {"call": 2})
+        self.assertEqual(self.post(user=1).data, {"call": 1})
+
+    def test_errors_and_conflicts_are_not_stored(self):
+        self.statuses = [500, 409, 429]
+        self.assertEqual([self.post().status_code for _ in range(4)], [500, 409, 429, 201])
+        self.assertEqual(self.post().data, {"call": 4})
+
+    def test_duplicate_gets_409_while_first_runs(self):
+        self.hold = True
+        with ThreadPoolExecutor(1) as pool:
+            first = pool.submit(self.post)
+            self.assertTrue(self.entered.wait(5))
+            duplicate = self.post()
+            self.assertEqual(duplicate.status_code, 409)
+            self.assertEqual(duplicate["Retry-After"], "1")
+            self.release.set()
+            self.assertEqual(first.result(timeout=5).status_code, 201)
+        self.assertEqual(self.post()["Idempotent-Replayed"], "true")
+        self.assertEqual(self.calls, 1)
+
+    def test_duplicate_waits_for_first_response(self):
+        self.hold = True
+        with ThreadPoolExecutor(1) as pool:
+            first = pool.submit(self.post)
+            self.assertTrue(self.entered.wait(5))
+
+            def first_finishes(seconds):
+                self.release.set()
+                first.result(timeout=5)
+
+            with mock.patch("backend.idempotency.time.sleep", side_effect=first_finishes):
+                duplicate = self.post()
+        self.assertEqual((duplicate.status_code, duplicate.data), (201, {"call": 1}))
+        self.assertEqual(duplicate["Idempotent-Replayed"], "true")
+        self.assertEqual(self.calls, 1)
+
+
+class WaitForTests(SimpleTestCase):
+    def test_cap_answers_immediately(self):
+        started = time.monotonic()
+        self.assertEqual(wait_for("topic", lambda: None, 5, max_waiters=0), None)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_cap_counts_waiters_in_process(self):
+        done = threading.Event()
+        waiter = threading.Thread(target=wait_for, args=("topic", done.is_set, 5), kwargs={"max_waiters": 1})
+        waiter.start()
+        try:
+            while not waiting("topic"):
+                time.sleep(0.01)
+            started = time.monotonic()
+            wait_for("other", lambda: None, 5, max_waiters=1)
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            done.set()
+            notify("topic")
+            waiter.join()
+        self.assertEqual(waiting(), 0)
+
+    def test_notify_wakes_waiter(self):
+        settled = threading.Event()
+        timer = threading.Timer(0.2, lambda: (settled.set(), notify("topic")))
+        timer.start()
+        started = time.monotonic()
+        self.assertTrue(wait_for("topic", settled.is_set, 5, max_waiters=1))
+        self.assertLess(time.monotonic() - started, 2)
+
+
+@override_settings(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=0.0, TRACING_TRUSTED_CLIENTS=["10.1.0.0/16"])
+class TracingSamplingTests(SimpleTestCase):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    def setUp(self):
+        self.exporter = mock.Mock()
+        with mock.patch("backend.tracing.get_exporter", return_value=self.exporter):
+            self.middleware = TracingMiddleware(lambda request: HttpResponse("ok"))
+
+    def traced(self, flags, remote_addr):
+        request = RequestFactory().get(
+            "/", HTTP_TRACEPARENT=f"00-{self.trace_id}-00f067aa0ba902b7-{flags}", REMOTE_ADDR=remote_addr,
+        )
+        response = self.middleware(request)
+        return self.exporter.submit.called, response.get("traceparent")
+
+    def test_trusted_sampled_header_is_continued(self):
+        submitted, traceparent = self.traced("01", "10.1.2.3")
+        self.assertTrue(submitted)
+        self.assertTrue(traceparent.startswith(f"00-{self.trace_id}-"))
+
+    def test_unsampled_header_is_not_traced(self):
+        self.assertEqual(self.traced("00", "10.1.2.3"), (False, None))
+
+    def test_untrusted_sampled_header_goes_through_sampling(self):
+        self.assertEqual(self.traced("01", "203.0.113.5"), (False, None))
+        with override_settings(TRACING_SAMPLE_RATE=1.0):
+            self.setUp()
+            self.assertTrue(self.traced("01", "203.0.113.5")[0])
+
+
+    def test_serializer_data_gets_a_span(self):
+        class PointSerializer(serializers.Serializer):
+            x = serializers.IntegerField()
+
+        def view(request):
+            PointSerializer([{"x": 1}, {"x": 2}], many=True).data
+            return HttpResponse("ok")
+
+        with mock.patch("backend.tracing.get_exporter", return_value=self.exporter):
+            middleware = TracingMiddleware(view)
+        middleware(RequestFactory().get("/", REMOTE_ADDR="10.1.2.3", HTTP_TRACEPARENT=(
+            f"00-{self.trace_id}-00f067aa0ba902b7-01"
+        )))
+        trace = self.exporter.submit.call_args.args[0]
+        spans = [(s.name, s.attributes) for s in trace.spans if s.name == "serializer.data"]
+        self.assertEqual(spans, [("serializer.data", {"serializer": "PointSerializer"})])
+
+
+class JSONLinesExporterTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "spans.jsonl")
+        self.exporter = JSONLinesExporter(self.path)
+
+    def submit(self, name):
+        trace = Trace("0" * 32)
+        finished = Span(trace, name, KIND_INTERNAL, None, {})
+        finished.end_ns = finished.start_ns
+        trace.add(finished)
+        self.exporter.submit(trace)
+
+    def exported(self):
+        with open(self.path) as fh:
+            return sorted(json.loads(line)["name"] for line in fh)
+
+    def test_thread_starts_on_first_trace(self):
+        self.assertIsNone(self.exporter._thread)
+        self.submit("first")
+        self.exporter.flush()
+        self.assertEqual(self.exported(), ["first"])
+
+    def test_forked_child_exports_its_traces(self):
+        self.submit("parent")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.submit("child")
+                self.exporter.flush()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.exporter.flush()
+        self.assertEqual(self.exported(), ["child", "parent"])
+
+
+class QueueingStreamHandlerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "log.txt")
+        self.stream = open(self.path, "a", buffering=1)
+        self.addCleanup(self.stream.close)
+        self.handler = QueueingStreamHandler(self.stream)
+        self.addCleanup(self.handler.close)
+
+    def log(self, message):
+        self.handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, message, (), None))
+
+    def test_listener_starts_on_first_record(self):
+        self.assertIsNone(self.handler.listener)
+        self.log("first")
+        self.assertIsNotNone(self.handler.listener._thread)
+        self.handler.close()
+        with open(self.path) as fh:
+            self.assertEqual(fh.read(), "first\n")
+
+    def test_forked_child_writes_its_records(self):
+        self.log("parent")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.log("child")
+                self.handler.close()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.handler.close()
+        with open(self.path) as fh:
+            self.assertEqual(sorted(fh.read().splitlines()), ["child", "parent"])
+
+
+class OutboundClientTests(SimpleTestCase):
+    """ProviderClient against a stub Pesapal; slow calls are held on events."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = build_server(port=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/v3"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def provider(self, **kwargs):
+        return ProviderClient("pesapal", self.base_url, **kwargs)
+
+    def token(self, client, **kwargs):
+        return client.post("api/Auth/RequestToken", "auth", json={}, **kwargs)
+
+    def hold_calls(self, client):
+        """Make calls through ``client`` wait until the returned event is set.
+
+        Returns ``(entered, release)``: ``entered`` is released once per call
+        that reached the provider.
+        """
+        entered, release = threading.Semaphore(0), threading.Event()
+        send = client.session.request
+
+        def held(*args, **kwargs):
+            entered.release()
+            release.wait(5)
+            return send(*args, **kwargs)
+
+        patcher = mock.patch.object(client.session, "request", side_effect=held)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(release.set)
+        return entered, release
+
+    def test_call_within_deadline(self):
+        with deadline(5):
+            self.assertEqual(self.token(self.provider()).status_code, 200)
+
+    def test_timeout_is_clamped_to_deadline(self):
+        client = self.provider(timeout=10)
+        with mock.patch.object(client.session, "request", wraps=client.session.request) as send:
+            with deadline(0.5):
+                self.assertEqual(self.token(client).status_code, 200)
+            self.token(client)
+        (connect, read), (_, unbounded) = [call.kwargs["timeout"] for call in send.call_args_list]
+        self.assertLessEqual(read, 0.5)
+        self.assertLessEqual(connect, 0.5)
+        self.assertGreater(unbounded, 5)
+
+    def test_spent_deadline_fails_without_calling(self):
+        with deadline(0), self.assertRaises(DeadlineExceeded):
+            self.token(self.provider())
+
+    def test_busy_provider_fails_after_queue_timeout(self):
+        client = self.provider(max_concurrency=1, queue_timeout=0.01)
+        entered, release = self.hold_calls(client)
+        with ThreadPoolExecutor(1) as pool:
+            in_flight = pool.submit(self.token, client)
+            self.assertTrue(entered.acquire(timeout=5))
+            # The slot wait is bounded by QUEUE_TIMEOUT, not by the deadline
+            with mock.patch.object(client._slots, "acquire", wraps=client._slots.acquire) as acquire:
+                with deadline(60), self.assertRaises(ProviderBusy):
+                    self.token(client)
+            acquire.assert_called_once_with(timeout=0.01)
+            release.set()
+            self.assertEqual(in_flight.result(timeout=5).status_code, 200)
+        self.assertEqual(self.token(client).status_code, 200)
+
+    def test_submit_rejects_when_queue_is_full(self):
+        client = self.provider(max_concurrency=1, max_queued=2)
+        _, release = self.hold_calls(client)
+        futures = [client.submit(self.token, client) for _ in range(2)]
+        with self.assertRaises(ProviderBusy):
+            client.submit(self.token, client)
+        release.set()
+        # Callbacks run in the order added, so these follow the ones that
+        # give the queue slots back
+        settled = threading.Semaphore(0)
+        for future in futures:
+            future.add_done_callback(lambda _: settled.release())
+        for _ in futures:
+            self.assertTrue(settled.acquire(timeout=5))
+        self.assertEqual([future.result().status_code for future in futures], [200, 200])
+        self.assertEqual(client.submit(self.token, client).result(timeout=5).status_code, 200)
+
+    def test_submit_carries_deadline(self):
+        client = self.provider()
+        with deadline(30):
+            future = client.submit(remaining)
+        self.assertIsNone(client.submit(remaining).result(timeout=5))
+        left = future.result(timeout=5)
+        self.assertIsNotNone(left)
+        self.assertLessEqual(left, 30)
@@ -0,0 +1,183 @@
+"""Token-bucket rate limiting for DRF views.
+
+Each throttle class owns a ``scope`` whose limit is configured in
+``THROTTLE_RATES`` as ``"<requests>/<period>"`` (for example ``"3/10m"``):
+the bucket holds that many requests and refills evenly over the period, so
+short bursts are allowed but the sustained rate is capped. Buckets are keyed
+by client IP, by the (canonical) phone number in the request body, or by the
+authenticated user, and live in ``THROTTLE_CACHE``. With a cache that offers
+``take_tokens`` (``backend.cache.SQLiteCache``) every check is a single
+atomic update shared by all workers; other caches fall back to a
+best-effort read-then-write.
+
+Client IPs come from DRF's ``get_ident``, which only trusts
+``X-Forwarded-For`` up to ``REST_FRAMEWORK["NUM_PROXIES"]`` hops (0 = use
+``REMOTE_ADDR``), so clients cannot pick their own IP bucket.
+
+A view lists several throttles to be limited on each key independently.
+Views using ``TokenBucketThrottleMixin`` check every bucket before drawing
+from any, so a request refused by one bucket does not use up the others;
+the longest wait is sent as 429 with ``Retry-After``.
+"""
+
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from accounts.phone import normalize_phone
+
+from .metrics import THROTTLED
+
+_rate_re = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\w*\s*$")
+_units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"3/10m"`` -> ``(3, 600)``: bucket capacity and refill period in seconds."""
+    match = _rate_re.match(rate)
+    if not match:
+        raise ImproperlyConfigured(f"Invalid throttle rate {rate!r}, expected e.g. '5/m' or '3/10m'")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * _units[unit]
+
+
+def take_tokens(cache, key, rate, capacity, cost=1, peek=False):
+    """Seconds to wait before ``cost`` tokens are available (0 = taken now,
+    or with ``peek`` available now; nothing is taken)."""
+    if hasattr(cache, "take_tokens"):
+        return cache.take_tokens(key, rate, capacity, cost, peek=peek)
+    now = time.time()
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    wait = 0 if tokens >= cost else (cost - tokens) / rate
+    if peek:
+        return wait
+    if not wait:
+        tokens -= cost
+    cache.set(key, (tokens, now), int((capacity - tokens) / rate) + 1)
+    return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        rates = getattr(settings, "THROTTLE_RATES", {})
+        if self.scope not in rates:
+            raise ImproperlyConfigured(f"No THROTTLE_RATES entry for scope {self.scope!r}")
+        self.capacity, self.period = parse_rate(rates[self.scope])
+        self.cache = caches[getattr(settings, "THROTTLE_CACHE", "default")]
+        self._wait = None
+
+    def get_ident_key(self, request, view):
+        """What to count requests against; None skips this throttle."""
+        raise NotImplementedError
+
+    def bucket_key(self, request, view):
+        """Cache key of the bucket for this request; None skips this throttle."""
+        ident = self.get_ident_key(request, view)
+        return None if ident is None else f"throttle:{self.scope}:{ident}"
+
+    def take(self, key, peek=False):
+        self._wait = take_tokens(self.cache, key, self.capacity / self.period, self.capacity, peek=peek)
+        if self._wait and not peek:
+            THROTTLED.labels(self.scope).inc()
+        return self._wait
+
+    def allow_request(self, request, view):
+        if not getattr(settings, "THROTTLE_ENABLED", True):
+            return True
+        key = self.bucket_key(request, view)
+        return key is None or not self.take(key)
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class PhoneThrottle(TokenBucketThrottle):
+    """Keyed by the phone number being logged into, however it was typed."""
+
+    def get_ident_key(self, request, view):
+        phone = request.data.get("phone_number") if hasattr(request.data, "get") else None
+        return normalize_phone(phone) if isinstance(phone, str) else None
+
+
+class UserOrIPThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+
+class OTPSendIPThrottle(IPThrottle):
+    scope = "otp_send_ip"
+
+
+class OTPSendPhoneThrottle(PhoneThrottle):
+    scope = "otp_send_phone"
+
+
+class OTPVerifyPhoneThrottle(PhoneThrottle):
+    scope = "otp_verify_phone"
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = "login_ip"
+
+
+class LoginPhoneThrottle(PhoneThrottle):
+    scope = "login_phone"
+
+
+class BrowseThrottle(UserOrIPThrottle):
+    scope = "browse"
+
+
+OTP_SEND_THROTTLES = [OTPSendIPThrottle, OTPSendPhoneThrottle]
+OTP_VERIFY_THROTTLES = [LoginIPThrottle, OTPVerifyPhoneThrottle]
+LOGIN_THROTTLES = [LoginIPThrottle, LoginPhoneThrottle]
+BROWSE_THROTTLES = [BrowseThrottle]
+
+
+def throttle_wait(request, view, throttle_classes):
+    """Seconds to wait if any of ``throttle_classes`` refuses the request,
+    else None (and one token has been taken from each bucket).
+
+    All buckets are checked before any is drawn from. Also used by views
+    outside DRF's dispatch (the async auth views); ``request`` must be a DRF
+    ``Request``.
+    """
+    if not getattr(settings, "THROTTLE_ENABLED", True):
+        return None
+    throttles = [throttle_class() for throttle_class in throttle_classes]
+    buckets = [(throttle, throttle.bucket_key(request, view)) for throttle in throttles]
+    buckets = [(throttle, key) for throttle, key in buckets if key is not None]
+
+    waits = [throttle.take(key, peek=True) for throttle, key in buckets]
+    if any(waits):
+        for (throttle, _), wait in zip(buckets, waits):
+            if wait:
+                THROTTLED.labels(throttle.scope).inc()
+    else:
+        # Another request may have drained a bucket since the check.
+        waits = [throttle.take(key) for throttle, key in buckets]
+    return max(waits) if any(waits) else None
+
+
+class TokenBucketThrottleMixin:
+    """For DRF views with several token-bucket throttles: refuse without
+    drawing from any bucket when one of them is empty."""
+
+    def check_throttles(self, request):
+        wait = throttle_wait(request, self, self.throttle_classes)
+        if wait is not None:
+            self.throttled(request, wait)
@@ -0,0 +1,378 @@
+"""Lightweight request tracing.
+
+When ``TRACING_ENABLED`` is on, ``TracingMiddleware`` opens a root span for a
+sampled fraction (``TRACING_SAMPLE_RATE``) of requests. Child spans are added
+for:
+
+* every SQL query (``db.query``, through ``connection.execute_wrapper``),
+* outbound provider calls (``backend.metrics.observe_outbound`` opens a
+  ``<provider>.<operation>`` client span),
+* serializing response data (``serializer.data``, for the outermost
+  serializer's ``.data``; see ``instrument_serializers``),
+* JSON rendering of API responses (``TracedJSONRenderer``),
+* any block wrapped in ``with span("name", key=value):``.
+
+The trace id follows W3C trace context: an incoming ``traceparent`` header is
+continued, and the response carries ``traceparent`` back so a slow request
+can be looked up. Its sampled flag is honoured: a request the caller did not
+sample is never traced, and one it did sample is traced only if the caller's
+address is in ``TRACING_TRUSTED_CLIENTS``, or else at the sample rate like
+any other, so clients cannot force tracing on.
+
+Finished traces are handed to a background thread that either appends them
+to ``TRACING_JSONL_PATH`` (one span per line) or posts them in OTLP/HTTP JSON
+format to ``TRACING_OTLP_ENDPOINT``; the ``trace_collector`` management
+command is a stand-in collector for the latter. The thread is started on the
+first trace in each process, so workers forked after the middleware is built
+(gunicorn ``--preload``) get their own.
+"""
+
+import ipaddress
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+import requests
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+_traceparent_re = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED_FLAG = 0x01
+
+_current_trace = ContextVar("current_trace", default=None)
+_current_span = ContextVar("current_span", default=None)
+
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+MAX_SPANS_PER_TRACE = 1000
+
+
+class Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, finished_span):
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(finished_span)
+        else:
+            self.dropped += 1
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, trace, name, kind, parent_id, attributes):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Record a child span of the current span; a no-op outside a sampled trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace, name, kind, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        trace.add(current)
+
+
+def _trace_queries(execute, sql, params, many, context):
+    with span("db.query", KIND_CLIENT, **{
+        "db.alias": context["connection"].alias,
+        "db.statement": sql[:1000],
+        "db.many": many,
+    }):
+        return execute(sql, params, many, context)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("response.render", renderer="json"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _traced_data(original):
+    def data(self):
+        serializer = self.child if isinstance(self, serializers.ListSerializer) else self
+        with span("serializer.data", serializer=type(serializer).__name__):
+            return original.fget(self)
+    data._traced = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Record a span whenever a serializer's ``.data`` is built.
+
+    Only the outermost serializer is timed: nested serializers and fields go
+    through ``to_representation`` and are part of the same span.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, "_traced", False):
+            cls.data = _traced_data(cls.data)
+
+
+class TracingMiddleware:
+    """Open a root span per sampled request and export the finished trace."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "TRACING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+        self.trusted_clients = [
+            ipaddress.ip_network(network, strict=False)
+            for network in getattr(settings, "TRACING_TRUSTED_CLIENTS", ())
+        ]
+        self.exporter = get_exporter()
+        instrument_serializers()
+
+    def _trusted(self, request):
+        try:
+            address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_clients)
+
+    def _sampled(self, request, incoming):
+        if incoming is not None:
+            if not int(incoming.group(3), 16) & SAMPLED_FLAG:
+                return False
+            if self._trusted(request):
+                return True
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        incoming = _traceparent_re.match(request.headers.get("traceparent", ""))
+        if not self._sampled(request, incoming):
+            return self.get_response(request)
+
+        trace = Trace(incoming.group(1) if incoming else secrets.token_hex(16))
+        root = Span(trace, "http.request", KIND_SERVER, incoming.group(2) if incoming else None, {
+            "http.method": request.method,
+            "http.target": request.path,
+            "request_id": getattr(request, "request_id", None),
+        })
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_trace_queries))
+                response = self.get_response(request)
+            root.set("http.status_code", response.status_code)
+        except BaseException as exc:
+            root.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            root.end_ns = time.time_ns()
+            match = getattr(request, "resolver_match", None)
+            if match is not None:
+                root.name = f"{request.method} {match.view_name or match._func_path}"
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                root.set("user_id", user.pk)
+            trace.add(root)
+            self.exporter.submit(trace)
+
+        response["traceparent"] = f"00-{trace.trace_id}-{root.span_id}-01"
+        return response
+
+
+class BackgroundExporter:
+    """Exports finished traces from a daemon thread; drops traces when busy."""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's thread does not exist here, and its queue or lock may
+        # have been mid-use at the fork.
+        self._start_lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=self.maxsize)
+        self._thread = None
+        self._pid = None
+
+    def _start_thread(self):
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, trace):
+        if self._pid != os.getpid():
+            self._start_thread()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every submitted trace has been exported (or failed)."""
+        if self._pid == os.getpid():
+            self.queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+            except Exception:
+                logger.warning("Exporting %d traces failed", len(batch), exc_info=True)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def export(self, traces):
+        raise NotImplementedError
+
+
+class JSONLinesExporter(BackgroundExporter):
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def export(self, traces):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            for trace in traces:
+                for finished in trace.spans:
+                    fh.write(json.dumps(finished.as_dict(), default=str) + "\n")
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces, service_name):
+    """Encode traces as an OTLP/HTTP JSON ``ExportTraceServiceRequest``."""
+    spans = []
+    for trace in traces:
+        for finished in trace.spans:
+            item = {
+                "traceId": trace.trace_id,
+                "spanId": finished.span_id,
+                "name": finished.name,
+                "kind": finished.kind,
+                "startTimeUnixNano": str(finished.start_ns),
+                "endTimeUnixNano": str(finished.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in finished.attributes.items()
+                    if value is not None
+                ],
+                "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+            }
+            if finished.parent_id:
+                item["parentSpanId"] = finished.parent_id
+            spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "backend.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class OTLPHTTPExporter(BackgroundExporter):
+    def __init__(self, endpoint, service_name, **kwargs):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.session = requests.Session()
+        super().__init__(**kwargs)
+
+    def export(self, traces):
+        resp = self.session.post(self.endpoint, json=to_otlp(traces, self.service_name), timeout=5)
+        resp.raise_for_status()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            kind = getattr(settings, "TRACING_EXPORTER", "jsonl")
+            if kind == "otlp":
+                _exporter = OTLPHTTPExporter(
+                    settings.TRACING_OTLP_ENDPOINT,
+                    getattr(settings, "TRACING_SERVICE_NAME", "maidmatch-api"),
+                )
+            else:
+                _exporter = JSONLinesExporter(settings.TRACING_JSONL_PATH)
+        return _exporter
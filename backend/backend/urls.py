@@ -41,6 +41,7 @@ urlpatterns = [
     path('api/home-nursing/', include('home_nursing.urls')),
     path('api/payments/', include('payments.urls')),
     path('api/support/', include('admin_app.urls')),
+    path('api/ops/', include('admin_app.ops_urls')),
 ]
 
 # Serve media files in development
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cleaning_company', '0014_cleaningcompany_id_document'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cleaningcompany',
+            name='has_active_subscription',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AlterField(
+            model_name='cleaningcompany',
+            name='subscription_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from accounts.models import LoadDeferredTogetherMixin
 
 
 class ServiceCategory(models.Model):
@@ -28,7 +29,7 @@ class ServiceCategory(models.Model):
         return f"{self.name} ({self.get_group_display()})"
 
 
-class CleaningCompany(models.Model):
+class CleaningCompany(LoadDeferredTogetherMixin, models.Model):
     """Profile for a company offering cleaning services."""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cleaning_company")
     company_name = models.CharField(max_length=200)
@@ -54,7 +55,9 @@ class CleaningCompany(models.Model):
     )
     service_pricing = models.TextField(blank=True, null=True, help_text="Per-service starting pay in free text (one per line)")
     # Subscription / payment status for access to homeowner job requests
-    has_active_subscription = models.BooleanField(default=False)
+    # Set by payment effects; the ``expire_plans`` sweep clears it once
+    # subscription_expires_at has passed.
+    has_active_subscription = models.BooleanField(default=False, db_index=True)
     subscription_type = models.CharField(
         max_length=20,
         choices=(
@@ -64,7 +67,7 @@ class CleaningCompany(models.Model):
         blank=True,
         null=True,
     )
-    subscription_expires_at = models.DateTimeField(blank=True, null=True)
+    subscription_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
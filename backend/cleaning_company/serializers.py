@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from backend.fieldsets import DynamicFieldsMixin
 from .models import CleaningCompany, ServiceCategory, CleaningWorkImage
 
 
@@ -60,7 +61,7 @@ class AdminCleaningCompanySerializer(serializers.ModelSerializer):
         ]
 
 
-class CleaningCompanyMinimalSerializer(serializers.ModelSerializer):
+class CleaningCompanyMinimalSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     services = ServiceCategorySerializer(many=True, read_only=True)
     display_photo_url = serializers.SerializerMethodField()
     username = serializers.CharField(source="user.username", read_only=True)
@@ -89,6 +90,16 @@ class CleaningCompanyMinimalSerializer(serializers.ModelSerializer):
             "email",
         ]
 
+    select_related_fields = {
+        "username": ["user"],
+        "user_id": ["user"],
+        "phone_number": ["user"],
+        "email": ["user"],
+    }
+    prefetch_related_fields = {
+        "services": ["services"],
+    }
+
     def get_display_photo_url(self, obj):
         request = self.context.get("request")
         try:
@@ -1,8 +1,13 @@
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import generics, permissions, status
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from backend.conditional import ConditionalListMixin, conditional_object_response
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.throttling import BROWSE_THROTTLES
+
 from .models import ServiceCategory, CleaningCompany, CleaningWorkImage
 from .serializers import (
     ServiceCategorySerializer,
@@ -72,6 +77,14 @@ class MyCleaningCompanyView(generics.RetrieveUpdateAPIView):
             return CleaningCompanyUpdateSerializer
         return CleaningCompanyMinimalSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_object_response(
+            request,
+            lambda: Response(self.get_serializer(instance).data),
+            instance, request.user,
+        )
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
@@ -104,7 +117,7 @@ class MyCleaningCompanyLocationView(APIView):
 
         company.current_latitude = lat
         company.current_longitude = lng
-        company.save(update_fields=["current_latitude", "current_longitude"])
+        company.save(update_fields=["current_latitude", "current_longitude", "updated_at"])
 
         return Response({"status": "ok"})
 
@@ -130,7 +143,7 @@ class MyCleaningCompanyDeactivateView(APIView):
         # Delete the company profile and deactivate the underlying user.
         company.delete()
         user.is_active = False
-        user.save(update_fields=["is_active"])
+        user.save(update_fields=["is_active", "updated_at"])
 
         return Response({"detail": "Account deactivated successfully."}, status=status.HTTP_200_OK)
 
@@ -190,15 +203,20 @@ class AdminCompanyListView(generics.ListAPIView):
         return response
 
 
-class PublicCompanyBrowseList(generics.ListAPIView):
-    """Public browse: only verified and active companies."""
+class PublicCompanyBrowseList(ConditionalListMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    """Public browse: only verified and active companies.
+
+    Supports ``?fields=`` / ``?omit=``; related rows are loaded by the
+    serializer only for the fields that are returned.
+    """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = BROWSE_THROTTLES
     serializer_class = CleaningCompanyMinimalSerializer
+    conditional_timestamp_fields = ("updated_at", "user__updated_at")
 
     def get_queryset(self):
         qs = (
-            CleaningCompany.objects.select_related("user")
-            .prefetch_related("services")
+            CleaningCompany.objects
             .filter(verified=True, user__is_active=True)
             .order_by("-created_at")
         )
@@ -221,11 +239,11 @@ class AdminCompanyBulkUpdateView(APIView):
         qs = CleaningCompany.objects.select_related("user").filter(id__in=ids)
         updated = 0
         if verified is not None:
-            updated += qs.update(verified=bool(verified))
+            updated += qs.update(verified=bool(verified), updated_at=timezone.now())
         if enable is not None:
             for c in qs:
                 c.user.is_active = bool(enable)
-                c.user.save(update_fields=["is_active"])
+                c.user.save(update_fields=["is_active", "updated_at"])
         return Response({"updated": updated, "count": qs.count()})
 
 
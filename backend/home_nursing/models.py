@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from accounts.models import LoadDeferredTogetherMixin
 
 
 class NursingServiceCategory(models.Model):
@@ -30,7 +31,7 @@ class NursingServiceCategory(models.Model):
         return f"{self.name} ({self.get_group_display()})"
 
 
-class HomeNurse(models.Model):
+class HomeNurse(LoadDeferredTogetherMixin, models.Model):
     """Profile for a nurse providing home nursing services."""
     LEVEL_ENROLLED = "enrolled"
     LEVEL_REGISTERED = "registered"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from backend.fieldsets import DynamicFieldsMixin
 from .models import HomeNurse, NursingServiceCategory
 
 
@@ -65,7 +66,7 @@ class HomeNurseCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class HomeNurseMinimalSerializer(serializers.ModelSerializer):
+class HomeNurseMinimalSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     services = NursingServiceCategorySerializer(many=True, read_only=True)
     username = serializers.CharField(source="user.username", read_only=True)
     display_photo = serializers.ImageField(read_only=True)
@@ -103,6 +104,16 @@ class HomeNurseMinimalSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    select_related_fields = {
+        "username": ["user"],
+        "user_id": ["user"],
+        "phone_number": ["user"],
+        "email": ["user"],
+    }
+    prefetch_related_fields = {
+        "services": ["services"],
+    }
+
     def get_age(self, obj):
         from datetime import date
         if obj.date_of_birth:
@@ -20,6 +20,10 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import action
 from rest_framework import status
 
+from backend.conditional import ConditionalListMixin, conditional_object_response
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.throttling import BROWSE_THROTTLES
+
 from .models import NursingServiceCategory, HomeNurse
 from .serializers import (
     NursingServiceCategorySerializer,
@@ -78,7 +82,7 @@ class HomeNurseRegisterView(generics.CreateAPIView):
             raise ValidationError({"phone_number": ["phone_number is required."]})
 
         try:
-            user = User.objects.get(phone_number=phone, user_type="home_nurse")
+            user = User.objects.get_by_phone(phone, user_type="home_nurse")
         except User.DoesNotExist:
             raise ValidationError({"phone_number": ["No home nurse user found with this phone number."]})
 
@@ -98,6 +102,14 @@ class MyHomeNurseView(generics.RetrieveUpdateAPIView):
             return HomeNurseUpdateSerializer
         return HomeNurseMinimalSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_object_response(
+            request,
+            lambda: Response(self.get_serializer(instance).data),
+            instance, request.user,
+        )
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
@@ -125,7 +137,7 @@ class MyHomeNurseLocationView(APIView):
 
         nurse.current_latitude = lat
         nurse.current_longitude = lng
-        nurse.save(update_fields=["current_latitude", "current_longitude"])
+        nurse.save(update_fields=["current_latitude", "current_longitude", "updated_at"])
         return Response({"detail": "Location updated"}, status=status.HTTP_200_OK)
 
 
@@ -155,32 +167,37 @@ class AdminHomeNurseActionsView(generics.GenericAPIView):
         nurse = self.get_queryset().get(pk=pk)
         if action_name == "verify":
             nurse.is_verified = True
-            nurse.save(update_fields=["is_verified"])
+            nurse.save(update_fields=["is_verified", "updated_at"])
             return Response({"message": "Nurse verified"})
         if action_name == "unverify":
             nurse.is_verified = False
-            nurse.save(update_fields=["is_verified"])
+            nurse.save(update_fields=["is_verified", "updated_at"])
             return Response({"message": "Nurse unverified"})
         if action_name == "enable":
             nurse.user.is_active = True
-            nurse.user.save(update_fields=["is_active"])
+            nurse.user.save(update_fields=["is_active", "updated_at"])
             return Response({"message": "Nurse account enabled"})
         if action_name == "disable":
             nurse.user.is_active = False
-            nurse.user.save(update_fields=["is_active"])
+            nurse.user.save(update_fields=["is_active", "updated_at"])
             return Response({"message": "Nurse account disabled"})
         return Response({"detail": "Unknown action"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PublicNurseBrowseList(generics.ListAPIView):
-    """Public browse: only verified and active nurses."""
+class PublicNurseBrowseList(ConditionalListMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    """Public browse: only verified and active nurses.
+
+    Supports ``?fields=`` / ``?omit=``; related rows are loaded by the
+    serializer only for the fields that are returned.
+    """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = BROWSE_THROTTLES
     serializer_class = HomeNurseMinimalSerializer
+    conditional_timestamp_fields = ("updated_at", "user__updated_at")
 
     def get_queryset(self):
         qs = (
-            HomeNurse.objects.select_related("user")
-            .prefetch_related("services")
+            HomeNurse.objects
             .filter(is_verified=True, user__is_active=True)
             .order_by("-created_at")
         )
@@ -1,14 +1,15 @@
 from django.contrib import admin
-from .models import HomeownerProfile, Job, JobApplication, Review
+from .models import HomeownerProfile, Job, JobApplication, Review, ArchivedJob, ArchivedJobApplication
 
 # Register your models here.
 
+from django.utils import timezone
 from django.utils.html import format_html
 
 @admin.register(HomeownerProfile)
 class HomeownerProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'home_type', 'number_of_rooms', 'is_verified', 'is_active', 'created_at', 'verification_status')
-    list_filter = ('home_type', 'is_verified', 'is_active', 'created_at')
+    list_filter = ('home_type', 'is_verified', 'is_active', 'has_active_plan', 'created_at')
     search_fields = ('user__username', 'user__email', 'home_address', 'user__first_name', 'user__last_name')
     readonly_fields = ('created_at', 'updated_at', 'verification_status')
     list_editable = ('is_verified', 'is_active')
@@ -36,22 +37,22 @@ class HomeownerProfileAdmin(admin.ModelAdmin):
     verification_status.short_description = 'Verification Status'
 
     def verify_selected(self, request, queryset):
-        updated = queryset.update(is_verified=True)
+        updated = queryset.update(is_verified=True, updated_at=timezone.now())
         self.message_user(request, f"Successfully verified {updated} homeowners.")
     verify_selected.short_description = "Mark selected homeowners as verified"
 
     def unverify_selected(self, request, queryset):
-        updated = queryset.update(is_verified=False)
+        updated = queryset.update(is_verified=False, updated_at=timezone.now())
         self.message_user(request, f"Successfully unverified {updated} homeowners.")
     unverify_selected.short_description = "Mark selected homeowners as unverified"
 
     def activate_selected(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
         self.message_user(request, f"Successfully activated {updated} homeowners.")
     activate_selected.short_description = "Activate selected homeowners"
 
     def deactivate_selected(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
         self.message_user(request, f"Successfully deactivated {updated} homeowners.")
     deactivate_selected.short_description = "Deactivate selected homeowners"
 
@@ -59,10 +60,38 @@ class HomeownerProfileAdmin(admin.ModelAdmin):
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
     list_display = ('title', 'homeowner', 'status', 'job_date', 'hourly_rate', 'assigned_maid', 'created_at')
-    list_filter = ('status', 'job_date')
+    list_filter = ('status', 'is_listed', 'job_date')
     search_fields = ('title', 'homeowner__user__username', 'location')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('is_listed', 'created_at', 'updated_at')
+    date_hierarchy = 'job_date'
+
+
+class ArchivedJobApplicationInline(admin.TabularInline):
+    model = ArchivedJobApplication
+    fields = ('id', 'maid', 'cleaning_company', 'nurse', 'status', 'proposed_rate', 'created_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedJob)
+class ArchivedJobAdmin(admin.ModelAdmin):
+    """Read-only: rows are written by the archive_jobs command."""
+    list_display = ('id', 'title', 'homeowner', 'status', 'job_date', 'assigned_maid', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('title', 'homeowner__user__username', 'location')
+    list_select_related = ('homeowner__user', 'assigned_maid__user')
     date_hierarchy = 'job_date'
+    inlines = [ArchivedJobApplicationInline]
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
 
 
 @admin.register(JobApplication)
@@ -0,0 +1,213 @@
+"""The provider job feed: listed jobs ranked by distance, then recency.
+
+Jobs within ``JOB_FEED_RADIUS_KM`` of the provider come first, in distance
+bands of ``JOB_FEED_BAND_KM`` and newest first within a band, so a fresh job
+a few kilometres further away is not buried under old ones next door. Jobs
+further away follow newest first, then jobs without coordinates, newest
+first, so every listed job is reachable. A provider without a location gets
+every listed job newest first.
+
+Only listed jobs are read (``Job.listed_q``). Nearby candidates come from a
+bounding-box range scan on the partial latitude index over listed jobs,
+fetching just the columns needed to rank them. The far phase reads the jobs
+outside that box in keyset order on the partial created_at index, merged
+with the few inside the box but beyond the radius (its corners) found by the
+same box scan, so it never walks the nearby jobs again. Jobs without
+coordinates are read in keyset order too. Pages are addressed by an opaque
+cursor holding the position of the last job served and the origin the feed
+was ranked from, so a provider moving mid-scroll does not reshuffle pages.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Job
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+NEARBY = "near"
+FAR = "far"
+REMAINING = "rest"
+
+PROVIDER_PROFILES = ("maid_profile", "cleaning_company", "home_nurse")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points (in km)."""
+    rlat1, rlon1, rlat2, rlon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((rlat2 - rlat1) / 2) ** 2 + cos(rlat1) * cos(rlat2) * sin((rlon2 - rlon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def provider_origin(user):
+    """The provider's live location, else its base location, else None."""
+    for name in PROVIDER_PROFILES:
+        profile = getattr(user, name, None)
+        if profile is None:
+            continue
+        latitude, longitude = profile.current_latitude, profile.current_longitude
+        if latitude is None or longitude is None:
+            latitude, longitude = profile.latitude, profile.longitude
+        if latitude is None or longitude is None:
+            return None
+        return float(latitude), float(longitude)
+    return None
+
+
+def _micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(value):
+    """Position from a cursor string; raises InvalidCursor if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        origin = position["origin"]
+        if origin is not None:
+            position["origin"] = (float(origin[0]), float(origin[1]))
+        if position["phase"] not in (NEARBY, FAR, REMAINING):
+            raise ValueError(position["phase"])
+        if origin is None and position["phase"] != REMAINING:
+            raise ValueError(position["phase"])
+        position["band"] = int(position["band"]) if position["phase"] == NEARBY else None
+        position["created"] = int(position["created"])
+        position["id"] = int(position["id"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidCursor(value)
+    return position
+
+
+def _bounding_box(origin):
+    """Q matching jobs in the box around ``origin`` that holds the radius."""
+    latitude, longitude = origin
+    radius = settings.JOB_FEED_RADIUS_KM
+    lat_span = radius / KM_PER_DEGREE
+    lng_span = radius / (KM_PER_DEGREE * max(cos(radians(latitude)), 0.01))
+    return Q(
+        latitude__range=(latitude - lat_span, latitude + lat_span),
+        longitude__range=(longitude - lng_span, longitude + lng_span),
+    )
+
+
+def _in_box(origin):
+    """``(id, distance, created micros)`` of every listed job in the box."""
+    latitude, longitude = origin
+    candidates = Job.objects.filter(Job.listed_q(), _bounding_box(origin)).order_by().values_list(
+        "id", "latitude", "longitude", "created_at",
+    )
+    for pk, job_latitude, job_longitude, created_at in candidates:
+        distance = distance_km(latitude, longitude, float(job_latitude), float(job_longitude))
+        yield pk, distance, _micros(created_at)
+
+
+def _nearby(origin, position, limit):
+    """Up to ``limit`` ``(position, job id, distance)`` entries within the
+    radius, ranked, after ``position`` when given."""
+    radius = settings.JOB_FEED_RADIUS_KM
+    after = None
+    if position is not None:
+        after = (position["band"], -position["created"], -position["id"])
+
+    ranked = []
+    for pk, distance, created in _in_box(origin):
+        if distance > radius:
+            continue
+        key = (int(distance // settings.JOB_FEED_BAND_KM), -created, -pk)
+        if after is None or key > after:
+            ranked.append((key, distance))
+    ranked.sort()
+    return [
+        ({"origin": origin, "phase": NEARBY, "band": band, "created": -created, "id": -pk}, -pk, distance)
+        for (band, created, pk), distance in ranked[:limit]
+    ]
+
+
+def _newest_first(queryset, position):
+    if position is not None:
+        created_at = EPOCH + timedelta(microseconds=position["created"])
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=position["id"]))
+    return queryset.order_by("-created_at", "-id")
+
+
+def _far(origin, position, limit):
+    """Up to ``limit`` entries of the jobs with coordinates beyond the radius,
+    newest first, after ``position`` when given."""
+    latitude, longitude = origin
+    radius = settings.JOB_FEED_RADIUS_KM
+    after = None if position is None else (position["created"], position["id"])
+
+    # Beyond the radius but inside the box: only the box's corners.
+    found = [
+        (created, pk, distance) for pk, distance, created in _in_box(origin)
+        if distance > radius and (after is None or (created, pk) < after)
+    ]
+    outside = _newest_first(
+        Job.objects.filter(Job.listed_q(), ~_bounding_box(origin), latitude__isnull=False, longitude__isnull=False),
+        position,
+    ).values_list("id", "latitude", "longitude", "created_at")[:limit]
+    for pk, job_latitude, job_longitude, created_at in outside:
+        distance = distance_km(latitude, longitude, float(job_latitude), float(job_longitude))
+        found.append((_micros(created_at), pk, distance))
+
+    found.sort(reverse=True)
+    return [
+        ({"origin": origin, "phase": FAR, "band": None, "created": created, "id": pk}, pk, distance)
+        for created, pk, distance in found[:limit]
+    ]
+
+
+def _remaining(origin, position, limit):
+    """Up to ``limit`` entries of the jobs not ranked by distance, newest
+    first, after ``position`` when given."""
+    queryset = Job.objects.filter(Job.listed_q())
+    if origin is not None:
+        queryset = queryset.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
+    rows = _newest_first(queryset, position).values_list("id", "created_at")[:limit]
+    return [
+        ({"origin": origin, "phase": REMAINING, "band": None, "created": _micros(created_at), "id": pk}, pk, None)
+        for pk, created_at in rows
+    ]
+
+
+def feed_page(origin, position=None, page_size=None):
+    """One page of the feed as ``(entries, next_cursor)``.
+
+    ``entries`` are ``(job id, distance in km or None)`` in feed order;
+    ``next_cursor`` is None on the last page. When continuing from
+    ``position`` (a decoded cursor) its origin is used.
+    """
+    page_size = page_size or settings.JOB_FEED_PAGE_SIZE
+    if position is not None:
+        origin = position["origin"]
+    phases = [(NEARBY, _nearby), (FAR, _far), (REMAINING, _remaining)] if origin is not None else [
+        (REMAINING, _remaining)
+    ]
+    if position is not None:
+        phases = phases[[phase for phase, _ in phases].index(position["phase"]):]
+
+    entries = []
+    for _, fetch in phases:
+        if len(entries) > page_size:
+            break
+        entries += fetch(origin, position, page_size + 1 - len(entries))
+        position = None
+
+    next_cursor = encode_cursor(entries[page_size - 1][0]) if len(entries) > page_size else None
+    return [(pk, distance) for _, pk, distance in entries[:page_size]], next_cursor
@@ -0,0 +1,20 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Avg
+
+from maid.models import MaidProfile
+from outbox.dispatch import register
+from .models import Review
+
+
+@register("review.created")
+def recompute_maid_rating(event):
+    """Refresh the reviewed maid's average rating."""
+    reviewee_id = event.payload["reviewee_id"]
+    maid_profile = MaidProfile.objects.filter(user_id=reviewee_id).first()
+    if maid_profile is None:
+        return
+    avg = Review.objects.filter(reviewee_id=reviewee_id).aggregate(Avg('rating'))['rating__avg'] or 0
+    maid_profile.rating = Decimal(str(avg)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    maid_profile.save(update_fields=['rating', 'updated_at'])
+
@@ -0,0 +1,65 @@
+"""Job lifecycle: expiry of past open jobs and archival of finished ones.
+
+Nothing closes a job whose date has passed without anyone being hired, so
+``expire_past_jobs`` marks such jobs ``expired`` (which also takes them out
+of the provider feed). ``archive_finished_jobs`` then moves jobs that have
+been completed, cancelled or expired for ``JOB_ARCHIVE_AFTER_DAYS`` into
+``ArchivedJob``, together with their applications, so the ``jobs`` and
+``job_applications`` tables only hold live work. Reviews of an archived job
+point at its archive row instead.
+
+Each batch is copied and deleted in one database transaction. Run both from
+cron once a day with the ``archive_jobs`` command.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedJob, ArchivedJobApplication, Job, JobApplication, Review
+
+
+def _copied(model):
+    return [field.attname for field in model._meta.concrete_fields if field.name != "archived_at"]
+
+
+def expire_past_jobs(today=None):
+    """Mark open jobs dated before ``today`` expired; returns how many."""
+    today = today or timezone.localdate()
+    return Job.objects.filter(status="open", job_date__lt=today).update(
+        status="expired", is_listed=False, listed_until=None, updated_at=timezone.now(),
+    )
+
+
+def archive_finished_jobs(after_days=None, batch_size=None):
+    """Archive jobs finished more than ``after_days`` ago in batches;
+    returns ``(jobs, applications)`` archived."""
+    if after_days is None:
+        after_days = settings.JOB_ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.JOB_ARCHIVE_BATCH_SIZE
+    now = timezone.now()
+    finished = Job.objects.filter(
+        status__in=Job.FINISHED_STATUSES, updated_at__lt=now - timedelta(days=after_days),
+    )
+    job_fields, application_fields = _copied(ArchivedJob), _copied(ArchivedJobApplication)
+
+    jobs = applications = 0
+    while True:
+        with transaction.atomic():
+            rows = list(finished.select_for_update().order_by("pk").values(*job_fields)[:batch_size])
+            if not rows:
+                return jobs, applications
+            ids = [row["id"] for row in rows]
+            ArchivedJob.objects.bulk_create(ArchivedJob(archived_at=now, **row) for row in rows)
+            application_rows = JobApplication.objects.filter(job_id__in=ids).values(*application_fields)
+            archived_applications = ArchivedJobApplication.objects.bulk_create(
+                ArchivedJobApplication(**row) for row in application_rows
+            )
+            Review.objects.filter(job_id__in=ids).update(archived_job_id=F("job_id"), job=None)
+            JobApplication.objects.filter(job_id__in=ids).delete()
+            Job.objects.filter(pk__in=ids).delete()
+        jobs += len(rows)
+        applications += len(archived_applications)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from homeowner.lifecycle import archive_finished_jobs, expire_past_jobs
+
+
+class Command(BaseCommand):
+    help = "Expire open jobs whose date has passed and archive finished jobs (run daily from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after-days", type=int, help="Archive jobs finished this many days ago (JOB_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument("--batch-size", type=int, help="Jobs per transaction (JOB_ARCHIVE_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        expired = expire_past_jobs()
+        jobs, applications = archive_finished_jobs(options["after_days"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {expired} past jobs; archived {jobs} jobs and {applications} applications"
+        ))
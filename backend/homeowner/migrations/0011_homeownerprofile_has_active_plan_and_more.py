@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:10
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def backfill_active_plan(apps, schema_editor):
+    HomeownerProfile = apps.get_model('homeowner', 'HomeownerProfile')
+    subscribed = Q(
+        subscription_type__in=['monthly', 'day_pass'],
+        subscription_expires_at__gt=timezone.now(),
+    )
+    HomeownerProfile.objects.filter(has_live_in_credit=True).update(has_active_plan=True)
+    HomeownerProfile.objects.filter(subscribed, has_live_in_credit=False).update(
+        has_active_plan=True, plan_expires_at=F('subscription_expires_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homeowner', '0010_homeownerprofile_has_live_in_credit_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homeownerprofile',
+            name='has_active_plan',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='homeownerprofile',
+            name='plan_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, help_text='When the active plan runs out (empty while a live-in credit is held)', null=True),
+        ),
+        migrations.RunPython(backfill_active_plan, migrations.RunPython.noop),
+    ]
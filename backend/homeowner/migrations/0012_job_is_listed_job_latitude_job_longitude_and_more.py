@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_jobs(apps, schema_editor):
+    HomeownerProfile = apps.get_model('homeowner', 'HomeownerProfile')
+    Job = apps.get_model('homeowner', 'Job')
+    homes = HomeownerProfile.objects.filter(pk=OuterRef('homeowner_id'))
+    Job.objects.filter(
+        latitude__isnull=True,
+        homeowner__latitude__isnull=False,
+        homeowner__longitude__isnull=False,
+    ).update(
+        latitude=Subquery(homes.values('latitude')[:1]),
+        longitude=Subquery(homes.values('longitude')[:1]),
+    )
+    Job.objects.filter(status='open', homeowner__has_active_plan=True).update(is_listed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homeowner', '0011_homeownerprofile_has_active_plan_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='is_listed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['latitude'], name='jobs_listed_latitude_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['created_at'], name='jobs_listed_created_idx'),
+        ),
+        migrations.RunPython(backfill_jobs, migrations.RunPython.noop),
+    ]
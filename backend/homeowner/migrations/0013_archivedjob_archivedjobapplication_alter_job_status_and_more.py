@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cleaning_company', '0015_alter_cleaningcompany_has_active_subscription_and_more'),
+        ('home_nursing', '0010_homenurse_onboarding_fee_paid_and_more'),
+        ('homeowner', '0012_job_is_listed_job_latitude_job_longitude_and_more'),
+        ('maid', '0009_maidprofile_onboarding_fee_paid_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJob',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('location', models.TextField()),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('job_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('assigned', 'Assigned'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Job',
+                'verbose_name_plural': 'Archived Jobs',
+                'db_table': 'jobs_archive',
+                'ordering': ['-job_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedJobApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cover_letter', models.TextField(blank=True, null=True)),
+                ('proposed_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Job Application',
+                'verbose_name_plural': 'Archived Job Applications',
+                'db_table': 'job_applications_archive',
+            },
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('assigned', 'Assigned'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='open', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'job_date'], name='jobs_status_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedjob',
+            name='assigned_maid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_assigned_jobs', to='maid.maidprofile'),
+        ),
+        migrations.AddField(
+            model_name='archivedjob',
+            name='homeowner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_jobs', to='homeowner.homeownerprofile'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='archived_job',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='homeowner.archivedjob'),
+        ),
+        migrations.AddField(
+            model_name='archivedjobapplication',
+            name='cleaning_company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_applications', to='cleaning_company.cleaningcompany'),
+        ),
+        migrations.AddField(
+            model_name='archivedjobapplication',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='homeowner.archivedjob'),
+        ),
+        migrations.AddField(
+            model_name='archivedjobapplication',
+            name='maid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_applications', to='maid.maidprofile'),
+        ),
+        migrations.AddField(
+            model_name='archivedjobapplication',
+            name='nurse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_applications', to='home_nursing.homenurse'),
+        ),
+    ]
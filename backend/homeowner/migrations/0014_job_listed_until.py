@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_listed_until(apps, schema_editor):
+    HomeownerProfile = apps.get_model('homeowner', 'HomeownerProfile')
+    Job = apps.get_model('homeowner', 'Job')
+    homes = HomeownerProfile.objects.filter(pk=OuterRef('homeowner_id'))
+    Job.objects.filter(is_listed=True).update(listed_until=Subquery(homes.values('plan_expires_at')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homeowner', '0013_archivedjob_archivedjobapplication_alter_job_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='listed_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_listed_until, migrations.RunPython.noop),
+    ]
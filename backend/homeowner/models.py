@@ -1,9 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from accounts.models import LoadDeferredTogetherMixin
 
 # Create your models here.
 
-class HomeownerProfile(models.Model):
+class HomeownerProfile(LoadDeferredTogetherMixin, models.Model):
     """
     Extended profile for Homeowner users
     """
@@ -62,6 +64,18 @@ class HomeownerProfile(models.Model):
         null=True,
         help_text="When the current subscription (monthly/day pass) expires",
     )
+    # Entitlement derived from the plan fields above whenever they are saved
+    # and switched off by the ``expire_plans`` sweep once it runs out, so job
+    # feeds filter on one indexed column.
+    has_active_plan = models.BooleanField(default=False, db_index=True, editable=False)
+    plan_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+        help_text="When the active plan runs out (empty while a live-in credit is held)",
+    )
+    PLAN_FIELDS = {"has_live_in_credit", "subscription_type", "subscription_expires_at"}
     
     # Documents
     id_document = models.FileField(upload_to='homeowner_documents/ids/', blank=True, null=True, help_text="Upload a copy of government-issued ID")
@@ -78,6 +92,30 @@ class HomeownerProfile(models.Model):
     def __str__(self):
         return f"Homeowner Profile - {self.user.username}"
 
+    def refresh_plan(self, now=None):
+        """Recompute ``has_active_plan``/``plan_expires_at`` from the plan fields."""
+        now = now or timezone.now()
+        subscribed = (
+            self.subscription_type in (self.SUB_MONTHLY, self.SUB_DAY_PASS)
+            and self.subscription_expires_at is not None
+            and self.subscription_expires_at > now
+        )
+        self.has_active_plan = bool(self.has_live_in_credit or subscribed)
+        self.plan_expires_at = self.subscription_expires_at if subscribed and not self.has_live_in_credit else None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.PLAN_FIELDS.intersection(update_fields):
+            self.refresh_plan()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'has_active_plan', 'plan_expires_at'}
+            refresh_jobs = self.pk is not None
+        else:
+            refresh_jobs = False
+        super().save(*args, **kwargs)
+        if refresh_jobs:
+            Job.refresh_listing([self.pk])
+
 
 class Job(models.Model):
     """
@@ -89,18 +127,32 @@ class Job(models.Model):
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
     )
+    # Jobs in these states are moved to ArchivedJob (see homeowner.lifecycle)
+    FINISHED_STATUSES = ('completed', 'cancelled', 'expired')
     
     homeowner = models.ForeignKey(HomeownerProfile, on_delete=models.CASCADE, related_name='jobs')
     title = models.CharField(max_length=200)
     description = models.TextField()
     location = models.TextField()
+    # Where the job takes place; defaults to the homeowner's base location
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     job_date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     assigned_maid = models.ForeignKey('maid.MaidProfile', on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_jobs')
+    # Whether providers see the job in their feed: it is open and its
+    # homeowner has an active plan, which runs out at ``listed_until`` (the
+    # homeowner's ``plan_expires_at``). Kept in step by ``save`` and
+    # ``refresh_listing`` so the feed reads the job row instead of joining
+    # the homeowner; filter with ``Job.listed_q()`` so expiry is exact between
+    # ``expire_plans`` sweeps.
+    is_listed = models.BooleanField(default=False, editable=False)
+    listed_until = models.DateTimeField(null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -110,10 +162,54 @@ class Job(models.Model):
         verbose_name = 'Job'
         verbose_name_plural = 'Jobs'
         ordering = ['-created_at']
+        # Partial indexes over listed jobs only, for the provider feed
+        indexes = [
+            models.Index(fields=['latitude'], condition=models.Q(is_listed=True), name='jobs_listed_latitude_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(is_listed=True), name='jobs_listed_created_idx'),
+            models.Index(fields=['status', 'job_date'], name='jobs_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.homeowner.user.username}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'status' in update_fields:
+            plan = HomeownerProfile.objects.filter(
+                pk=self.homeowner_id, has_active_plan=True,
+            ).values_list('plan_expires_at').first() if self.status == 'open' else None
+            self.is_listed = plan is not None
+            self.listed_until = plan[0] if plan is not None else None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'is_listed', 'listed_until'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def listed_q(now=None):
+        """Filter for the jobs currently in the provider feed."""
+        now = now or timezone.now()
+        return models.Q(is_listed=True) & (models.Q(listed_until__isnull=True) | models.Q(listed_until__gt=now))
+
+    @classmethod
+    def refresh_listing(cls, homeowner_ids, now=None):
+        """Recompute ``is_listed``/``listed_until`` for the jobs of
+        ``homeowner_ids`` after their plans changed in bulk; returns the
+        number of jobs changed."""
+        now = now or timezone.now()
+        jobs = cls.objects.filter(homeowner_id__in=homeowner_ids)
+        plan_expires_at = HomeownerProfile.objects.filter(pk=models.OuterRef('homeowner_id')).values('plan_expires_at')
+        unchanged = models.Q(is_listed=True) & (
+            models.Q(listed_until=models.F('homeowner__plan_expires_at'))
+            | models.Q(listed_until__isnull=True, homeowner__plan_expires_at__isnull=True)
+        )
+        listed = jobs.filter(status='open', homeowner__has_active_plan=True).exclude(unchanged).update(
+            is_listed=True, listed_until=models.Subquery(plan_expires_at[:1]), updated_at=now,
+        )
+        unlisted = jobs.filter(is_listed=True).filter(
+            ~models.Q(status='open') | models.Q(homeowner__has_active_plan=False)
+        ).update(is_listed=False, listed_until=None, updated_at=now)
+        return listed + unlisted
+
 
 class JobApplication(models.Model):
     """Applications to homeowner jobs.
@@ -158,6 +254,8 @@ class Review(models.Model):
     """
     # Job is optional to allow direct maid ratings outside of a specific job
     job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviews')
+    # Set instead of ``job`` once the job has been archived
+    archived_job = models.ForeignKey('ArchivedJob', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='reviews')
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews_given')
     reviewee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews_received')
     # Sub-ratings (1-5 each)
@@ -197,3 +295,59 @@ class ClosedJob(models.Model):
 
     def __str__(self):
         return f"{self.homeowner.user.username} closed with {self.maid.user.username} at {self.created_at}"
+
+
+class ArchivedJob(models.Model):
+    """
+    Finished job moved out of ``jobs`` by the ``archive_jobs`` command.
+
+    Keeps the id it had as a Job so links to it stay meaningful.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    homeowner = models.ForeignKey(HomeownerProfile, on_delete=models.CASCADE, related_name='archived_jobs')
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    location = models.TextField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    job_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Job.STATUS_CHOICES)
+    assigned_maid = models.ForeignKey('maid.MaidProfile', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_assigned_jobs')
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'jobs_archive'
+        verbose_name = 'Archived Job'
+        verbose_name_plural = 'Archived Jobs'
+        ordering = ['-job_date', '-id']
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, archived)"
+
+
+class ArchivedJobApplication(models.Model):
+    """
+    Application to a job, archived together with the job.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    job = models.ForeignKey(ArchivedJob, on_delete=models.CASCADE, related_name='applications')
+    maid = models.ForeignKey('maid.MaidProfile', on_delete=models.CASCADE, null=True, blank=True, related_name='archived_job_applications')
+    cleaning_company = models.ForeignKey('cleaning_company.CleaningCompany', on_delete=models.CASCADE, null=True, blank=True, related_name='archived_job_applications')
+    nurse = models.ForeignKey('home_nursing.HomeNurse', on_delete=models.CASCADE, null=True, blank=True, related_name='archived_job_applications')
+    cover_letter = models.TextField(blank=True, null=True)
+    proposed_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=JobApplication.STATUS_CHOICES)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'job_applications_archive'
+        verbose_name = 'Archived Job Application'
+        verbose_name_plural = 'Archived Job Applications'
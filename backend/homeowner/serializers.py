@@ -1,5 +1,7 @@
+from django.db.models import Count
 from rest_framework import serializers
-from .models import HomeownerProfile, Job, JobApplication, Review
+from backend.fieldsets import DynamicFieldsMixin
+from .models import HomeownerProfile, Job, JobApplication, Review, ArchivedJob, ArchivedJobApplication
 from maid.models import MaidProfile
 from accounts.serializers import UserSerializer
 from maid.serializers import MaidProfileListSerializer
@@ -21,12 +23,14 @@ class HomeownerProfileSerializer(serializers.ModelSerializer):
             'is_verified', 'is_active', 'verification_notes',
             'has_live_in_credit', 'live_in_credit_awarded_at',
             'subscription_type', 'subscription_expires_at',
+            'has_active_plan', 'plan_expires_at',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'created_at', 'updated_at',
             'has_live_in_credit', 'live_in_credit_awarded_at',
             'subscription_type', 'subscription_expires_at',
+            'has_active_plan', 'plan_expires_at',
         ]
 
 
@@ -52,7 +56,7 @@ class JobSerializer(serializers.ModelSerializer):
         model = Job
         fields = [
             'id', 'homeowner', 'title', 'description', 'location',
-            'job_date', 'start_time', 'end_time', 'hourly_rate',
+            'latitude', 'longitude', 'job_date', 'start_time', 'end_time', 'hourly_rate',
             'status', 'assigned_maid', 'applications_count',
             'created_at', 'updated_at'
         ]
@@ -69,12 +73,19 @@ class JobCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
         fields = [
-            'title', 'description', 'location', 'job_date',
-            'start_time', 'end_time', 'hourly_rate'
+            'title', 'description', 'location', 'latitude', 'longitude',
+            'job_date', 'start_time', 'end_time', 'hourly_rate'
         ]
 
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Provide both latitude and longitude, or neither.')
+        return attrs
+
 
-class JobListSerializer(serializers.ModelSerializer):
+class JobListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing jobs
     """
@@ -84,15 +95,46 @@ class JobListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
         fields = [
-            'id', 'homeowner_name', 'title', 'description', 'location', 'job_date',
+            'id', 'homeowner_name', 'title', 'description', 'location',
+            'latitude', 'longitude', 'job_date',
             'start_time', 'end_time', 'hourly_rate', 'status',
             'applications_count', 'created_at'
         ]
+
+    select_related_fields = {
+        'homeowner_name': ['homeowner__user'],
+    }
+
+    @classmethod
+    def setup_queryset(cls, queryset, request=None):
+        queryset = super().setup_queryset(queryset, request)
+        if 'applications_count' in cls.requested_field_names(request):
+            queryset = queryset.annotate(num_applications=Count('applications', distinct=True))
+        return queryset
     
     def get_applications_count(self, obj):
+        # Use the list annotation when present to avoid one COUNT per job
+        count = getattr(obj, 'num_applications', None)
+        if count is not None:
+            return count
         return obj.applications.count()
 
 
+class JobFeedSerializer(JobListSerializer):
+    """
+    Job in a provider's feed, with its distance from the provider
+    """
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(JobListSerializer.Meta):
+        fields = JobListSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        # Set by homeowner.feed when ranking
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
+
+
 class JobApplicationSerializer(serializers.ModelSerializer):
     """
     Serializer for JobApplication model
@@ -120,13 +162,63 @@ class JobApplicationCreateSerializer(serializers.ModelSerializer):
         fields = ['job', 'cover_letter', 'proposed_rate']
 
 
+class ArchivedJobApplicationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an archived job's applications
+    """
+    maid = MaidProfileListSerializer(read_only=True)
+    cleaning_company = CleaningCompanyMinimalSerializer(read_only=True)
+    nurse = HomeNurseMinimalSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedJobApplication
+        fields = [
+            'id', 'maid', 'cleaning_company', 'nurse',
+            'cover_letter', 'proposed_rate', 'status', 'created_at', 'updated_at'
+        ]
+
+
+class ArchivedJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for job history (archived jobs)
+    """
+    homeowner_name = serializers.CharField(source='homeowner.user.username', read_only=True)
+    assigned_maid = MaidProfileListSerializer(read_only=True)
+    applications_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedJob
+        fields = [
+            'id', 'homeowner_name', 'title', 'description', 'location',
+            'latitude', 'longitude', 'job_date', 'start_time', 'end_time',
+            'hourly_rate', 'status', 'assigned_maid', 'applications_count',
+            'created_at', 'updated_at', 'archived_at'
+        ]
+
+    def get_applications_count(self, obj):
+        count = getattr(obj, 'num_applications', None)
+        if count is not None:
+            return count
+        return obj.applications.count()
+
+
+class ArchivedJobDetailSerializer(ArchivedJobSerializer):
+    """
+    Archived job with its applications
+    """
+    applications = ArchivedJobApplicationSerializer(many=True, read_only=True)
+
+    class Meta(ArchivedJobSerializer.Meta):
+        fields = ArchivedJobSerializer.Meta.fields + ['applications']
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """
     Serializer for Review model
     """
     reviewer = UserSerializer(read_only=True)
     reviewee = UserSerializer(read_only=True)
-    job_title = serializers.CharField(source='job.title', read_only=True)
+    job_title = serializers.SerializerMethodField()
     
     class Meta:
         model = Review
@@ -138,6 +230,10 @@ class ReviewSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['reviewer', 'reviewee', 'created_at']
 
+    def get_job_title(self, obj):
+        job = obj.job or obj.archived_job
+        return job.title if job is not None else None
+
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
     """
@@ -1,3 +1,328 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Case
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.tests import client_for
+from maid.models import MaidProfile
+from maid.tests import make_maid
+
+from .feed import FAR, NEARBY, REMAINING, _far, decode_cursor, encode_cursor, feed_page
+from .lifecycle import archive_finished_jobs, expire_past_jobs
+from .models import ArchivedJob, ArchivedJobApplication, HomeownerProfile, Job, JobApplication, Review
+
+KAMPALA = (0.3476, 32.5825)
+
+
+def make_homeowner(username="home", phone="+256700000100", **plan):
+    user = User.objects.create_user(username=username, password="pass-12345", phone_number=phone, user_type="homeowner")
+    plan.setdefault("has_live_in_credit", True)
+    return HomeownerProfile.objects.create(user=user, **plan)
+
+
+def make_job(homeowner, title, latitude=None, longitude=None, **fields):
+    fields.setdefault("job_date", date(2030, 1, 1))
+    return Job.objects.create(
+        homeowner=homeowner, title=title, description="Cleaning", location="Kampala",
+        latitude=latitude, longitude=longitude,
+        start_time=time(9), end_time=time(12), hourly_rate=10000, **fields,
+    )
+
+
+@override_settings(JOB_FEED_RADIUS_KM=50, JOB_FEED_BAND_KM=5)
+class FeedTests(TestCase):
+    def setUp(self):
+        homeowner = make_homeowner()
+        # Created oldest first
+        self.near = make_job(homeowner, "near", 0.35, 32.58)
+        self.unlocated = make_job(homeowner, "unlocated")
+        self.far = make_job(homeowner, "far (Entebbe-Jinja range)", 0.6, 33.2)
+        self.very_far = make_job(homeowner, "very far (Gulu)", 2.77, 32.3)
+        self.bbox_corner = make_job(homeowner, "bbox corner", 0.3476 + 0.4, 32.5825 + 0.4)
+        self.next_door = make_job(homeowner, "next door", 0.3477, 32.5826)
+
+    def pages(self, origin, page_size):
+        ids, phases, position = [], [], None
+        while True:
+            entries, cursor = feed_page(origin, position, page_size)
+            ids += [pk for pk, _ in entries]
+            if cursor is None:
+                return ids, phases
+            position = decode_cursor(cursor)
+            phases.append(position["phase"])
+
+    def test_every_listed_job_is_reachable_in_order(self):
+        expected = [
+            self.next_door.pk, self.near.pk,
+            self.bbox_corner.pk, self.very_far.pk, self.far.pk,
+            self.unlocated.pk,
+        ]
+        for page_size in (1, 2, 4, 10):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.pages(KAMPALA, page_size)[0], expected)
+        self.assertEqual(self.pages(KAMPALA, 1)[1], [NEARBY, NEARBY, FAR, FAR, FAR])
+
+    def test_far_jobs_carry_their_distance(self):
+        entries, _ = feed_page(KAMPALA, None, 10)
+        distances = dict(entries)
+        self.assertGreater(distances[self.very_far.pk], 250)
+        self.assertIsNone(distances[self.unlocated.pk])
+
+    def test_without_origin_newest_first(self):
+        ids, phases = self.pages(None, 2)
+        self.assertEqual(ids, [
+            self.next_door.pk, self.bbox_corner.pk, self.very_far.pk,
+            self.far.pk, self.unlocated.pk, self.near.pk,
+        ])
+        self.assertEqual(set(phases), {REMAINING})
+
+    def test_unlisted_jobs_are_skipped(self):
+        Job.objects.filter(pk=self.far.pk).update(is_listed=False)
+        self.assertNotIn(self.far.pk, self.pages(KAMPALA, 2)[0])
+
+    def test_far_phase_reads_only_jobs_outside_the_box(self):
+        for n in range(20):
+            make_job(self.near.homeowner, f"nearby {n}", 0.35, 32.58)
+        with CaptureQueriesContext(connection) as queries:
+            entries = _far(KAMPALA, None, 2)
+        self.assertEqual([pk for _, pk, _ in entries], [self.bbox_corner.pk, self.very_far.pk])
+        # The corner comes from the bounding-box scan; the rest from one
+        # bounded query that leaves the box out
+        outside = [query["sql"] for query in queries if "NOT" in query["sql"]]
+        self.assertEqual(len(outside), 1)
+        self.assertIn("LIMIT 2", outside[0])
+
+    def test_located_phase_cursor_needs_origin(self):
+        cursor = encode_cursor({"origin": None, "phase": FAR, "band": None, "created": 0, "id": 1})
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor)
+
+
+class PlanExpiryListingTests(TestCase):
+    """Jobs leave the feed when the plan runs out, without the expiry sweep."""
+
+    def setUp(self):
+        self.expires = timezone.now() + timedelta(hours=1)
+        self.homeowner = make_homeowner(
+            has_live_in_credit=False,
+            subscription_type=HomeownerProfile.SUB_DAY_PASS,
+            subscription_expires_at=self.expires,
+        )
+        self.job = make_job(self.homeowner, "day pass job")
+
+    def later(self, hours=2):
+        return mock.patch("django.utils.timezone.now", return_value=self.expires + timedelta(hours=hours - 1))
+
+    def test_job_carries_plan_expiry(self):
+        self.assertTrue(self.job.is_listed)
+        self.assertEqual(self.job.listed_until, self.expires)
+        self.assertEqual([pk for pk, _ in feed_page(None)[0]], [self.job.pk])
+
+    def test_feed_drops_expired_plan(self):
+        with self.later():
+            self.assertEqual(feed_page(None)[0], [])
+            self.assertFalse(Job.objects.filter(Job.listed_q()).exists())
+
+    def test_renewal_moves_listing_expiry(self):
+        renewed = self.expires + timedelta(days=1)
+        self.homeowner.subscription_expires_at = renewed
+        self.homeowner.save()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.listed_until, renewed)
+        with self.later():
+            self.assertEqual([pk for pk, _ in feed_page(None)[0]], [self.job.pk])
+
+    def test_maid_list_drops_expired_plan(self):
+        user = User.objects.create_user(
+            username="maid", password="pass-12345", phone_number="+256700000200", user_type="maid",
+        )
+        MaidProfile.objects.create(user=user)
+        client = client_for(user)
+        self.assertEqual(client.get("/api/homeowner/jobs/").data["count"], 1)
+        with self.later():
+            self.assertEqual(client.get("/api/homeowner/jobs/").data["count"], 0)
+
+    def test_unchanged_plan_leaves_jobs_alone(self):
+        updated_at = Job.objects.get(pk=self.job.pk).updated_at
+        self.homeowner.home_address = "Ntinda"
+        self.homeowner.save()
+        self.assertEqual(Job.objects.get(pk=self.job.pk).updated_at, updated_at)
+        self.assertEqual(Job.refresh_listing([self.homeowner.pk]), 0)
+
+
+class ApplicationDecisionTests(TestCase):
+    def setUp(self):
+        self.homeowner = make_homeowner()
+        self.job = make_job(self.homeowner, "one maid needed")
+        self.maids = []
+        for n in range(3):
+            user = User.objects.create_user(
+                username=f"maid{n}", password="pass-12345", phone_number=f"+25670000040{n}", user_type="maid",
+            )
+            self.maids.append(MaidProfile.objects.create(user=user))
+        self.applications = [JobApplication.objects.create(job=self.job, maid=maid) for maid in self.maids]
+        self.client = client_for(self.homeowner.user)
+
+    def decide(self, application, decision):
+        return self.client.post(f"/api/homeowner/applications/{application.pk}/{decision}/")
+
+    def statuses(self):
+        return [application.status for application in JobApplication.objects.filter(job=self.job).order_by("pk")]
+
+    def test_accept_assigns_job_and_rejects_the_rest(self):
+        self.assertEqual(self.decide(self.applications[0], "accept").status_code, 200)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.assigned_maid_id, self.job.is_listed),
+                         ("assigned", self.maids[0].pk, False))
+        self.assertEqual(self.statuses(), ["accepted", "rejected", "rejected"])
+
+    def test_double_accept(self):
+        self.assertEqual(self.decide(self.applications[0], "accept").status_code, 200)
+        self.assertEqual(self.decide(self.applications[0], "accept").status_code, 200)
+        self.assertEqual(self.decide(self.applications[1], "accept").status_code, 409)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.assigned_maid_id, self.maids[0].pk)
+        self.assertEqual(self.statuses().count("accepted"), 1)
+
+    def test_reject_after_accept_conflicts(self):
+        self.decide(self.applications[0], "accept")
+        self.assertEqual(self.decide(self.applications[0], "reject").status_code, 409)
+        self.assertEqual(self.statuses()[0], "accepted")
+
+    def test_accept_after_reject_leaves_job_open(self):
+        self.assertEqual(self.decide(self.applications[1], "reject").status_code, 200)
+        self.assertEqual(self.decide(self.applications[1], "accept").status_code, 409)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.is_listed), ("open", True))
+        self.assertEqual(self.statuses(), ["pending", "rejected", "pending"])
+
+    def test_reject_landing_mid_accept_gives_job_back(self):
+        target = self.applications[0]
+
+        def reject_first(*args, **kwargs):
+            # The reject commits after the accept claimed the job but before
+            # it accepted the application
+            JobApplication.objects.filter(pk=target.pk, status="pending").update(status="rejected")
+            return Case(*args, **kwargs)
+
+        with mock.patch("homeowner.views.Case", side_effect=reject_first):
+            response = self.decide(target, "accept")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["application"]["status"], "rejected")
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.assigned_maid_id, self.job.is_listed), ("open", None, True))
+        self.assertNotIn("accepted", self.statuses())
+
+    def test_reject_pending(self):
+        self.decide(self.applications[0], "reject")
+        other_job = make_job(self.homeowner, "another job")
+        JobApplication.objects.create(job=other_job, maid=self.maids[0])
+        response = self.client.post("/api/homeowner/applications/reject_pending/", {"job": self.job.pk}, format="json")
+        self.assertEqual(response.data["rejected"], 2)
+        self.assertEqual(self.statuses(), ["rejected"] * 3)
+        self.assertEqual(JobApplication.objects.get(job=other_job).status, "pending")
+
+    def test_reject_pending_only_for_own_jobs(self):
+        maid_client = client_for(self.maids[0].user)
+        response = maid_client.post("/api/homeowner/applications/reject_pending/", {"job": self.job.pk}, format="json")
+        self.assertEqual(response.data["rejected"], 0)
+        self.assertEqual(self.statuses(), ["pending"] * 3)
+        self.assertEqual(self.client.post("/api/homeowner/applications/reject_pending/", {}, format="json").status_code, 400)
+
+
+class JobLifecycleTests(TestCase):
+    def setUp(self):
+        self.homeowner = make_homeowner()
+        self.maids = [make_maid(n) for n in range(2)]
+
+    def finished(self, title, status, days_ago):
+        job = make_job(self.homeowner, title, status=status)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(days=days_ago))
+        return job
+
+    def test_expire_past_open_jobs(self):
+        past = make_job(self.homeowner, "past", job_date=date(2020, 1, 1))
+        past_assigned = make_job(self.homeowner, "past assigned", job_date=date(2020, 1, 1), status="assigned")
+        upcoming = make_job(self.homeowner, "upcoming")
+        self.assertEqual(expire_past_jobs(today=date(2025, 1, 1)), 1)
+        past.refresh_from_db()
+        self.assertEqual((past.status, past.is_listed, past.listed_until), ("expired", False, None))
+        self.assertEqual(Job.objects.get(pk=past_assigned.pk).status, "assigned")
+        self.assertEqual(Job.objects.get(pk=upcoming.pk).status, "open")
+        self.assertTrue(Job.objects.get(pk=upcoming.pk).is_listed)
+
+    def test_archive_moves_jobs_applications_and_reviews(self):
+        old = [self.finished(f"old {status}", status, 40) for status in Job.FINISHED_STATUSES]
+        recent = self.finished("recent", "completed", 5)
+        live = make_job(self.homeowner, "live")
+        applications = [
+            JobApplication.objects.create(job=old[0], maid=maid, cover_letter=f"letter {n}", proposed_rate=1000 + n)
+            for n, maid in enumerate(self.maids)
+        ]
+        JobApplication.objects.create(job=live, maid=self.maids[0])
+        review = Review.objects.create(job=old[0], reviewer=self.homeowner.user, reviewee=self.maids[0].user, rating=5)
+        live_review = Review.objects.create(job=live, reviewer=self.homeowner.user, reviewee=self.maids[1].user, rating=3)
+
+        self.assertEqual(archive_finished_jobs(after_days=30, batch_size=2), (3, 2))
+
+        self.assertEqual(set(Job.objects.values_list("pk", flat=True)), {recent.pk, live.pk})
+        archived = ArchivedJob.objects.in_bulk()
+        self.assertEqual(set(archived), {job.pk for job in old})
+        self.assertEqual(
+            [(archived[job.pk].title, archived[job.pk].status) for job in old],
+            [(job.title, job.status) for job in old],
+        )
+        self.assertEqual(
+            list(ArchivedJobApplication.objects.order_by("pk").values_list("pk", "job_id", "cover_letter")),
+            [(application.pk, old[0].pk, application.cover_letter) for application in applications],
+        )
+        self.assertEqual(list(JobApplication.objects.values_list("job_id", flat=True)), [live.pk])
+        review.refresh_from_db()
+        live_review.refresh_from_db()
+        self.assertEqual((review.job_id, review.archived_job_id), (None, old[0].pk))
+        self.assertEqual((live_review.job_id, live_review.archived_job_id), (live.pk, None))
+        self.assertEqual(archive_finished_jobs(after_days=30), (0, 0))
+
+
+class JobHistoryVisibilityTests(TestCase):
+    def setUp(self):
+        self.homeowner = make_homeowner()
+        self.maids = [make_maid(n) for n in range(3)]
+        job = make_job(self.homeowner, "history", status="completed", assigned_maid=self.maids[2])
+        for n, maid in enumerate(self.maids[:2]):
+            JobApplication.objects.create(job=job, maid=maid, cover_letter=f"secret-{n}", proposed_rate=1000 + n)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(days=40))
+        archive_finished_jobs(after_days=30)
+        self.url = f"/api/homeowner/job-history/{job.pk}/"
+
+    def letters(self, user):
+        response = client_for(user).get(self.url)
+        if response.status_code != 200:
+            return response.status_code
+        return sorted(application["cover_letter"] for application in response.data["applications"])
+
+    def test_homeowner_and_staff_see_every_application(self):
+        staff = User.objects.create_user(
+            username="staff", password="pass-12345", phone_number="+256700000900", user_type="admin", is_staff=True,
+        )
+        for user in (self.homeowner.user, staff):
+            with self.subTest(user=user.username):
+                self.assertEqual(self.letters(user), ["secret-0", "secret-1"])
+
+    def test_applicant_sees_only_own_application(self):
+        self.assertEqual(self.letters(self.maids[0].user), ["secret-0"])
+        self.assertEqual(self.letters(self.maids[1].user), ["secret-1"])
+
+    def test_assigned_maid_sees_no_other_applications(self):
+        self.assertEqual(self.letters(self.maids[2].user), [])
+
+    def test_unrelated_users_get_nothing(self):
+        other = make_homeowner(username="other", phone="+256700000101")
+        self.assertEqual(self.letters(other.user), 404)
+        self.assertEqual(self.letters(make_maid(3).user), 404)
+        self.assertEqual(client_for(self.maids[0].user).get("/api/homeowner/job-history/").data["count"], 1)
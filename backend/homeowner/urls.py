@@ -1,13 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    HomeownerProfileViewSet, JobViewSet,
+    HomeownerProfileViewSet, JobViewSet, ArchivedJobViewSet,
     JobApplicationViewSet, ReviewViewSet
 )
 
 router = DefaultRouter()
 router.register(r'profiles', HomeownerProfileViewSet, basename='homeowner-profile')
 router.register(r'jobs', JobViewSet, basename='job')
+router.register(r'job-history', ArchivedJobViewSet, basename='job-history')
 router.register(r'applications', JobApplicationViewSet, basename='job-application')
 router.register(r'reviews', ReviewViewSet, basename='review')
 
@@ -1,19 +1,31 @@
 from rest_framework import viewsets, permissions, status, filters, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import HomeownerProfile, Job, JobApplication, Review, ClosedJob
+from backend.conditional import (
+    apply_validators, conditional_object_response, not_modified_response, queryset_validators,
+)
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.idempotency import IdempotentCreateMixin
+from backend.metrics import JOB_APPLICATIONS_CREATED
+from outbox.publish import emit
+from .feed import InvalidCursor, decode_cursor, feed_page, provider_origin
+from .models import HomeownerProfile, Job, JobApplication, Review, ClosedJob, ArchivedJob, ArchivedJobApplication
 from .serializers import (
     HomeownerProfileSerializer, HomeownerProfileUpdateSerializer,
-    JobSerializer, JobCreateUpdateSerializer, JobListSerializer,
+    JobSerializer, JobCreateUpdateSerializer, JobListSerializer, JobFeedSerializer,
     JobApplicationSerializer, JobApplicationCreateSerializer,
-    ReviewSerializer, ReviewCreateSerializer
+    ReviewSerializer, ReviewCreateSerializer,
+    ArchivedJobSerializer, ArchivedJobDetailSerializer,
 )
 from maid.models import MaidProfile
-from django.utils import timezone
-from django.db.models import Q
 import csv
+from django.conf import settings
+from django.db.models import Case, Count, Exists, OuterRef, Prefetch, Q, Value, When
+from django.utils import timezone
 from django.http import HttpResponse
+from rest_framework.utils.urls import replace_query_param
 
 
 class IsHomeownerOwner(permissions.BasePermission):
@@ -51,8 +63,11 @@ class HomeownerProfileViewSet(viewsets.ModelViewSet):
         """
         try:
             profile = HomeownerProfile.objects.get(user=request.user)
-            serializer = self.get_serializer(profile)
-            return Response(serializer.data)
+            return conditional_object_response(
+                request,
+                lambda: Response(self.get_serializer(profile).data),
+                profile, request.user,
+            )
         except HomeownerProfile.DoesNotExist:
             return Response({
                 'error': 'Homeowner profile not found'
@@ -79,7 +94,7 @@ class HomeownerProfileViewSet(viewsets.ModelViewSet):
         # If frontend sent a human-friendly label, also keep it as the
         # homeowner's current home_address for display.
         location_label = request.data.get('location_label')
-        update_fields = ['current_latitude', 'current_longitude']
+        update_fields = ['current_latitude', 'current_longitude', 'updated_at']
         if location_label:
             profile.home_address = location_label
             update_fields.append('home_address')
@@ -174,7 +189,7 @@ class HomeownerProfileViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Homeowner deactivated', 'profile': HomeownerProfileSerializer(profile).data})
 
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(IdempotentCreateMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Job CRUD operations
     """
@@ -196,17 +211,14 @@ class JobViewSet(viewsets.ModelViewSet):
     def _filter_homeowners_with_active_plan(self, queryset):
         """Limit jobs to homeowners who currently have an active payment plan.
 
-        An active plan is defined as either:
-        - subscription_type is 'monthly' or 'day_pass' AND subscription_expires_at is in the future, OR
-        - has_live_in_credit is True (credit for next live-in placement).
+        An active plan is a monthly/day-pass subscription that has not expired
+        or an unused live-in credit; ``HomeownerProfile.has_active_plan``
+        holds that precomputed (see payments.entitlements), and
+        ``plan_expires_at`` cuts it off on time between expiry sweeps.
         """
-        now = timezone.now()
         return queryset.filter(
-            Q(homeowner__has_live_in_credit=True)
-            | Q(
-                homeowner__subscription_type__in=['monthly', 'day_pass'],
-                homeowner__subscription_expires_at__gt=now,
-            )
+            Q(homeowner__plan_expires_at__isnull=True) | Q(homeowner__plan_expires_at__gt=timezone.now()),
+            homeowner__has_active_plan=True,
         )
 
     def get_queryset(self):
@@ -227,13 +239,72 @@ class JobViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return queryset
         
-        # Other provider roles (cleaning companies, home nurses) see open
-        # jobs for homeowners with an active plan
-        return self._filter_homeowners_with_active_plan(queryset.filter(status='open'))
+        # Other provider roles (cleaning companies, home nurses) see listed
+        # jobs: open, for homeowners with an active plan (see Job.is_listed)
+        return queryset.filter(Job.listed_q())
     
     def perform_create(self, serializer):
-        # Automatically set the homeowner to the current user's profile
-        serializer.save(homeowner=self.request.user.homeowner_profile)
+        # Automatically set the homeowner to the current user's profile; the
+        # job is placed at the home unless coordinates were given
+        homeowner = self.request.user.homeowner_profile
+        location = {}
+        if serializer.validated_data.get('latitude') is None and homeowner.latitude is not None:
+            location = {'latitude': homeowner.latitude, 'longitude': homeowner.longitude}
+        serializer.save(homeowner=homeowner, **location)
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Open jobs for the calling provider, nearest and newest first.
+
+        Paginated with ``?cursor=`` (the ``next`` link) and ``?page_size=``;
+        answers ``If-None-Match`` with 304 while the listed jobs are unchanged.
+        """
+        if hasattr(request.user, 'homeowner_profile'):
+            return Response({
+                'error': 'The job feed is for service providers'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        position = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except InvalidCursor:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        origin = position['origin'] if position else provider_origin(request.user)
+        try:
+            page_size = int(request.query_params.get('page_size') or settings.JOB_FEED_PAGE_SIZE)
+        except ValueError:
+            page_size = settings.JOB_FEED_PAGE_SIZE
+        page_size = max(1, min(page_size, settings.JOB_FEED_MAX_PAGE_SIZE))
+
+        # Listed jobs' count and last change, plus where the feed is ranked from
+        etag = queryset_validators(
+            request,
+            Job.objects.filter(Job.listed_q()),
+            extra=(tuple(round(value, 4) for value in origin) if origin else None,),
+        )
+        cached = not_modified_response(request, etag)
+        if cached is not None:
+            return cached
+
+        entries, next_cursor = feed_page(origin, position, page_size)
+        distances = dict(entries)
+        jobs = JobFeedSerializer.setup_queryset(Job.objects.filter(pk__in=distances), request).in_bulk()
+        ordered = []
+        for pk, distance in entries:
+            if pk in jobs:
+                jobs[pk].distance_km = distance
+                ordered.append(jobs[pk])
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        response = Response({
+            'next': next_url,
+            'results': JobFeedSerializer(ordered, many=True, context={'request': request}).data,
+        })
+        return apply_validators(response, etag)
     
     @action(detail=True, methods=['post'])
     def assign_maid(self, request, pk=None):
@@ -291,10 +362,58 @@ class JobViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 
-class JobApplicationViewSet(viewsets.ModelViewSet):
+class ArchivedJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Job history: finished jobs moved to the archive (see homeowner.lifecycle)
+    """
+    queryset = ArchivedJob.objects.select_related('homeowner__user', 'assigned_maid__user').all()
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'job_date']
+    ordering_fields = ['job_date', 'hourly_rate', 'archived_at']
+    ordering = ['-job_date', '-id']
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ArchivedJobDetailSerializer
+        return ArchivedJobSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        # Homeowners see their own jobs and staff see every job, with all
+        # their applications. Providers see jobs they were assigned or
+        # applied to, but only their own applications, as on live jobs.
+        own = None
+        if hasattr(user, 'homeowner_profile'):
+            queryset = queryset.filter(homeowner=user.homeowner_profile)
+        elif not user.is_staff:
+            if hasattr(user, 'maid_profile'):
+                own = Q(maid=user.maid_profile)
+            elif hasattr(user, 'cleaning_company'):
+                own = Q(cleaning_company=user.cleaning_company)
+            elif hasattr(user, 'home_nurse'):
+                own = Q(nurse=user.home_nurse)
+            else:
+                return queryset.none()
+            visible = Exists(ArchivedJobApplication.objects.filter(own, job=OuterRef('pk')))
+            if hasattr(user, 'maid_profile'):
+                visible |= Q(assigned_maid=user.maid_profile)
+            queryset = queryset.filter(visible)
+
+        if self.action == 'retrieve':
+            applications = ArchivedJobApplication.objects.select_related('maid__user', 'cleaning_company', 'nurse')
+            if own is not None:
+                applications = applications.filter(own)
+            return queryset.prefetch_related(Prefetch('applications', queryset=applications))
+        return queryset.annotate(num_applications=Count('applications'))
+
+
+class JobApplicationViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """ViewSet for JobApplication CRUD operations."""
 
-    queryset = JobApplication.objects.select_related('job', 'maid', 'cleaning_company', 'nurse').all()
+    queryset = JobApplication.objects.select_related('job__homeowner__user', 'maid', 'cleaning_company', 'nurse').all()
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status']
@@ -336,12 +455,15 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if hasattr(user, 'maid_profile'):
             serializer.save(maid=user.maid_profile)
+            JOB_APPLICATIONS_CREATED.labels('maid').inc()
             return
         if hasattr(user, 'cleaning_company'):
             serializer.save(cleaning_company=user.cleaning_company)
+            JOB_APPLICATIONS_CREATED.labels('cleaning_company').inc()
             return
         if hasattr(user, 'home_nurse'):
             serializer.save(nurse=user.home_nurse)
+            JOB_APPLICATIONS_CREATED.labels('home_nurse').inc()
             return
         raise exceptions.ValidationError('Only maids, cleaning companies, or home nurses can apply to jobs.')
     
@@ -349,59 +471,106 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
     def accept(self, request, pk=None):
         """
         Accept a job application
+
+        The job is claimed with a conditional update (only while it is still
+        open), then this application is accepted and the job's other pending
+        applications rejected in one statement, all in one transaction. A
+        second accept, or one racing a reject, gets 409 instead of assigning
+        the job twice. Repeating an accept that went through returns 200.
         """
         application = self.get_object()
         
         # Only homeowner can accept applications for their jobs
-        if application.job.homeowner.user != request.user:
+        if application.job.homeowner.user_id != request.user.id:
             return Response({
                 'error': 'You can only accept applications for your own jobs'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        application.status = 'accepted'
-        application.save()
-        
-        # Assign the maid to the job when applicable
-        if application.maid is not None:
-            application.job.assigned_maid = application.maid
-            application.job.status = 'assigned'
-            application.job.save()
-        
-        # Reject other applications for this job
-        JobApplication.objects.filter(job=application.job).exclude(id=application.id).update(status='rejected')
-        
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = Job.objects.filter(pk=application.job_id, status='open').update(
+                status='assigned', assigned_maid_id=application.maid_id,
+                is_listed=False, listed_until=None, updated_at=now,
+            )
+            if claimed:
+                JobApplication.objects.filter(job_id=application.job_id, status='pending').update(
+                    status=Case(When(pk=application.pk, then=Value('accepted')), default=Value('rejected')),
+                    updated_at=now,
+                )
+            application = self.get_queryset().get(pk=application.pk)
+            if claimed and application.status != 'accepted':
+                # Rejected meanwhile: give the job back
+                transaction.set_rollback(True)
+
+        if application.status == 'accepted':
+            return Response({
+                'message': 'Application accepted successfully',
+                'application': JobApplicationSerializer(application).data
+            }, status=status.HTTP_200_OK)
         return Response({
-            'message': 'Application accepted successfully',
+            'error': 'This application can no longer be accepted',
             'application': JobApplicationSerializer(application).data
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_409_CONFLICT)
     
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         """
-        Reject a job application
+        Reject a pending job application (conditional update; 409 once it
+        has been accepted)
         """
         application = self.get_object()
         
         # Only homeowner can reject applications for their jobs
-        if application.job.homeowner.user != request.user:
+        if application.job.homeowner.user_id != request.user.id:
             return Response({
                 'error': 'You can only reject applications for your own jobs'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        application.status = 'rejected'
-        application.save()
+        JobApplication.objects.filter(pk=application.pk, status='pending').update(
+            status='rejected', updated_at=timezone.now(),
+        )
+        application = self.get_queryset().get(pk=application.pk)
+        if application.status != 'rejected':
+            return Response({
+                'error': 'Only pending applications can be rejected',
+                'application': JobApplicationSerializer(application).data
+            }, status=status.HTTP_409_CONFLICT)
         
         return Response({
             'message': 'Application rejected successfully',
             'application': JobApplicationSerializer(application).data
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def reject_pending(self, request):
+        """
+        Reject all pending applications for one of the homeowner's jobs.
+
+        Expects JSON body like {"job": 12}; one UPDATE.
+        """
+        try:
+            job_id = int(request.data.get('job'))
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'job is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rejected = JobApplication.objects.filter(
+            job_id=job_id, job__homeowner__user=request.user, status='pending',
+        ).update(status='rejected', updated_at=timezone.now())
+        
+        return Response({
+            'message': f'Rejected {rejected} pending applications',
+            'job': job_id,
+            'rejected': rejected
+        }, status=status.HTTP_200_OK)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     ViewSet for Review CRUD operations
     """
-    queryset = Review.objects.select_related('job', 'reviewer', 'reviewee').all()
+    queryset = Review.objects.select_related('job', 'archived_job', 'reviewer', 'reviewee').all()
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['rating', 'reviewee']
@@ -413,20 +582,11 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return ReviewSerializer
     
     def perform_create(self, serializer):
-        # Automatically set the reviewer to the current user
-        review = serializer.save(reviewer=self.request.user)
-        # If reviewee is a maid, update maid's average rating
-        try:
-            if hasattr(review.reviewee, 'maid_profile'):
-                maid_profile = review.reviewee.maid_profile
-                from django.db.models import Avg
-                from decimal import Decimal, ROUND_HALF_UP
-                avg = Review.objects.filter(reviewee=review.reviewee).aggregate(Avg('rating'))['rating__avg'] or 0
-                maid_profile.rating = Decimal(str(avg)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                maid_profile.save(update_fields=['rating'])
-        except Exception:
-            # Do not block response on rating update errors
-            pass
+        # Automatically set the reviewer to the current user; the maid's
+        # average rating is refreshed by the outbox handler
+        with transaction.atomic():
+            review = serializer.save(reviewer=self.request.user)
+            emit('review.created', review, {'reviewee_id': review.reviewee_id})
 
     @action(detail=False, methods=['get'])
     def mine(self, request):
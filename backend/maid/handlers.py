@@ -0,0 +1,9 @@
+from homeowner.models import ClosedJob, HomeownerProfile
+from outbox.dispatch import register
+
+
+@register("maid.job_closed")
+def log_closed_job(event):
+    """Record the closed job for the homeowner who closed it."""
+    homeowner, _ = HomeownerProfile.objects.get_or_create(user_id=event.payload["user_id"])
+    ClosedJob.objects.create(homeowner=homeowner, maid_id=event.aggregate_id)
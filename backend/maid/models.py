@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from accounts.models import LoadDeferredTogetherMixin
 
 # Create your models here.
 
@@ -44,7 +45,7 @@ class MaidServiceCategory(models.Model):
         return f"{self.name} ({self.get_group_display()})"
 
 
-class MaidProfile(models.Model):
+class MaidProfile(LoadDeferredTogetherMixin, models.Model):
     """
     Extended profile for Maid users with comprehensive biodata
     """
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import MaidProfile, MaidAvailability
 from accounts.serializers import UserSerializer
+from backend.fieldsets import DynamicFieldsMixin
 
 
 class MaidAvailabilitySerializer(serializers.ModelSerializer):
@@ -67,9 +68,12 @@ class MaidProfileUpdateSerializer(serializers.ModelSerializer):
         ]
 
 
-class MaidProfileListSerializer(serializers.ModelSerializer):
+class MaidProfileListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Lightweight serializer for listing maids
+    Lightweight serializer for listing maids.
+
+    Supports ``?fields=`` / ``?omit=`` so list screens can fetch only what
+    they display.
     """
     username = serializers.CharField(source='user.username', read_only=True)
     gender = serializers.CharField(source='user.gender', read_only=True)
@@ -87,6 +91,11 @@ class MaidProfileListSerializer(serializers.ModelSerializer):
             'id_document', 'certificate',
             'created_at'
         ]
+
+    select_related_fields = {
+        'username': ['user'],
+        'gender': ['user'],
+    }
     
     def get_age(self, obj):
         """Calculate age from date of birth"""
@@ -1,3 +1,53 @@
+from unittest import mock
+
 from django.test import TestCase
+from django.utils.http import http_date
+
+from accounts.models import User
+from accounts.tests import client_for
+
+from .models import MaidProfile
+from .views import MaidProfileViewSet
+
+
+def make_maid(n):
+    user = User.objects.create_user(
+        username=f"maid{n}", password="pass-12345", phone_number=f"+25670000030{n}", user_type="maid",
+    )
+    return MaidProfile.objects.create(user=user)
+
+
+class ConditionalListTests(TestCase):
+    url = "/api/maid/profiles/?availability_status=true"
+
+    def setUp(self):
+        self.maids = [make_maid(n) for n in range(3)]
+        self.client = client_for(self.maids[0].user)
+
+    def test_etag_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_row_leaving_filter_invalidates(self):
+        response = self.client.get(self.url)
+        # The oldest row drops out; the newest updated_at is unchanged
+        MaidProfile.objects.filter(pk=self.maids[0].pk).update(availability_status=False)
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"], HTTP_IF_MODIFIED_SINCE=http_date(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_if_modified_since_is_ignored(self):
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+    def test_queryset_filtered_once(self):
+        with mock.patch.object(
+            MaidProfileViewSet, "filter_queryset", autospec=True, side_effect=MaidProfileViewSet.filter_queryset,
+        ) as filter_queryset:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(filter_queryset.call_count, 1)
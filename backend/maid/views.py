@@ -1,16 +1,21 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
+from backend.conditional import ConditionalListMixin, conditional_object_response
+from backend.fieldsets import SparseFieldsetViewMixin
 from .models import MaidProfile, MaidAvailability
 from .serializers import MaidProfileSerializer, MaidProfileUpdateSerializer
 from .serializers import MaidProfileListSerializer, MaidAvailabilitySerializer
 from homeowner.models import HomeownerProfile, ClosedJob, Review
 from cleaning_company.models import CleaningCompany
 from home_nursing.models import HomeNurse
+from outbox.publish import emit
 import csv
 from datetime import date
 from django.http import HttpResponse
+from django.utils import timezone
 from math import radians, sin, cos, asin, sqrt
 def _haversine_km(lat1, lon1, lat2, lon2):
     """Return great-circle distance between two points (in km)."""
@@ -44,7 +49,7 @@ class IsMaidOwner(permissions.BasePermission):
         return obj.user == request.user
 
 
-class MaidProfileViewSet(viewsets.ModelViewSet):
+class MaidProfileViewSet(ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for MaidProfile CRUD operations
     """
@@ -55,7 +60,14 @@ class MaidProfileViewSet(viewsets.ModelViewSet):
     search_fields = ['full_name', 'location', 'phone_number', 'email', 'user__username', 'skills', 'bio']
     ordering_fields = ['rating', 'hourly_rate', 'experience_years', 'total_jobs_completed', 'date_of_birth']
     ordering = ['-rating']
+    # Lists embed the maid's user (username, gender)
+    conditional_timestamp_fields = ('updated_at', 'user__updated_at')
     
+    def get_conditional_extra(self):
+        # distance_km depends on the requesting homeowner's location
+        homeowner = getattr(self.request.user, 'homeowner_profile', None)
+        return (homeowner.updated_at,) if homeowner is not None else ()
+
     def get_serializer_class(self):
         if self.action == 'list':
             return MaidProfileListSerializer
@@ -97,8 +109,11 @@ class MaidProfileViewSet(viewsets.ModelViewSet):
             profile = MaidProfile.objects.get(user=request.user)
             
             if request.method == 'GET':
-                serializer = self.get_serializer(profile)
-                return Response(serializer.data)
+                return conditional_object_response(
+                    request,
+                    lambda: Response(self.get_serializer(profile).data),
+                    profile, request.user,
+                )
             
             elif request.method in ['PATCH', 'PUT']:
                 partial = request.method == 'PATCH'
@@ -135,7 +150,7 @@ class MaidProfileViewSet(viewsets.ModelViewSet):
         # homeowner browse views show the maid's live suburb/area instead
         # of an outdated static location.
         location_label = request.data.get('location_label')
-        update_fields = ['current_latitude', 'current_longitude']
+        update_fields = ['current_latitude', 'current_longitude', 'updated_at']
         if location_label:
             profile.location = location_label
             update_fields.append('location')
@@ -156,9 +171,13 @@ class MaidProfileViewSet(viewsets.ModelViewSet):
             is_verified=True,
             is_enabled=True,
         )
+        queryset = MaidProfileListSerializer.setup_queryset(queryset, request)
 
-        serializer = MaidProfileListSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.conditional_list_response(
+            request,
+            queryset,
+            lambda: Response(MaidProfileListSerializer(queryset, many=True, context={'request': request}).data),
+        )
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def recompute_rating(self, request, pk=None):
@@ -168,26 +187,18 @@ class MaidProfileViewSet(viewsets.ModelViewSet):
         from decimal import Decimal, ROUND_HALF_UP
         avg = Review.objects.filter(reviewee=maid.user).aggregate(Avg('rating'))['rating__avg'] or 0
         maid.rating = Decimal(str(avg)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        maid.save(update_fields=['rating'])
+        maid.save(update_fields=['rating', 'updated_at'])
         return Response({'rating': str(maid.rating)})
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def close_job(self, request, pk=None):
         """Mark a connection as a closed job for this maid. Increments total_jobs_completed."""
         maid = self.get_object()
-        maid.total_jobs_completed = (maid.total_jobs_completed or 0) + 1
-        maid.save(update_fields=['total_jobs_completed'])
-        # Log closed job if caller is a homeowner
-        try:
-            # Ensure the caller has a homeowner profile for logging purposes
-            if hasattr(request.user, 'homeowner_profile'):
-                homeowner = request.user.homeowner_profile
-            else:
-                homeowner, _ = HomeownerProfile.objects.get_or_create(user=request.user)
-            ClosedJob.objects.create(homeowner=homeowner, maid=maid)
-        except Exception:
-            # Do not fail the call due to logging issues
-            pass
+        with transaction.atomic():
+            maid.total_jobs_completed = (maid.total_jobs_completed or 0) + 1
+            maid.save(update_fields=['total_jobs_completed', 'updated_at'])
+            # The closed job is logged against the caller by the outbox handler
+            emit('maid.job_closed', maid, {'user_id': request.user.pk})
         return Response({'total_jobs_completed': maid.total_jobs_completed})
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
@@ -365,6 +376,20 @@ class MaidAvailabilityViewSet(viewsets.ModelViewSet):
             return MaidAvailability.objects.filter(maid=self.request.user.maid_profile)
         return MaidAvailability.objects.none()
     
+    def _touch_profile(self):
+        # Availability is embedded in the maid profile payload; bump the
+        # profile's updated_at so conditional GETs on `me` see the change.
+        MaidProfile.objects.filter(user=self.request.user).update(updated_at=timezone.now())
+
     def perform_create(self, serializer):
         # Automatically set the maid to the current user's profile
         serializer.save(maid=self.request.user.maid_profile)
+        self._touch_profile()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self._touch_profile()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        self._touch_profile()
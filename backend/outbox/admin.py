@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "topic", "aggregate_type", "aggregate_id", "status", "attempts", "created_at", "delivered_at")
+    list_filter = ("status", "topic")
+    search_fields = ("aggregate_id",)
+    readonly_fields = [field.name for field in OutboxEvent._meta.fields]
+    actions = ["retry_selected"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_selected(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEvent.STATUS_DELIVERED).update(
+            status=OutboxEvent.STATUS_PENDING, attempts=0, available_at=timezone.now(),
+        )
+        self.message_user(request, f"Queued {updated} event(s) for delivery.")
+    retry_selected.short_description = "Retry selected events"
@@ -0,0 +1,127 @@
+"""Delivery of outbox events to in-process handlers.
+
+Apps register handlers in their ``handlers`` module:
+
+    @register("review.created")
+    def recompute_rating(event):
+        ...
+
+``dispatch_batch`` locks the oldest due events and runs each event's handlers
+in a savepoint, in the same transaction that marks it delivered. A handler
+that only writes to the database therefore takes effect exactly once. Other
+side effects (messages, cache invalidation) may run again after a crash, so
+handlers must tolerate seeing an event twice.
+
+Events about the same aggregate are delivered strictly in the order they
+were recorded. When one fails, later events for that aggregate wait until it
+is retried (with exponential backoff, up to ``OUTBOX_MAX_ATTEMPTS`` times)
+or given up. Run a single ``dispatch_outbox`` worker. A second one, or a
+request dispatching after its commit (``OUTBOX_DISPATCH_ON_COMMIT``), blocks
+on the same row locks rather than delivering events out of order.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from backend.metrics import OUTBOX_EVENTS
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)
+
+
+def register(topic):
+    """Decorator adding a handler for events of ``topic``."""
+
+    def decorator(handler):
+        _handlers[topic].append(handler)
+        return handler
+
+    return decorator
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1), 3600))
+
+
+def due_events():
+    return OutboxEvent.objects.filter(status=OutboxEvent.STATUS_PENDING, available_at__lte=timezone.now())
+
+
+def dispatch_batch(batch_size=None):
+    """Deliver up to ``batch_size`` due events; returns ``(delivered, errors)``."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        # Aggregates with an event waiting for its retry are held back from
+        # that event on.
+        held = {
+            (row["aggregate_type"], row["aggregate_id"]): row["first"]
+            for row in OutboxEvent.objects.filter(status=OutboxEvent.STATUS_PENDING, available_at__gt=now)
+            .values("aggregate_type", "aggregate_id")
+            .annotate(first=Min("id"))
+        }
+        queryset = due_events().select_for_update().order_by("id")
+        for (aggregate_type, aggregate_id), first in held.items():
+            queryset = queryset.exclude(aggregate_type=aggregate_type, aggregate_id=aggregate_id, id__gt=first)
+        batch = list(queryset[:batch_size])
+        if not batch:
+            return 0, 0
+
+        delivered, errors, changed = 0, 0, []
+        for event in batch:
+            key = event.aggregate_key
+            if key in held and event.id > held[key]:
+                continue
+            try:
+                with transaction.atomic():
+                    for handler in _handlers.get(event.topic, ()):
+                        handler(event)
+            except Exception as exc:
+                logger.exception("Outbox event %s (%s) failed", event.id, event.topic)
+                held[key] = event.id
+                errors += 1
+                event.attempts += 1
+                event.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.status = OutboxEvent.STATUS_FAILED
+                else:
+                    event.available_at = now + _retry_delay(event.attempts)
+                OUTBOX_EVENTS.labels(event.topic, "error").inc()
+            else:
+                event.status = OutboxEvent.STATUS_DELIVERED
+                event.delivered_at = timezone.now()
+                delivered += 1
+                OUTBOX_EVENTS.labels(event.topic, "delivered").inc()
+            changed.append(event)
+
+        OutboxEvent.objects.bulk_update(
+            changed, ["status", "attempts", "last_error", "available_at", "delivered_at"]
+        )
+    return delivered, errors
+
+
+def prune_delivered(retention_days=None, batch_size=5000):
+    """Delete events delivered more than ``OUTBOX_RETENTION_DAYS`` ago in
+    batches; returns how many were deleted."""
+    if retention_days is None:
+        retention_days = settings.OUTBOX_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects.filter(
+                status=OutboxEvent.STATUS_DELIVERED, delivered_at__lt=cutoff,
+            ).values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
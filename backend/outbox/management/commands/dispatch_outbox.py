@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from backend.notify import wait_for
+from outbox.dispatch import dispatch_batch, due_events, prune_delivered
+from outbox.models import OutboxEvent
+from outbox.publish import WAKE_TOPIC
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending outbox events to their handlers. Runs as a worker "
+        "(woken as events are recorded) unless --once is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Deliver what is due now and exit")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--prune", action="store_true", help="Also delete delivered events past retention")
+
+    def handle(self, *args, **options):
+        if options["prune"]:
+            self.stdout.write(f"Pruned {prune_delivered()} delivered events")
+        total_delivered = total_errors = 0
+        while True:
+            delivered, errors = dispatch_batch(options["batch_size"])
+            total_delivered += delivered
+            total_errors += errors
+            if delivered or errors:
+                continue
+            if options["once"]:
+                break
+            # Sleep until an event newer than everything seen so far is
+            # recorded; retries that come due are picked up on the timeout.
+            seen = OutboxEvent.objects.aggregate(last=Max("id"))["last"] or 0
+            wait_for(WAKE_TOPIC, due_events().filter(id__gt=seen).exists, settings.OUTBOX_IDLE_WAIT)
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {total_delivered} events, {total_errors} failed attempts"
+        ))
@@ -0,0 +1,69 @@
+"""Recording domain events.
+
+Call ``emit`` inside the database transaction that makes the change the
+event describes, so that either both are committed or neither is:
+
+    with transaction.atomic():
+        review = serializer.save(reviewer=request.user)
+        emit("review.created", review, {"reviewee_id": review.reviewee_id})
+
+Events are delivered later by the ``dispatch_outbox`` worker; it is woken
+as soon as the transaction commits. Unless ``OUTBOX_DISPATCH_ON_COMMIT`` is
+turned off, the request that recorded them also delivers one batch of due
+events right after the commit, so handlers still run on deployments without
+the worker.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from backend.notify import notify
+
+from .dispatch import dispatch_batch
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+WAKE_TOPIC = "outbox"
+
+
+def _committed():
+    notify(WAKE_TOPIC)
+    if getattr(settings, "OUTBOX_DISPATCH_ON_COMMIT", True):
+        try:
+            dispatch_batch()
+        except Exception:
+            # The change itself is committed; the events wait for the worker
+            # or the next commit.
+            logger.exception("Dispatching outbox events after commit failed")
+
+
+def _wake():
+    transaction.on_commit(_committed)
+
+
+def _event(topic, aggregate, payload):
+    return OutboxEvent(
+        topic=topic,
+        aggregate_type=aggregate._meta.label_lower,
+        aggregate_id=str(aggregate.pk),
+        payload=payload or {},
+    )
+
+
+def emit(topic, aggregate, payload=None):
+    """Record ``topic`` about ``aggregate`` (a saved model instance)."""
+    event = _event(topic, aggregate, payload)
+    event.save()
+    _wake()
+    return event
+
+
+def emit_many(topic, items):
+    """Record ``topic`` for each ``(aggregate, payload)`` in ``items``."""
+    events = OutboxEvent.objects.bulk_create(_event(topic, aggregate, payload) for aggregate, payload in items)
+    if events:
+        _wake()
+    return events
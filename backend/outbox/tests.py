@@ -0,0 +1,121 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from homeowner.models import Review
+from homeowner.tests import make_homeowner, make_job
+from maid.tests import make_maid
+
+from . import dispatch
+from .dispatch import dispatch_batch, prune_delivered, register
+from .models import OutboxEvent
+from .publish import emit
+
+TOPIC = "test.event"
+
+
+@override_settings(OUTBOX_RETRY_BACKOFF=30, OUTBOX_MAX_ATTEMPTS=3)
+class DispatchBatchTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.delivered = []
+        self.failing = set()
+        register(TOPIC)(self.handle)
+        self.addCleanup(dispatch._handlers[TOPIC].remove, self.handle)
+
+    def handle(self, event):
+        if event.payload["n"] in self.failing:
+            raise RuntimeError(f"event {event.payload['n']} failed")
+        self.delivered.append(event.payload["n"])
+
+    def record(self, n, aggregate="a"):
+        return OutboxEvent.objects.create(
+            topic=TOPIC, aggregate_type="test.thing", aggregate_id=aggregate, payload={"n": n}, available_at=self.now,
+        )
+
+    def dispatch(self, after=timedelta(0)):
+        with mock.patch("django.utils.timezone.now", return_value=self.now + after):
+            return dispatch_batch()
+
+    def state(self, event):
+        event.refresh_from_db()
+        return event.status, event.attempts
+
+    def test_failure_holds_later_events_of_the_same_aggregate(self):
+        first, second, _ = self.record(1), self.record(2), self.record(3, aggregate="b")
+        self.failing = {1}
+        self.assertEqual(self.dispatch(), (1, 1))
+        self.assertEqual(self.delivered, [3])
+        self.assertEqual(self.state(second), (OutboxEvent.STATUS_PENDING, 0))
+
+        # Not due yet: nothing for aggregate "a" goes out, not even event 2
+        self.record(4)
+        self.assertEqual(self.dispatch(timedelta(seconds=10)), (0, 0))
+
+        self.failing = set()
+        self.assertEqual(self.dispatch(timedelta(seconds=31)), (3, 0))
+        self.assertEqual(self.delivered, [3, 1, 2, 4])
+        self.assertEqual(self.state(first), (OutboxEvent.STATUS_DELIVERED, 1))
+
+    def test_retry_delay_doubles(self):
+        event = self.record(1)
+        self.failing = {1}
+        self.dispatch()
+        event.refresh_from_db()
+        self.assertEqual(event.available_at, self.now + timedelta(seconds=30))
+        self.assertIn("event 1 failed", event.last_error)
+        self.dispatch(timedelta(seconds=30))
+        event.refresh_from_db()
+        self.assertEqual(event.available_at, self.now + timedelta(seconds=30 + 60))
+
+    def test_retry_delay_is_capped_at_an_hour(self):
+        self.assertEqual(dispatch._retry_delay(20), timedelta(hours=1))
+
+    def test_gives_up_after_max_attempts(self):
+        event, _ = self.record(1), self.record(2)
+        self.failing = {1}
+        for after in (0, 30, 90):
+            self.dispatch(timedelta(seconds=after))
+        self.assertEqual(self.state(event), (OutboxEvent.STATUS_FAILED, 3))
+        # A given-up event no longer holds its aggregate back
+        self.assertEqual(self.dispatch(timedelta(seconds=91)), (1, 0))
+        self.assertEqual(self.delivered, [2])
+        self.assertEqual(self.dispatch(timedelta(days=1)), (0, 0))
+
+    def test_prune_delivered(self):
+        old, recent, pending = self.record(1), self.record(2), self.record(3)
+        OutboxEvent.objects.filter(pk=old.pk).update(
+            status=OutboxEvent.STATUS_DELIVERED, delivered_at=self.now - timedelta(days=8),
+        )
+        OutboxEvent.objects.filter(pk=recent.pk).update(
+            status=OutboxEvent.STATUS_DELIVERED, delivered_at=self.now - timedelta(days=1),
+        )
+        OutboxEvent.objects.filter(pk=pending.pk).update(created_at=self.now - timedelta(days=30))
+        self.assertEqual(prune_delivered(retention_days=7, batch_size=1), 1)
+        self.assertEqual(set(OutboxEvent.objects.values_list("pk", flat=True)), {recent.pk, pending.pk})
+
+
+class DispatchOnCommitTests(TestCase):
+    def setUp(self):
+        homeowner = make_homeowner()
+        self.maid = make_maid(0)
+        self.review = Review.objects.create(
+            job=make_job(homeowner, "reviewed"), reviewer=homeowner.user, reviewee=self.maid.user, rating=4,
+        )
+
+    def emit_review(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            emit("review.created", self.review, {"reviewee_id": self.maid.user_id})
+        self.maid.refresh_from_db()
+        return OutboxEvent.objects.get().status
+
+    def test_events_are_delivered_after_commit(self):
+        self.assertEqual(self.emit_review(), OutboxEvent.STATUS_DELIVERED)
+        self.assertEqual(self.maid.rating, 4)
+
+    @override_settings(OUTBOX_DISPATCH_ON_COMMIT=False)
+    def test_left_to_the_worker_when_disabled(self):
+        self.assertEqual(self.emit_review(), OutboxEvent.STATUS_PENDING)
+        self.assertEqual(self.maid.rating, 0)
@@ -1,6 +1,28 @@
+import json
+
 from django.contrib import admin
-from django.utils import timezone
-from .models import MobileMoneyTransaction
+from django.utils.html import format_html
+
+from outbox.publish import emit
+
+from .effects import apply_payment_effects
+from .models import MobileMoneyTransaction, ProviderPayload
+
+
+class ProviderPayloadInline(admin.TabularInline):
+    model = ProviderPayload
+    fields = ("created_at", "kind", "compressed", "pretty_data")
+    readonly_fields = fields
+    ordering = ("created_at",)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def pretty_data(self, obj):
+        return format_html("<pre>{}</pre>", json.dumps(obj.data, indent=2))
+    pretty_data.short_description = "Payload"
 
 
 @admin.register(MobileMoneyTransaction)
@@ -26,16 +48,19 @@ class MobileMoneyTransactionAdmin(admin.ModelAdmin):
         "company__company_name",
         "home_nurse__user__username",
     )
-    readonly_fields = ("raw_callback", "created_at", "updated_at", "completed_at")
+    readonly_fields = ("created_at", "updated_at", "completed_at", "effects_applied_at")
+    list_select_related = ("maid", "homeowner__user", "company", "home_nurse__user")
+    inlines = [ProviderPayloadInline]
     actions = ["apply_payment_effects_action"]
 
     def apply_payment_effects_action(self, request, queryset):
         """Admin action to manually apply payment effects for selected successful transactions"""
-        count = 0
-        for tx in queryset.filter(status=MobileMoneyTransaction.STATUS_SUCCESS):
-            self._apply_payment_effects(tx)
-            count += 1
-        self.message_user(request, f"Applied payment effects for {count} transaction(s).")
+        selected = queryset.filter(status=MobileMoneyTransaction.STATUS_SUCCESS).values_list("pk", flat=True)
+        count = apply_payment_effects(selected)
+        self.message_user(
+            request,
+            f"Applied payment effects for {count} transaction(s); effects already applied are skipped.",
+        )
     apply_payment_effects_action.short_description = "Apply payment effects (for successful transactions)"
 
     def get_user_display(self, obj):
@@ -70,61 +95,7 @@ class MobileMoneyTransactionAdmin(admin.ModelAdmin):
             old_status != MobileMoneyTransaction.STATUS_SUCCESS
             and obj.status == MobileMoneyTransaction.STATUS_SUCCESS
         ):
-            self._apply_payment_effects(obj)
-
-    def _apply_payment_effects(self, tx):
-        """Apply subscription/onboarding effects when payment succeeds"""
-        from maid.models import MaidProfile
-        from homeowner.models import HomeownerProfile
-        from datetime import timedelta
-
-        if not tx.completed_at:
-            tx.completed_at = timezone.now()
-            tx.save(update_fields=["completed_at"])
-
-        if tx.purpose == MobileMoneyTransaction.PURPOSE_MAID_ONBOARDING and tx.maid_id:
-            maid = tx.maid
-            maid.onboarding_fee_paid = True
-            maid.onboarding_fee_paid_at = timezone.now()
-            maid.save(update_fields=["onboarding_fee_paid", "onboarding_fee_paid_at"])
-
-        elif tx.purpose == MobileMoneyTransaction.PURPOSE_HOME_NURSE_ONBOARDING and tx.home_nurse_id:
-            nurse = tx.home_nurse
-            nurse.onboarding_fee_paid = True
-            nurse.onboarding_fee_paid_at = timezone.now()
-            nurse.save(update_fields=["onboarding_fee_paid", "onboarding_fee_paid_at"])
-
-        elif tx.purpose == MobileMoneyTransaction.PURPOSE_HOMEOWNER_LIVE_IN and tx.homeowner_id:
-            hp = tx.homeowner
-            hp.has_live_in_credit = True
-            hp.live_in_credit_awarded_at = timezone.now()
-            hp.save(update_fields=["has_live_in_credit", "live_in_credit_awarded_at"])
-
-        elif tx.purpose in {
-            MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY,
-            MobileMoneyTransaction.PURPOSE_HOMEOWNER_DAY_PASS,
-        } and tx.homeowner_id:
-            hp = tx.homeowner
-            now = timezone.now()
-            if tx.purpose == MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY:
-                hp.subscription_type = HomeownerProfile.SUB_MONTHLY
-                hp.subscription_expires_at = now + timedelta(days=30)
-            else:
-                hp.subscription_type = HomeownerProfile.SUB_DAY_PASS
-                hp.subscription_expires_at = now + timedelta(days=1)
-            hp.save(update_fields=["subscription_type", "subscription_expires_at"])
-
-        elif tx.purpose in {
-            MobileMoneyTransaction.PURPOSE_COMPANY_MONTHLY,
-            MobileMoneyTransaction.PURPOSE_COMPANY_ANNUAL,
-        } and tx.company_id:
-            company = tx.company
-            now = timezone.now()
-            company.has_active_subscription = True
-            if tx.purpose == MobileMoneyTransaction.PURPOSE_COMPANY_MONTHLY:
-                company.subscription_type = "monthly"
-                company.subscription_expires_at = now + timedelta(days=30)
-            else:
-                company.subscription_type = "annual"
-                company.subscription_expires_at = now + timedelta(days=365)
-            company.save(update_fields=["has_active_subscription", "subscription_type", "subscription_expires_at"])
+            apply_payment_effects([obj])
+            emit("payment.succeeded", obj, {"purpose": obj.purpose})
+        if old_status == MobileMoneyTransaction.STATUS_PENDING and obj.status != old_status:
+            MobileMoneyTransaction.notify_settled([obj.pk])
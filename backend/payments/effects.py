@@ -0,0 +1,135 @@
+"""What a successful payment grants, applied in bulk.
+
+``apply_payment_effects`` is the one place that turns successful
+transactions into onboarding flags, live-in credits and subscriptions; the
+IPN view, the admin and the reconciler all call it. Given any number of
+transactions it runs a fixed number of queries: the transactions are locked
+and claimed, grouped by purpose, and each group's targets are updated by id
+with a single UPDATE, all in one database transaction.
+
+Effects are applied at most once per transaction: a claimed transaction gets
+``effects_applied_at`` set in the same transaction, and already-claimed ones
+are skipped, so a repeated IPN or admin action does not extend a
+subscription twice.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from cleaning_company.models import CleaningCompany
+from home_nursing.models import HomeNurse
+from homeowner.models import HomeownerProfile, Job
+from maid.models import MaidProfile
+from .models import MobileMoneyTransaction
+
+# Homeowner plans in the order they are applied, so when one homeowner has
+# several in a batch the longer plan wins.
+HOMEOWNER_PLANS = (
+    (MobileMoneyTransaction.PURPOSE_HOMEOWNER_DAY_PASS, HomeownerProfile.SUB_DAY_PASS, timedelta(days=1)),
+    (MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY, HomeownerProfile.SUB_MONTHLY, timedelta(days=30)),
+)
+HOMEOWNER_PURPOSES = {
+    *(purpose for purpose, _, _ in HOMEOWNER_PLANS),
+    MobileMoneyTransaction.PURPOSE_HOMEOWNER_LIVE_IN,
+}
+COMPANY_PLANS = (
+    (MobileMoneyTransaction.PURPOSE_COMPANY_MONTHLY, "monthly", timedelta(days=30)),
+    (MobileMoneyTransaction.PURPOSE_COMPANY_ANNUAL, "annual", timedelta(days=365)),
+)
+
+
+def _targets(claimed, purpose, field):
+    return {getattr(tx, field) for tx in claimed if tx.purpose == purpose and getattr(tx, field)}
+
+
+def apply_payment_effects(transactions, now=None):
+    """Apply the effects of successful ``transactions`` (instances or ids).
+
+    Transactions that are not successful or were already applied are
+    ignored. Returns the number of transactions applied.
+    """
+    ids = {getattr(tx, "pk", tx) for tx in transactions}
+    if not ids:
+        return 0
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        claimed = list(
+            MobileMoneyTransaction.objects.select_for_update()
+            .filter(
+                pk__in=ids,
+                status=MobileMoneyTransaction.STATUS_SUCCESS,
+                effects_applied_at__isnull=True,
+            )
+            .only("pk", "purpose", "maid_id", "home_nurse_id", "homeowner_id", "company_id")
+        )
+        if not claimed:
+            return 0
+
+        maids = _targets(claimed, MobileMoneyTransaction.PURPOSE_MAID_ONBOARDING, "maid_id")
+        if maids:
+            MaidProfile.objects.filter(pk__in=maids).update(
+                onboarding_fee_paid=True, onboarding_fee_paid_at=now, updated_at=now,
+            )
+
+        nurses = _targets(claimed, MobileMoneyTransaction.PURPOSE_HOME_NURSE_ONBOARDING, "home_nurse_id")
+        if nurses:
+            HomeNurse.objects.filter(pk__in=nurses).update(
+                onboarding_fee_paid=True, onboarding_fee_paid_at=now, updated_at=now,
+            )
+
+        # Bulk updates bypass HomeownerProfile.save, so the entitlement
+        # columns are written here too (see HomeownerProfile.refresh_plan),
+        # and the homeowners' jobs are listed below.
+        for purpose, subscription_type, period in HOMEOWNER_PLANS:
+            homeowners = _targets(claimed, purpose, "homeowner_id")
+            if homeowners:
+                HomeownerProfile.objects.filter(pk__in=homeowners).update(
+                    subscription_type=subscription_type,
+                    subscription_expires_at=now + period,
+                    has_active_plan=True,
+                    plan_expires_at=Case(
+                        When(has_live_in_credit=True, then=Value(None)),
+                        default=Value(now + period),
+                        output_field=DateTimeField(),
+                    ),
+                    updated_at=now,
+                )
+
+        homeowners = _targets(claimed, MobileMoneyTransaction.PURPOSE_HOMEOWNER_LIVE_IN, "homeowner_id")
+        if homeowners:
+            HomeownerProfile.objects.filter(pk__in=homeowners).update(
+                has_live_in_credit=True,
+                live_in_credit_awarded_at=now,
+                has_active_plan=True,
+                plan_expires_at=None,
+                updated_at=now,
+            )
+
+        homeowners = {
+            tx.homeowner_id
+            for tx in claimed
+            if tx.homeowner_id and tx.purpose in HOMEOWNER_PURPOSES
+        }
+        if homeowners:
+            Job.refresh_listing(homeowners, now=now)
+
+        for purpose, subscription_type, period in COMPANY_PLANS:
+            companies = _targets(claimed, purpose, "company_id")
+            if companies:
+                CleaningCompany.objects.filter(pk__in=companies).update(
+                    has_active_subscription=True,
+                    subscription_type=subscription_type,
+                    subscription_expires_at=now + period,
+                    updated_at=now,
+                )
+
+        MobileMoneyTransaction.objects.filter(pk__in=[tx.pk for tx in claimed]).update(
+            effects_applied_at=now,
+            completed_at=Coalesce("completed_at", Value(now)),
+        )
+    return len(claimed)
@@ -0,0 +1,32 @@
+"""Expiry of paid plans.
+
+Payment effects switch entitlements on: ``HomeownerProfile.has_active_plan``
+(kept in step with the plan fields by ``HomeownerProfile.save``) and
+``CleaningCompany.has_active_subscription``. Nothing turns them off when the
+paid period ends, so ``expire_plans`` does, with one bulk UPDATE per table
+on the indexed expiry columns, and takes the lapsed homeowners' jobs out of
+the provider feed (``Job.is_listed``). Run it every minute or so (the
+``expire_plans`` command). Reads that must be exact between sweeps also
+compare the expiry itself (``plan_expires_at``, ``Job.listed_until``).
+"""
+
+from django.utils import timezone
+
+from cleaning_company.models import CleaningCompany
+from homeowner.models import HomeownerProfile, Job
+
+
+def expire_plans(now=None):
+    """Clear lapsed entitlements; returns ``(homeowners, companies)`` updated."""
+    now = now or timezone.now()
+    homeowners = HomeownerProfile.objects.filter(
+        has_active_plan=True, plan_expires_at__lte=now,
+    ).update(has_active_plan=False, plan_expires_at=None, updated_at=now)
+    if homeowners:
+        Job.objects.filter(is_listed=True, homeowner__has_active_plan=False).update(
+            is_listed=False, listed_until=None, updated_at=now,
+        )
+    companies = CleaningCompany.objects.filter(
+        has_active_subscription=True, subscription_expires_at__lte=now,
+    ).update(has_active_subscription=False, updated_at=now)
+    return homeowners, companies
@@ -0,0 +1,13 @@
+from outbox.dispatch import register
+from .effects import apply_payment_effects
+
+
+@register("payment.succeeded")
+def ensure_payment_effects(event):
+    """Apply the payment's effects if the code that settled it did not.
+
+    The IPN handler, reconciler and admin apply effects inline so access is
+    granted at once; this is the guarantee behind them (a no-op when they
+    already ran, see payments.effects).
+    """
+    apply_payment_effects([int(event.aggregate_id)])
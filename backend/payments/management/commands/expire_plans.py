@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from payments.entitlements import expire_plans
+
+
+class Command(BaseCommand):
+    help = "Switch off homeowner plans and company subscriptions that have expired (run every minute from cron)"
+
+    def handle(self, *args, **options):
+        homeowners, companies = expire_plans()
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {homeowners} homeowner plans and {companies} company subscriptions"
+        ))
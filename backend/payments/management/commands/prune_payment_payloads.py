@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from payments.payloads import prune_payloads
+
+
+class Command(BaseCommand):
+    help = "Delete stored provider payloads past their retention period (run daily from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Override PAYMENT_PAYLOAD_RETENTION_DAYS")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = prune_payloads(options["days"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} provider payloads"))
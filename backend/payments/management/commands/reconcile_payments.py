@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.outbound import ProviderClient
+from backend.stub_providers import OUTCOMES, build_server
+from payments.reconcile import PesapalError, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle pending Pesapal payments whose IPN was lost by querying their status "
+        "(run periodically from cron, or with --interval as a worker)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=30, help="Minutes a transaction must have been pending")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=0, help="Status lookups in flight (0 = client limit)")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many transactions")
+        parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds instead of exiting")
+        parser.add_argument(
+            "--stub", action="store_true",
+            help="Query a local stub Pesapal server instead of the real API (see stub_providers)",
+        )
+        parser.add_argument("--stub-delay", type=float, default=0.2, help="Stub response time in seconds")
+        parser.add_argument("--stub-outcome", choices=[*OUTCOMES, "random"], default="random")
+
+    def handle(self, *args, **options):
+        client = credentials = None
+        if options["stub"]:
+            server = build_server(port=0, delay=options["stub_delay"], outcome=options["stub_outcome"])
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            client = ProviderClient("pesapal", f"http://127.0.0.1:{server.server_port}/v3")
+            credentials = ("stub-key", "stub-secret")
+            self.stdout.write(f"Using stub Pesapal on port {server.server_port}")
+
+        while True:
+            try:
+                stats = reconcile(
+                    older_than=timedelta(minutes=options["older_than"]),
+                    batch_size=options["batch_size"],
+                    concurrency=options["concurrency"],
+                    limit=options["limit"],
+                    client=client,
+                    credentials=credentials,
+                )
+            except PesapalError as exc:
+                raise CommandError(str(exc))
+            self._report(stats)
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def _report(self, stats):
+        rate = stats.scanned / stats.elapsed if stats.elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {stats.scanned} pending transactions in {stats.batches} batches: "
+            f"{stats.successful} successful, {stats.failed} failed, {stats.pending} still pending, "
+            f"{stats.skipped} settled meanwhile, {stats.errors} lookup errors"
+        ))
+        self.stdout.write(
+            f"{stats.elapsed:.2f}s total ({rate:.1f} tx/s): fetch {stats.fetch_seconds:.2f}s, "
+            f"apply {stats.apply_seconds:.2f}s; lookup p50 {stats.percentile(0.5) * 1000:.0f}ms, "
+            f"p95 {stats.percentile(0.95) * 1000:.0f}ms, max {stats.percentile(1.0) * 1000:.0f}ms"
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:40
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def mark_applied(apps, schema_editor):
+    # Successful payments so far had their effects applied when they settled.
+    MobileMoneyTransaction = apps.get_model('payments', 'MobileMoneyTransaction')
+    MobileMoneyTransaction.objects.filter(status='successful').update(
+        effects_applied_at=Coalesce('completed_at', 'updated_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_mobilemoneytransaction_home_nurse_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mobilemoneytransaction',
+            name='effects_applied_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_applied, migrations.RunPython.noop),
+    ]
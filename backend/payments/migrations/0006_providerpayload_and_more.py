@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:20
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_raw_callbacks(apps, schema_editor):
+    MobileMoneyTransaction = apps.get_model('payments', 'MobileMoneyTransaction')
+    ProviderPayload = apps.get_model('payments', 'ProviderPayload')
+    batch = []
+    rows = (
+        MobileMoneyTransaction.objects.exclude(raw_callback=None)
+        .values_list('pk', 'raw_callback')
+        .iterator(chunk_size=500)
+    )
+    for pk, data in rows:
+        body = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        batch.append(ProviderPayload(transaction_id=pk, kind='legacy', body=body, compressed=True))
+        if len(batch) >= 500:
+            ProviderPayload.objects.bulk_create(batch)
+            batch = []
+    ProviderPayload.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_mobilemoneytransaction_effects_applied_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('submit', 'Order submission response'), ('ipn', 'IPN notification'), ('status', 'Transaction status response'), ('legacy', 'Migrated raw_callback')], max_length=10)),
+                ('body', models.BinaryField()),
+                ('compressed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payloads', to='payments.mobilemoneytransaction')),
+            ],
+        ),
+        migrations.RunPython(move_raw_callbacks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='mobilemoneytransaction',
+            name='raw_callback',
+        ),
+        migrations.AlterField(
+            model_name='mobilemoneytransaction',
+            name='provider_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mobilemoneytransaction',
+            index=models.Index(fields=['status', 'created_at'], name='payments_status_created_idx'),
+        ),
+    ]
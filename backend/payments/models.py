@@ -1,5 +1,9 @@
-from django.db import models
+import json
+import zlib
+
+from django.db import models, transaction as db_transaction
 from django.conf import settings
+from backend.notify import notify
 from maid.models import MaidProfile
 from homeowner.models import HomeownerProfile
 from cleaning_company.models import CleaningCompany
@@ -53,16 +57,92 @@ class MobileMoneyTransaction(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     purpose = models.CharField(max_length=50, choices=PURPOSE_CHOICES, default=PURPOSE_MAID_ONBOARDING)
     provider = models.CharField(max_length=50, default="pesapal")
-    provider_reference = models.CharField(max_length=100, blank=True, null=True)
+    provider_reference = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
-    raw_callback = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    # Set when the effects of a successful payment were applied (see payments.effects).
+    effects_applied_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="payments_status_created_idx"),
+        ]
 
     def __str__(self) -> str:
         target = self.maid or self.homeowner or self.company
         return f"MOMO {self.id} - {self.network} {self.amount} {self.status} ({self.purpose}) for {target}"
+
+    @staticmethod
+    def status_topic(pk):
+        return f"payment:{pk}"
+
+    @classmethod
+    def notify_settled(cls, pks):
+        """Wake status long-polls for ``pks`` once the current transaction commits."""
+        pks = list(pks)
+
+        def wake():
+            for pk in pks:
+                notify(cls.status_topic(pk))
+
+        db_transaction.on_commit(wake)
+
+
+class ProviderPayload(models.Model):
+    """A raw body received from (or returned by) the payment provider.
+
+    Kept out of ``MobileMoneyTransaction`` so status lookups and the admin
+    list do not read them. Rows are append-only and deleted only by the
+    ``prune_payment_payloads`` retention command. Bodies of at least
+    ``PAYMENT_PAYLOAD_COMPRESS_MIN_BYTES`` are stored zlib-compressed.
+    """
+
+    KIND_SUBMIT = "submit"
+    KIND_IPN = "ipn"
+    KIND_STATUS = "status"
+    KIND_LEGACY = "legacy"
+
+    KIND_CHOICES = (
+        (KIND_SUBMIT, "Order submission response"),
+        (KIND_IPN, "IPN notification"),
+        (KIND_STATUS, "Transaction status response"),
+        (KIND_LEGACY, "Migrated raw_callback"),
+    )
+
+    transaction = models.ForeignKey(MobileMoneyTransaction, on_delete=models.CASCADE, related_name="payloads")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    body = models.BinaryField()
+    compressed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} for MOMO {self.transaction_id}"
+
+    @classmethod
+    def build(cls, tx, kind, data):
+        """An unsaved payload for ``tx`` (for ``bulk_create``)."""
+        body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        threshold = getattr(settings, "PAYMENT_PAYLOAD_COMPRESS_MIN_BYTES", 0)
+        compressed = bool(threshold) and len(body) >= threshold
+        if compressed:
+            body = zlib.compress(body)
+        return cls(transaction=tx, kind=kind, body=body, compressed=compressed)
+
+    @classmethod
+    def record(cls, tx, kind, data):
+        payload = cls.build(tx, kind, data)
+        payload.save()
+        return payload
+
+    @property
+    def data(self):
+        body = bytes(self.body)
+        return json.loads(zlib.decompress(body) if self.compressed else body)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Provider payloads are append-only")
+        super().save(*args, **kwargs)
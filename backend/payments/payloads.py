@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ProviderPayload
+
+
+def prune_payloads(retention_days=None, batch_size=5000):
+    """Delete payloads older than ``PAYMENT_PAYLOAD_RETENTION_DAYS`` in
+    batches; returns how many were deleted."""
+    if retention_days is None:
+        retention_days = settings.PAYMENT_PAYLOAD_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        ids = list(
+            ProviderPayload.objects.filter(created_at__lt=cutoff).values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += ProviderPayload.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,225 @@
+"""Reconcile pending Pesapal payments whose IPN never arrived.
+
+Stale pending transactions are read in primary-key batches. For each batch
+the current status of every order is fetched from Pesapal concurrently, on
+the shared ``pesapal`` client's bounded pool and with one bearer token, and
+the outcomes are then written back in a single database transaction: one
+``bulk_update`` for the status changes, followed by the bulk payment effects
+(``payments.effects``) for the ones that succeeded. Rows an IPN settled in
+the meantime are skipped, so running the reconciler next to live traffic is
+safe.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from decouple import config
+from django.db import transaction
+from django.utils import timezone
+
+from backend.outbound import get_client
+from outbox.publish import emit_many
+from .effects import apply_payment_effects
+from .models import MobileMoneyTransaction, ProviderPayload
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_STATUSES = {"COMPLETED", "COMPLETED_SUCCESSFULLY", "SUCCESS"}
+FAILURE_STATUSES = {"FAILED", "CANCELLED", "CANCELED"}
+
+# Pesapal bearer tokens are valid for five minutes; renew a little earlier.
+TOKEN_MAX_AGE = 240
+
+
+class PesapalError(Exception):
+    pass
+
+
+def outcome_for(payment_status):
+    """Transaction status for a Pesapal ``payment_status``; None while undecided."""
+    payment_status = (payment_status or "").upper()
+    if payment_status in SUCCESS_STATUSES:
+        return MobileMoneyTransaction.STATUS_SUCCESS
+    if payment_status in FAILURE_STATUSES:
+        return MobileMoneyTransaction.STATUS_FAILED
+    return None
+
+
+def request_token(client, consumer_key, consumer_secret):
+    resp = client.post(
+        "api/Auth/RequestToken",
+        "request_token",
+        json={"consumer_key": consumer_key, "consumer_secret": consumer_secret},
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+    )
+    token = (resp.json() if resp.content else {}).get("token")
+    if resp.status_code != 200 or not token:
+        raise PesapalError(f"Token request rejected with status {resp.status_code}")
+    return token
+
+
+def fetch_status(client, token, order_tracking_id):
+    resp = client.get(
+        "api/Transactions/GetTransactionStatus",
+        "transaction_status",
+        params={"orderTrackingId": order_tracking_id},
+        headers={"Accept": "application/json", "Authorization": f"Bearer {token}"},
+    )
+    if resp.status_code != 200:
+        raise PesapalError(f"Status request failed with status {resp.status_code}")
+    return resp.json() if resp.content else {}
+
+
+def stale_pending(older_than):
+    """Pending Pesapal transactions created more than ``older_than`` ago."""
+    return MobileMoneyTransaction.objects.filter(
+        status=MobileMoneyTransaction.STATUS_PENDING,
+        provider="pesapal",
+        provider_reference__isnull=False,
+        created_at__lt=timezone.now() - older_than,
+    ).exclude(provider_reference="")
+
+
+class ReconcileStats:
+    def __init__(self):
+        self.scanned = 0
+        self.successful = 0
+        self.failed = 0
+        self.pending = 0
+        self.errors = 0
+        self.skipped = 0
+        self.batches = 0
+        self.fetch_latencies = []
+        self.fetch_seconds = 0.0
+        self.apply_seconds = 0.0
+        self.elapsed = 0.0
+
+    def percentile(self, fraction):
+        if not self.fetch_latencies:
+            return 0.0
+        ordered = sorted(self.fetch_latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def fetch_statuses(client, token, transactions, concurrency, stats):
+    """Map transaction id -> Pesapal status payload, fetching up to
+    ``concurrency`` orders at once. Failed lookups are counted and left out.
+    """
+
+    def timed(order_tracking_id):
+        started = time.perf_counter()
+        try:
+            return fetch_status(client, token, order_tracking_id)
+        finally:
+            stats.fetch_latencies.append(time.perf_counter() - started)
+
+    results = {}
+    queue = list(transactions)
+    in_flight = {}
+    while queue or in_flight:
+        while queue and len(in_flight) < concurrency:
+            tx = queue.pop()
+            in_flight[client.submit(timed, tx.provider_reference)] = tx.pk
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            pk = in_flight.pop(future)
+            try:
+                results[pk] = future.result()
+            except Exception as exc:
+                stats.errors += 1
+                logger.warning("Pesapal status lookup failed for transaction %s: %s", pk, exc)
+    return results
+
+
+def apply_outcomes(statuses):
+    """Write back fetched statuses; returns ``(successful, failed)`` counts.
+
+    Only rows still pending are touched, locked for the duration.
+    """
+    outcomes = {}
+    for pk, data in statuses.items():
+        outcome = outcome_for(data.get("payment_status"))
+        if outcome:
+            outcomes[pk] = outcome
+    if not outcomes:
+        return 0, 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        changed = list(
+            MobileMoneyTransaction.objects.select_for_update()
+            .filter(pk__in=outcomes, status=MobileMoneyTransaction.STATUS_PENDING)
+            .only("pk", "status", "completed_at", "purpose")
+        )
+        for tx in changed:
+            tx.status = outcomes[tx.pk]
+            tx.completed_at = now
+        MobileMoneyTransaction.objects.bulk_update(changed, ["status", "completed_at"])
+        ProviderPayload.objects.bulk_create(
+            ProviderPayload.build(tx, ProviderPayload.KIND_STATUS, statuses[tx.pk]) for tx in changed
+        )
+
+        successful = [tx for tx in changed if tx.status == MobileMoneyTransaction.STATUS_SUCCESS]
+        apply_payment_effects(successful, now=now)
+        emit_many("payment.succeeded", ((tx, {"purpose": tx.purpose}) for tx in successful))
+        MobileMoneyTransaction.notify_settled(tx.pk for tx in changed)
+    return len(successful), len(changed) - len(successful)
+
+
+def reconcile(
+    older_than=timedelta(minutes=30),
+    batch_size=200,
+    concurrency=None,
+    limit=None,
+    client=None,
+    credentials=None,
+):
+    """Reconcile stale pending transactions and return a ``ReconcileStats``.
+
+    ``client`` and ``credentials`` (consumer key, secret) default to the
+    shared ``pesapal`` client and the configured Pesapal credentials.
+    """
+    client = client or get_client("pesapal")
+    concurrency = min(concurrency or client.max_concurrency, client.max_concurrency)
+    consumer_key, consumer_secret = credentials or (
+        config("PESAPAL_CONSUMER_KEY", default=""),
+        config("PESAPAL_CONSUMER_SECRET", default=""),
+    )
+    if not consumer_key or not consumer_secret:
+        raise PesapalError("Pesapal credentials are not configured")
+
+    stats = ReconcileStats()
+    started = time.perf_counter()
+    token, token_at = None, 0.0
+    last_pk = 0
+    queryset = stale_pending(older_than).only("pk", "provider_reference").order_by("pk")
+    while limit is None or stats.scanned < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats.scanned)
+        batch = list(queryset.filter(pk__gt=last_pk)[:size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        stats.scanned += len(batch)
+        stats.batches += 1
+
+        if token is None or time.monotonic() - token_at > TOKEN_MAX_AGE:
+            token = request_token(client, consumer_key, consumer_secret)
+            token_at = time.monotonic()
+
+        fetch_started = time.perf_counter()
+        statuses = fetch_statuses(client, token, batch, concurrency, stats)
+        stats.fetch_seconds += time.perf_counter() - fetch_started
+
+        apply_started = time.perf_counter()
+        successful, failed = apply_outcomes(statuses)
+        stats.apply_seconds += time.perf_counter() - apply_started
+
+        decided = sum(1 for data in statuses.values() if outcome_for(data.get("payment_status")))
+        stats.successful += successful
+        stats.failed += failed
+        stats.skipped += decided - successful - failed
+        stats.pending += len(statuses) - decided
+    stats.elapsed = time.perf_counter() - started
+    return stats
@@ -0,0 +1,238 @@
+import os
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.outbound import ProviderClient
+from backend.stub_providers import build_server
+from homeowner.models import HomeownerProfile
+from homeowner.tests import make_homeowner, make_job
+from outbox.models import OutboxEvent
+
+from . import reconcile as reconcile_module
+from .effects import apply_payment_effects
+from .models import MobileMoneyTransaction, ProviderPayload
+from .reconcile import apply_outcomes, reconcile
+
+
+def make_payment(homeowner, reference, purpose=MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY, **fields):
+    return MobileMoneyTransaction.objects.create(
+        homeowner=homeowner, network=MobileMoneyTransaction.NETWORK_MTN, phone_number="+256700000100",
+        amount=50000, purpose=purpose, provider_reference=reference, **fields,
+    )
+
+
+class StubPesapalMixin:
+    """Runs a stub Pesapal per outcome for the duration of the test class."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servers = {}
+        for outcome in ("completed", "failed", "pending"):
+            server = build_server(port=0, outcome=outcome)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            cls.servers[outcome] = server
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers.values():
+            server.shutdown()
+            server.server_close()
+        super().tearDownClass()
+
+    def run_reconcile(self, outcome, **kwargs):
+        port = self.servers[outcome].server_port
+        client = ProviderClient("pesapal", f"http://127.0.0.1:{port}/v3", max_concurrency=4)
+        kwargs.setdefault("older_than", timedelta(0))
+        return reconcile(client=client, credentials=("key", "secret"), **kwargs)
+
+
+class ReconcileTests(StubPesapalMixin, TestCase):
+    def setUp(self):
+        self.homeowner = make_homeowner(has_live_in_credit=False)
+        self.job = make_job(self.homeowner, "waiting for a plan")
+        self.payments = [make_payment(self.homeowner, f"order-{n}") for n in range(3)]
+
+    def statuses(self):
+        return [tx.status for tx in MobileMoneyTransaction.objects.order_by("pk")]
+
+    def test_completed_orders_succeed_with_effects(self):
+        stats = self.run_reconcile("completed")
+        self.assertEqual((stats.scanned, stats.successful, stats.failed, stats.errors), (3, 3, 0, 0))
+        self.assertEqual(self.statuses(), [MobileMoneyTransaction.STATUS_SUCCESS] * 3)
+        self.assertFalse(MobileMoneyTransaction.objects.filter(effects_applied_at__isnull=True).exists())
+        self.assertEqual(ProviderPayload.objects.filter(kind=ProviderPayload.KIND_STATUS).count(), 3)
+        self.assertEqual(OutboxEvent.objects.filter(topic="payment.succeeded").count(), 3)
+        self.homeowner.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertTrue(self.homeowner.has_active_plan)
+        self.assertTrue(self.job.is_listed)
+
+    def test_failed_orders_fail_without_effects(self):
+        stats = self.run_reconcile("failed")
+        self.assertEqual((stats.successful, stats.failed), (0, 3))
+        self.assertEqual(self.statuses(), [MobileMoneyTransaction.STATUS_FAILED] * 3)
+        self.assertFalse(MobileMoneyTransaction.objects.filter(effects_applied_at__isnull=False).exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_pending_orders_stay_pending(self):
+        stats = self.run_reconcile("pending")
+        self.assertEqual((stats.successful, stats.failed, stats.pending), (0, 0, 3))
+        self.assertEqual(self.statuses(), [MobileMoneyTransaction.STATUS_PENDING] * 3)
+        self.assertFalse(ProviderPayload.objects.exists())
+
+    def test_only_stale_rows_are_scanned(self):
+        MobileMoneyTransaction.objects.filter(pk=self.payments[0].pk).update(
+            created_at=timezone.now() - timedelta(hours=2),
+        )
+        stats = self.run_reconcile("completed", older_than=timedelta(hours=1))
+        self.assertEqual((stats.scanned, stats.successful), (1, 1))
+        self.assertEqual(self.statuses()[1:], [MobileMoneyTransaction.STATUS_PENDING] * 2)
+
+    def test_row_settled_by_ipn_meanwhile_is_skipped(self):
+        settled = self.payments[1]
+        fetch_statuses = reconcile_module.fetch_statuses
+
+        def fetch_then_ipn(*args, **kwargs):
+            results = fetch_statuses(*args, **kwargs)
+            # An IPN reports the payment failed while the lookups ran
+            MobileMoneyTransaction.objects.filter(pk=settled.pk).update(status=MobileMoneyTransaction.STATUS_FAILED)
+            return results
+
+        with mock.patch.object(reconcile_module, "fetch_statuses", side_effect=fetch_then_ipn):
+            stats = self.run_reconcile("completed")
+        self.assertEqual((stats.successful, stats.skipped), (2, 1))
+        settled.refresh_from_db()
+        self.assertEqual(settled.status, MobileMoneyTransaction.STATUS_FAILED)
+        self.assertIsNone(settled.effects_applied_at)
+        self.assertFalse(ProviderPayload.objects.filter(transaction=settled).exists())
+
+    def test_token_is_reused_across_batches(self):
+        with mock.patch.object(reconcile_module, "request_token", wraps=reconcile_module.request_token) as token:
+            stats = self.run_reconcile("pending", batch_size=1)
+        self.assertEqual((stats.batches, token.call_count), (3, 1))
+
+    def test_token_is_renewed_when_old(self):
+        with mock.patch.object(reconcile_module, "TOKEN_MAX_AGE", -1), mock.patch.object(
+            reconcile_module, "request_token", wraps=reconcile_module.request_token,
+        ) as token:
+            self.run_reconcile("pending", batch_size=1)
+        self.assertEqual(token.call_count, 3)
+
+    def test_apply_outcomes_runs_fixed_number_of_queries(self):
+        more = [make_payment(self.homeowner, f"order-more-{n}") for n in range(6)]
+        completed = {"payment_status": "COMPLETED"}
+
+        with CaptureQueriesContext(connection) as single:
+            apply_outcomes({tx.pk: completed for tx in self.payments[:1]})
+        with self.assertNumQueries(len(single.captured_queries)):
+            apply_outcomes({tx.pk: completed for tx in self.payments[1:] + more})
+        self.assertEqual(
+            MobileMoneyTransaction.objects.filter(status=MobileMoneyTransaction.STATUS_SUCCESS).count(), 9,
+        )
+
+
+class PaymentEffectsTests(TestCase):
+    def setUp(self):
+        self.homeowner = make_homeowner(has_live_in_credit=False)
+
+    def paid(self, reference, purpose=MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY):
+        return make_payment(self.homeowner, reference, purpose, status=MobileMoneyTransaction.STATUS_SUCCESS)
+
+    def expiry(self):
+        return HomeownerProfile.objects.get(pk=self.homeowner.pk).subscription_expires_at
+
+    def test_effects_applied_once(self):
+        tx = self.paid("order-1")
+        self.assertEqual(apply_payment_effects([tx]), 1)
+        expires = self.expiry()
+        # A repeated IPN or admin action must not extend the plan again
+        self.assertEqual(apply_payment_effects([tx], now=timezone.now() + timedelta(days=3)), 0)
+        self.assertEqual(apply_payment_effects([tx.pk]), 0)
+        self.assertEqual(self.expiry(), expires)
+
+    def test_only_unapplied_successful_transactions_are_claimed(self):
+        applied = self.paid("order-1")
+        apply_payment_effects([applied])
+        fresh = self.paid("order-2")
+        pending = make_payment(self.homeowner, "order-3")
+        self.assertEqual(apply_payment_effects([applied, fresh, pending]), 1)
+        pending.refresh_from_db()
+        self.assertIsNone(pending.effects_applied_at)
+
+    def test_longer_plan_wins_within_a_batch(self):
+        now = timezone.now()
+        day_pass = self.paid("order-1", MobileMoneyTransaction.PURPOSE_HOMEOWNER_DAY_PASS)
+        monthly = self.paid("order-2")
+        self.assertEqual(apply_payment_effects([monthly, day_pass], now=now), 2)
+        profile = HomeownerProfile.objects.get(pk=self.homeowner.pk)
+        self.assertEqual(profile.subscription_type, HomeownerProfile.SUB_MONTHLY)
+        self.assertEqual(profile.subscription_expires_at, now + timedelta(days=30))
+
+
+class PesapalIPNTests(StubPesapalMixin, TestCase):
+    url = "/api/payments/pesapal/ipn/"
+
+    def setUp(self):
+        self.homeowner = make_homeowner(has_live_in_credit=False)
+        self.tx = make_payment(self.homeowner, "order-1")
+        port = self.servers["completed"].server_port
+        self.provider = ProviderClient("pesapal", f"http://127.0.0.1:{port}/v3")
+        patchers = [
+            mock.patch("payments.views.get_client", return_value=self.provider),
+            mock.patch.dict(os.environ, PESAPAL_CONSUMER_KEY="key", PESAPAL_CONSUMER_SECRET="secret"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def ipn(self):
+        return APIClient().get(self.url, {"OrderTrackingId": "order-1"})
+
+    def succeeded_events(self):
+        return OutboxEvent.objects.filter(topic="payment.succeeded").count()
+
+    def settle_during_lookup(self, lookup=None):
+        """Have the reconciler settle the row while the IPN asks Pesapal."""
+        get = self.provider.get
+
+        def reconcile_then_lookup(*args, **kwargs):
+            apply_outcomes({self.tx.pk: {"payment_status": "COMPLETED"}})
+            return (lookup or get)(*args, **kwargs)
+
+        return mock.patch.object(self.provider, "get", side_effect=reconcile_then_lookup)
+
+    def test_ipn_settles_once(self):
+        self.assertEqual(self.ipn().status_code, 200)
+        self.assertEqual(self.ipn().status_code, 200)
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, MobileMoneyTransaction.STATUS_SUCCESS)
+        self.assertIsNotNone(self.tx.effects_applied_at)
+        self.assertEqual(self.succeeded_events(), 1)
+
+    def test_failed_lookup_does_not_undo_concurrent_settlement(self):
+        def lookup_fails(*args, **kwargs):
+            raise requests.ConnectionError("status lookup failed")
+
+        with self.settle_during_lookup(lookup_fails):
+            self.assertEqual(self.ipn().status_code, 200)
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, MobileMoneyTransaction.STATUS_SUCCESS)
+        self.assertIsNotNone(self.tx.completed_at)
+        self.assertIsNotNone(self.tx.effects_applied_at)
+        self.assertEqual(self.succeeded_events(), 1)
+
+    def test_racing_success_emits_once(self):
+        with self.settle_during_lookup():
+            self.assertEqual(self.ipn().status_code, 200)
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, MobileMoneyTransaction.STATUS_SUCCESS)
+        self.assertEqual(self.succeeded_events(), 1)
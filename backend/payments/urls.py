@@ -5,6 +5,7 @@ from .views import (
     HomeownerPaymentInitiateView,
     CleaningCompanyPaymentInitiateView,
     PesapalIPNView,
+    TransactionStatusView,
     PesapalPaymentCallbackView,
 )
 
@@ -13,5 +14,6 @@ urlpatterns = [
     path("home-nurse-onboarding/initiate/", HomeNurseOnboardingInitiateView.as_view(), name="home_nurse_onboarding_initiate"),
     path("homeowner/initiate/", HomeownerPaymentInitiateView.as_view(), name="homeowner_payment_initiate"),
     path("cleaning-company/initiate/", CleaningCompanyPaymentInitiateView.as_view(), name="company_payment_initiate"),
+    path("transactions/<int:pk>/status/", TransactionStatusView.as_view(), name="transaction_status"),
     path("pesapal/ipn/", PesapalIPNView.as_view(), name="pesapal_ipn"),
 ]
@@ -1,20 +1,31 @@
+import logging
 from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from decouple import config
-import requests
+from backend.idempotency import idempotent
+from backend.notify import wait_for
+from backend.outbound import get_client
 from maid.models import MaidProfile
-from homeowner.models import HomeownerProfile
 from cleaning_company.models import CleaningCompany
 from home_nursing.models import HomeNurse
-from .models import MobileMoneyTransaction
+from outbox.publish import emit
+from .effects import apply_payment_effects
+from .models import MobileMoneyTransaction, ProviderPayload
+from .reconcile import outcome_for
+
+logger = logging.getLogger(__name__)
 
 
 class MaidOnboardingInitiateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         if not hasattr(user, "maid_profile"):
@@ -60,13 +71,15 @@ class MaidOnboardingInitiateView(APIView):
         pesapal_secret = config("PESAPAL_CONSUMER_SECRET", default="")
         ipn_id = config("PESAPAL_IPN_ID", default="6ebfe1ed-3b45-4c19-89e6-dafef0f898ea")
         if not pesapal_key or not pesapal_secret:
+            logger.error("Pesapal credentials are not configured")
             return Response({"error": "Payment configuration missing on server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Step 1: obtain bearer token
-        auth_url = "https://pay.pesapal.com/v3/api/Auth/RequestToken"
+        auth_url = "api/Auth/RequestToken"
         try:
-            auth_resp = requests.post(
+            auth_resp = get_client("pesapal").post(
                 auth_url,
+                "request_token",
                 json={
                     "consumer_key": pesapal_key,
                     "consumer_secret": pesapal_secret,
@@ -81,16 +94,18 @@ class MaidOnboardingInitiateView(APIView):
         except Exception as exc:  # pragma: no cover - network failure
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal token request failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to contact payment gateway."}, status=status.HTTP_502_BAD_GATEWAY)
 
         token = auth_data.get("token")
         if not token or auth_resp.status_code != 200:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal rejected token request for transaction %s: status=%s", tx.id, auth_resp.status_code)
             return Response({"error": "Failed to authenticate with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         # Step 2: submit order request
-        submit_url = "https://pay.pesapal.com/v3/api/Transactions/SubmitOrderRequest"
+        submit_url = "api/Transactions/SubmitOrderRequest"
         merchant_reference = f"MM-ONBOARD-{tx.id}"
         callback_url = config(
             "PESAPAL_CALLBACK_URL",
@@ -123,8 +138,9 @@ class MaidOnboardingInitiateView(APIView):
         }
 
         try:
-            submit_resp = requests.post(
+            submit_resp = get_client("pesapal").post(
                 submit_url,
+                "submit_order",
                 json=body,
                 headers={
                     "Accept": "application/json",
@@ -137,19 +153,22 @@ class MaidOnboardingInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal order submission failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to create payment with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         order_tracking_id = submit_data.get("order_tracking_id")
         redirect_url = submit_data.get("redirect_url")
         if submit_resp.status_code != 200 or not order_tracking_id:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
-            tx.raw_callback = submit_data
-            tx.save(update_fields=["status", "raw_callback"])
+            tx.save(update_fields=["status"])
+            ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+            logger.warning("Pesapal did not accept order for transaction %s: status=%s body=%s", tx.id, submit_resp.status_code, submit_data)
             return Response({"error": "Payment gateway did not accept the request."}, status=status.HTTP_502_BAD_GATEWAY)
 
         tx.provider_reference = order_tracking_id
-        tx.raw_callback = submit_data
-        tx.save(update_fields=["provider_reference", "raw_callback"])
+        tx.save(update_fields=["provider_reference"])
+        ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+        logger.info("Pesapal order %s submitted for transaction %s", order_tracking_id, tx.id)
 
         return Response(
             {
@@ -168,6 +187,7 @@ class HomeNurseOnboardingInitiateView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         try:
@@ -213,12 +233,14 @@ class HomeNurseOnboardingInitiateView(APIView):
         pesapal_secret = config("PESAPAL_CONSUMER_SECRET", default="")
         ipn_id = config("PESAPAL_IPN_ID", default="6ebfe1ed-3b45-4c19-89e6-dafef0f898ea")
         if not pesapal_key or not pesapal_secret:
+            logger.error("Pesapal credentials are not configured")
             return Response({"error": "Payment configuration missing on server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        auth_url = "https://pay.pesapal.com/v3/api/Auth/RequestToken"
+        auth_url = "api/Auth/RequestToken"
         try:
-            auth_resp = requests.post(
+            auth_resp = get_client("pesapal").post(
                 auth_url,
+                "request_token",
                 json={"consumer_key": pesapal_key, "consumer_secret": pesapal_secret},
                 headers={"Accept": "application/json", "Content-Type": "application/json"},
                 timeout=15,
@@ -227,15 +249,17 @@ class HomeNurseOnboardingInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal token request failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to contact payment gateway."}, status=status.HTTP_502_BAD_GATEWAY)
 
         token = auth_data.get("token")
         if not token or auth_resp.status_code != 200:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal rejected token request for transaction %s: status=%s", tx.id, auth_resp.status_code)
             return Response({"error": "Failed to authenticate with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
-        submit_url = "https://pay.pesapal.com/v3/api/Transactions/SubmitOrderRequest"
+        submit_url = "api/Transactions/SubmitOrderRequest"
         merchant_reference = f"HN-ONBOARD-{tx.id}"
         callback_url = config(
             "PESAPAL_CALLBACK_URL",
@@ -267,8 +291,9 @@ class HomeNurseOnboardingInitiateView(APIView):
         }
 
         try:
-            submit_resp = requests.post(
+            submit_resp = get_client("pesapal").post(
                 submit_url,
+                "submit_order",
                 json=body,
                 headers={
                     "Accept": "application/json",
@@ -281,19 +306,22 @@ class HomeNurseOnboardingInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal order submission failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to create payment with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         order_tracking_id = submit_data.get("order_tracking_id")
         redirect_url = submit_data.get("redirect_url")
         if submit_resp.status_code != 200 or not order_tracking_id:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
-            tx.raw_callback = submit_data
-            tx.save(update_fields=["status", "raw_callback"])
+            tx.save(update_fields=["status"])
+            ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+            logger.warning("Pesapal did not accept order for transaction %s: status=%s body=%s", tx.id, submit_resp.status_code, submit_data)
             return Response({"error": "Payment gateway did not accept the request."}, status=status.HTTP_502_BAD_GATEWAY)
 
         tx.provider_reference = order_tracking_id
-        tx.raw_callback = submit_data
-        tx.save(update_fields=["provider_reference", "raw_callback"])
+        tx.save(update_fields=["provider_reference"])
+        ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+        logger.info("Pesapal order %s submitted for transaction %s", order_tracking_id, tx.id)
 
         return Response(
             {
@@ -310,6 +338,7 @@ class HomeNurseOnboardingInitiateView(APIView):
 class HomeownerPaymentInitiateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         if not hasattr(user, "homeowner_profile"):
@@ -357,13 +386,15 @@ class HomeownerPaymentInitiateView(APIView):
         pesapal_secret = config("PESAPAL_CONSUMER_SECRET", default="")
         ipn_id = config("PESAPAL_IPN_ID", default="6ebfe1ed-3b45-4c19-89e6-dafef0f898ea")
         if not pesapal_key or not pesapal_secret:
+            logger.error("Pesapal credentials are not configured")
             return Response({"error": "Payment configuration missing on server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Step 1: obtain bearer token
-        auth_url = "https://pay.pesapal.com/v3/api/Auth/RequestToken"
+        auth_url = "api/Auth/RequestToken"
         try:
-            auth_resp = requests.post(
+            auth_resp = get_client("pesapal").post(
                 auth_url,
+                "request_token",
                 json={
                     "consumer_key": pesapal_key,
                     "consumer_secret": pesapal_secret,
@@ -378,16 +409,18 @@ class HomeownerPaymentInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal token request failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to contact payment gateway."}, status=status.HTTP_502_BAD_GATEWAY)
 
         token = auth_data.get("token")
         if not token or auth_resp.status_code != 200:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal rejected token request for transaction %s: status=%s", tx.id, auth_resp.status_code)
             return Response({"error": "Failed to authenticate with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         # Step 2: submit order request
-        submit_url = "https://pay.pesapal.com/v3/api/Transactions/SubmitOrderRequest"
+        submit_url = "api/Transactions/SubmitOrderRequest"
         merchant_reference = f"{merchant_prefix}{tx.id}"
         callback_url = config(
             "PESAPAL_CALLBACK_URL",
@@ -419,8 +452,9 @@ class HomeownerPaymentInitiateView(APIView):
         }
 
         try:
-            submit_resp = requests.post(
+            submit_resp = get_client("pesapal").post(
                 submit_url,
+                "submit_order",
                 json=body,
                 headers={
                     "Accept": "application/json",
@@ -433,19 +467,22 @@ class HomeownerPaymentInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal order submission failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to create payment with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         order_tracking_id = submit_data.get("order_tracking_id")
         redirect_url = submit_data.get("redirect_url")
         if submit_resp.status_code != 200 or not order_tracking_id:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
-            tx.raw_callback = submit_data
-            tx.save(update_fields=["status", "raw_callback"])
+            tx.save(update_fields=["status"])
+            ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+            logger.warning("Pesapal did not accept order for transaction %s: status=%s body=%s", tx.id, submit_resp.status_code, submit_data)
             return Response({"error": "Payment gateway did not accept the request."}, status=status.HTTP_502_BAD_GATEWAY)
 
         tx.provider_reference = order_tracking_id
-        tx.raw_callback = submit_data
-        tx.save(update_fields=["provider_reference", "raw_callback"])
+        tx.save(update_fields=["provider_reference"])
+        ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+        logger.info("Pesapal order %s submitted for transaction %s", order_tracking_id, tx.id)
 
         return Response(
             {
@@ -462,6 +499,7 @@ class HomeownerPaymentInitiateView(APIView):
 class CleaningCompanyPaymentInitiateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         try:
@@ -505,13 +543,15 @@ class CleaningCompanyPaymentInitiateView(APIView):
         pesapal_secret = config("PESAPAL_CONSUMER_SECRET", default="")
         ipn_id = config("PESAPAL_IPN_ID", default="6ebfe1ed-3b45-4c19-89e6-dafef0f898ea")
         if not pesapal_key or not pesapal_secret:
+            logger.error("Pesapal credentials are not configured")
             return Response({"error": "Payment configuration missing on server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Step 1: obtain bearer token
-        auth_url = "https://pay.pesapal.com/v3/api/Auth/RequestToken"
+        auth_url = "api/Auth/RequestToken"
         try:
-            auth_resp = requests.post(
+            auth_resp = get_client("pesapal").post(
                 auth_url,
+                "request_token",
                 json={
                     "consumer_key": pesapal_key,
                     "consumer_secret": pesapal_secret,
@@ -526,16 +566,18 @@ class CleaningCompanyPaymentInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal token request failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to contact payment gateway."}, status=status.HTTP_502_BAD_GATEWAY)
 
         token = auth_data.get("token")
         if not token or auth_resp.status_code != 200:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal rejected token request for transaction %s: status=%s", tx.id, auth_resp.status_code)
             return Response({"error": "Failed to authenticate with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         # Step 2: submit order request
-        submit_url = "https://pay.pesapal.com/v3/api/Transactions/SubmitOrderRequest"
+        submit_url = "api/Transactions/SubmitOrderRequest"
         merchant_reference = f"{merchant_prefix}{tx.id}"
         callback_url = config(
             "PESAPAL_CALLBACK_URL",
@@ -567,8 +609,9 @@ class CleaningCompanyPaymentInitiateView(APIView):
         }
 
         try:
-            submit_resp = requests.post(
+            submit_resp = get_client("pesapal").post(
                 submit_url,
+                "submit_order",
                 json=body,
                 headers={
                     "Accept": "application/json",
@@ -581,19 +624,22 @@ class CleaningCompanyPaymentInitiateView(APIView):
         except Exception:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
             tx.save(update_fields=["status"])
+            logger.warning("Pesapal order submission failed for transaction %s", tx.id, exc_info=True)
             return Response({"error": "Failed to create payment with Pesapal."}, status=status.HTTP_502_BAD_GATEWAY)
 
         order_tracking_id = submit_data.get("order_tracking_id")
         redirect_url = submit_data.get("redirect_url")
         if submit_resp.status_code != 200 or not order_tracking_id:
             tx.status = MobileMoneyTransaction.STATUS_FAILED
-            tx.raw_callback = submit_data
-            tx.save(update_fields=["status", "raw_callback"])
+            tx.save(update_fields=["status"])
+            ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+            logger.warning("Pesapal did not accept order for transaction %s: status=%s body=%s", tx.id, submit_resp.status_code, submit_data)
             return Response({"error": "Payment gateway did not accept the request."}, status=status.HTTP_502_BAD_GATEWAY)
 
         tx.provider_reference = order_tracking_id
-        tx.raw_callback = submit_data
-        tx.save(update_fields=["provider_reference", "raw_callback"])
+        tx.save(update_fields=["provider_reference"])
+        ProviderPayload.record(tx, ProviderPayload.KIND_SUBMIT, submit_data)
+        logger.info("Pesapal order %s submitted for transaction %s", order_tracking_id, tx.id)
 
         return Response(
             {
@@ -646,19 +692,20 @@ class PesapalIPNView(APIView):
         if not tx:
             return Response({"detail": "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        tx.raw_callback = data
+        ProviderPayload.record(tx, ProviderPayload.KIND_IPN, data)
 
         # Query Pesapal for the latest status
         pesapal_key = config("PESAPAL_CONSUMER_KEY", default="")
         pesapal_secret = config("PESAPAL_CONSUMER_SECRET", default="")
         if not pesapal_key or not pesapal_secret:
-            tx.save(update_fields=["raw_callback"])
+            logger.error("Pesapal credentials are not configured")
             return Response({"detail": "Payment config missing"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        auth_url = "https://pay.pesapal.com/v3/api/Auth/RequestToken"
+        auth_url = "api/Auth/RequestToken"
         try:
-            auth_resp = requests.post(
+            auth_resp = get_client("pesapal").post(
                 auth_url,
+                "request_token",
                 json={"consumer_key": pesapal_key, "consumer_secret": pesapal_secret},
                 headers={"Accept": "application/json", "Content-Type": "application/json"},
                 timeout=15,
@@ -669,13 +716,14 @@ class PesapalIPNView(APIView):
             token = None
 
         if not token:
-            tx.save(update_fields=["raw_callback"])
+            logger.warning("Pesapal token request failed while handling IPN for transaction %s", tx.id)
             return Response({"detail": "Could not authenticate with Pesapal"}, status=status.HTTP_502_BAD_GATEWAY)
 
-        status_url = "https://pay.pesapal.com/v3/api/Transactions/GetTransactionStatus"  # orderTrackingId passed as query param
+        status_url = "api/Transactions/GetTransactionStatus"  # orderTrackingId passed as query param
         try:
-            resp = requests.get(
+            resp = get_client("pesapal").get(
                 status_url,
+                "transaction_status",
                 params={"orderTrackingId": order_tracking_id or tx.provider_reference},
                 headers={
                     "Accept": "application/json",
@@ -686,63 +734,83 @@ class PesapalIPNView(APIView):
             )
             status_data = resp.json() if resp.content else {}
         except Exception:
+            logger.warning("Pesapal status request failed for transaction %s", tx.id, exc_info=True)
             status_data = {}
 
         payment_status = (status_data.get("payment_status") or "").upper()
-        if payment_status in {"COMPLETED", "COMPLETED_SUCCESSFULLY", "SUCCESS"}:
-            tx.status = MobileMoneyTransaction.STATUS_SUCCESS
-            tx.completed_at = timezone.now()
-
-            # Apply effects based on purpose
-            if tx.purpose == MobileMoneyTransaction.PURPOSE_MAID_ONBOARDING and tx.maid_id:
-                maid = tx.maid
-                maid.onboarding_fee_paid = True
-                maid.onboarding_fee_paid_at = timezone.now()
-                maid.save(update_fields=["onboarding_fee_paid", "onboarding_fee_paid_at"])
-            elif tx.purpose == MobileMoneyTransaction.PURPOSE_HOME_NURSE_ONBOARDING and tx.home_nurse_id:
-                nurse = tx.home_nurse
-                nurse.onboarding_fee_paid = True
-                nurse.onboarding_fee_paid_at = timezone.now()
-                nurse.save(update_fields=["onboarding_fee_paid", "onboarding_fee_paid_at"])
-            elif tx.purpose == MobileMoneyTransaction.PURPOSE_HOMEOWNER_LIVE_IN and tx.homeowner_id:
-                hp = tx.homeowner
-                hp.has_live_in_credit = True
-                hp.live_in_credit_awarded_at = timezone.now()
-                hp.save(update_fields=["has_live_in_credit", "live_in_credit_awarded_at"])
-            elif tx.purpose in {MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY, MobileMoneyTransaction.PURPOSE_HOMEOWNER_DAY_PASS} and tx.homeowner_id:
-                hp = tx.homeowner
-                from datetime import timedelta
-
-                now = timezone.now()
-                if tx.purpose == MobileMoneyTransaction.PURPOSE_HOMEOWNER_MONTHLY:
-                    hp.subscription_type = HomeownerProfile.SUB_MONTHLY
-                    hp.subscription_expires_at = now + timedelta(days=30)
-                else:
-                    hp.subscription_type = HomeownerProfile.SUB_DAY_PASS
-                    hp.subscription_expires_at = now + timedelta(days=1)
-                hp.save(update_fields=["subscription_type", "subscription_expires_at"])
-            elif tx.purpose in {MobileMoneyTransaction.PURPOSE_COMPANY_MONTHLY, MobileMoneyTransaction.PURPOSE_COMPANY_ANNUAL} and tx.company_id:
-                from datetime import timedelta
-
-                company = tx.company
-                now = timezone.now()
-                company.has_active_subscription = True
-                if tx.purpose == MobileMoneyTransaction.PURPOSE_COMPANY_MONTHLY:
-                    company.subscription_type = "monthly"
-                    company.subscription_expires_at = now + timedelta(days=30)
-                else:
-                    company.subscription_type = "annual"
-                    company.subscription_expires_at = now + timedelta(days=365)
-                company.save(update_fields=["has_active_subscription", "subscription_type", "subscription_expires_at"])
-        elif payment_status in {"FAILED", "CANCELLED", "CANCELED"}:
-            tx.status = MobileMoneyTransaction.STATUS_FAILED
-            tx.completed_at = timezone.now()
-
-        tx.raw_callback = {"ipn": data, "status": status_data}
-        tx.save(update_fields=["status", "completed_at", "raw_callback"])
+        outcome = outcome_for(payment_status)
+        with transaction.atomic():
+            if status_data:
+                ProviderPayload.record(tx, ProviderPayload.KIND_STATUS, status_data)
+            # ``tx`` was read before the Pesapal calls; the reconciler or a
+            # repeated IPN may have settled it since. Settle with a conditional
+            # update so only one of them does, and never undo a success.
+            settled = bool(outcome) and MobileMoneyTransaction.objects.filter(pk=tx.pk).exclude(
+                status__in=[MobileMoneyTransaction.STATUS_SUCCESS, outcome],
+            ).update(status=outcome, completed_at=timezone.now())
+            if settled:
+                tx.status = outcome
+                if outcome == MobileMoneyTransaction.STATUS_SUCCESS:
+                    apply_payment_effects([tx.pk])
+                    emit("payment.succeeded", tx, {"purpose": tx.purpose})
+                MobileMoneyTransaction.notify_settled([tx.pk])
+        logger.info(
+            "IPN for transaction %s: pesapal status %r, %s",
+            tx.id, payment_status, f"transaction now {outcome}" if settled else "transaction unchanged",
+        )
         return Response({"detail": "OK"})
 
 
+class TransactionStatusView(APIView):
+    """
+    Status of one of the user's payments, for the app to follow a payment it
+    just initiated.
+
+    With ``?wait=N`` the request is held (up to PAYMENT_STATUS_MAX_WAIT
+    seconds) until the transaction leaves pending, so one request replaces
+    repeated polling; the IPN handler wakes it through backend.notify. A
+    waiting request holds a worker thread, so when PAYMENT_STATUS_MAX_WAITERS
+    requests are already waiting in this worker process (by default half its
+    threads, none for single-threaded workers) the current status is
+    returned immediately instead.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        user = request.user
+        queryset = MobileMoneyTransaction.objects.only("id", "status", "purpose", "completed_at", "effects_applied_at")
+        owned = queryset.filter(pk=pk)
+        if not user.is_staff:
+            owned = owned.filter(
+                Q(maid__user=user) | Q(home_nurse__user=user) | Q(homeowner__user=user) | Q(company__user=user)
+            )
+        tx = owned.first()
+        if not tx:
+            return Response({"detail": "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            wait = min(float(request.query_params.get("wait", 0)), settings.PAYMENT_STATUS_MAX_WAIT)
+        except ValueError:
+            return Response({"detail": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if wait > 0 and tx.status == MobileMoneyTransaction.STATUS_PENDING:
+            settled = queryset.filter(pk=tx.pk).exclude(status=MobileMoneyTransaction.STATUS_PENDING)
+            tx = wait_for(
+                MobileMoneyTransaction.status_topic(tx.pk), settled.first, wait,
+                max_waiters=settings.PAYMENT_STATUS_MAX_WAITERS,
+            ) or tx
+
+        return Response(
+            {
+                "transaction_id": tx.id,
+                "status": tx.status,
+                "purpose": tx.purpose,
+                "completed_at": tx.completed_at,
+                "effects_applied": tx.effects_applied_at is not None,
+            }
+        )
+
+
 class PesapalPaymentCallbackView(APIView):
     """
     Pesapal redirects the user here after payment.
@@ -60,6 +60,9 @@ export const AuthProvider = ({ children }) => {
       if (accessToken) {
         storage.setItem('accessToken', accessToken);
       }
+      if (response.data.refresh) {
+        storage.setItem('refreshToken', response.data.refresh);
+      }
       setUser(userData);
       storage.setItem('user', JSON.stringify(userData));
       return { success: true, user: userData };
@@ -92,6 +95,9 @@ export const AuthProvider = ({ children }) => {
       if (accessToken) {
         storage.setItem('accessToken', accessToken);
       }
+      if (response.data.refresh) {
+        storage.setItem('refreshToken', response.data.refresh);
+      }
       setUser(userData);
       storage.setItem('user', JSON.stringify(userData));
       return { success: true, user: userData };
@@ -115,6 +121,9 @@ export const AuthProvider = ({ children }) => {
       if (accessToken) {
         storage.setItem('accessToken', accessToken);
       }
+      if (response.data.refresh) {
+        storage.setItem('refreshToken', response.data.refresh);
+      }
 
       return { success: true, data: response.data };
     } catch (error) {
@@ -135,6 +144,7 @@ export const AuthProvider = ({ children }) => {
       // Clear from both storages to keep state consistent between web and native
       localStorage.removeItem('user');
       localStorage.removeItem('accessToken');
+      localStorage.removeItem('refreshToken');
       sessionStorage.removeItem('user');
       sessionStorage.removeItem('accessToken');
     }
@@ -38,20 +38,58 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// Access tokens are short-lived; on a 401 we exchange the stored refresh
+// token for a new pair once (shared by concurrent requests) and retry.
+const getStoredRefreshToken = () => localStorage.getItem('refreshToken');
+
+const clearStoredAuth = () => {
+  localStorage.removeItem('user');
+  localStorage.removeItem('accessToken');
+  localStorage.removeItem('refreshToken');
+  sessionStorage.removeItem('user');
+  sessionStorage.removeItem('accessToken');
+};
+
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_BASE_URL}/accounts/token/refresh/`, { refresh: getStoredRefreshToken() })
+      .then((response) => {
+        localStorage.setItem('accessToken', response.data.access);
+        localStorage.setItem('refreshToken', response.data.refresh);
+        return response.data.access;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Response interceptor
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried && getStoredRefreshToken()) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        // Fall through to the logout handling below.
+      }
+    }
     if (error.response?.status === 401) {
       // Handle unauthorized access.
       // Only clear auth + redirect if we actually had a token; this avoids
       // “random logouts” caused by 401s on public/unauthenticated requests.
       const token = getStoredToken();
       if (token) {
-        localStorage.removeItem('user');
-        localStorage.removeItem('accessToken');
-        sessionStorage.removeItem('user');
-        sessionStorage.removeItem('accessToken');
+        clearStoredAuth();
         if (window.location.pathname !== '/login') {
           window.location.href = '/login';
         }
@@ -69,7 +107,7 @@ export const authAPI = {
   login: (credentials) => api.post('/accounts/login/', credentials),
   sendLoginPin: (payload) => api.post('/accounts/login/send-pin/', payload),
   verifyLoginPin: (payload) => api.post('/accounts/login/verify-pin/', payload),
-  logout: () => api.post('/accounts/logout/'),
+  logout: () => api.post('/accounts/logout/', { refresh: localStorage.getItem('refreshToken') }),
   getCurrentUser: () => api.get('/accounts/users/me/'),
   updateUser: (data) => api.patch('/accounts/users/me/', data),
   deleteMe: () => api.delete('/accounts/users/me/'),
@@ -118,6 +156,8 @@ export const jobAPI = {
   delete: (id) => api.delete(`/homeowner/jobs/${id}/`),
   assignMaid: (id, maidId) => api.post(`/homeowner/jobs/${id}/assign_maid/`, { maid_id: maidId }),
   updateStatus: (id, status) => api.post(`/homeowner/jobs/${id}/update_status/`, { status }),
+  // Provider feed, nearest and newest first; pass the previous page's `next` cursor
+  feed: (cursor) => api.get('/homeowner/jobs/feed/', { params: cursor ? { cursor } : {} }),
 };
 
 // Job Application API
@@ -127,6 +167,7 @@ export const applicationAPI = {
   create: (data) => api.post('/homeowner/applications/', data),
   accept: (id) => api.post(`/homeowner/applications/${id}/accept/`),
   reject: (id) => api.post(`/homeowner/applications/${id}/reject/`),
+  rejectPending: (jobId) => api.post('/homeowner/applications/reject_pending/', { job: jobId }),
 };
 
 // Review API
@@ -189,6 +230,11 @@ export const paymentAPI = {
   initiateHomeownerPayment: (payload) => api.post('/payments/homeowner/initiate/', payload),
   // Cleaning company payment plans (monthly/annual subscriptions)
   initiateCompanyPayment: (payload) => api.post('/payments/cleaning-company/initiate/', payload),
+  // Long-poll: resolves once the transaction leaves "pending" or after `wait` seconds.
+  // Servers without spare worker threads (the default, see PAYMENT_STATUS_MAX_WAITERS)
+  // answer at once with the current status, so keep calling while it is still "pending".
+  waitForTransaction: (id, wait = 25) =>
+    api.get(`/payments/transactions/${id}/status/`, { params: { wait }, timeout: (wait + 10) * 1000 }),
 };
 
 // Live Location API